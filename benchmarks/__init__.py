@@ -0,0 +1,7 @@
+"""
+Benchmarks for the hot paths of xxkcd, run against a local stand-in for
+xkcd.com, imgs.xkcd.com and what-if.xkcd.com:
+
+    python -m benchmarks --latency 0.005 --output results.json
+    python -m benchmarks --compare results.json
+"""
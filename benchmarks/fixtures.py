@@ -0,0 +1,123 @@
+"""
+Responses for the stand-in server.
+
+Comic JSON is the real JSON recorded in the snapshot bundled with xxkcd.
+Images and What If? pages are generated from a fixed seed, so every run
+serves the same bytes.
+"""
+
+import json
+import random
+import struct
+import posixpath
+
+from xxkcd._snapshot import Snapshot
+from xxkcd import constants
+
+# Sizes of the generated images, in bytes
+IMAGE_SIZES = (8192, 131072)
+
+
+def _host_and_path(url):
+    scheme, rest = url.split('://', 1)
+    host, _, path = rest.partition('/')
+    return host, '/' + path
+
+
+class Fixtures(object):
+    """
+    `{(host, path): body}` for `comics` comics and `articles` What If? articles.
+    Images are generated when first requested.
+    """
+
+    def __init__(self, comics=500, articles=150, seed=0):
+        self.comics = comics
+        self.articles = articles
+        self.seed = seed
+        self.responses = {}
+        self._images = {}
+        with Snapshot() as snapshot:
+            for n in range(1, min(comics, snapshot.max()) + 1):
+                raw_json = snapshot.get(n)
+                if raw_json is None:
+                    continue
+                body = json.dumps(raw_json).encode('utf-8')
+                self.responses[_host_and_path(constants.xkcd.json.for_comic(number=n))] = body
+                if raw_json['img'] and raw_json['img'] != constants.xkcd.images.blank:
+                    self._images[_host_and_path(raw_json['img'])] = None
+            self.responses[_host_and_path(constants.xkcd.json.latest)] = body
+        self.responses[_host_and_path(constants.what_if.archive)] = self.archive_page()
+        for n in range(1, articles + 1):
+            page = self.article_page(n)
+            self.responses[_host_and_path(constants.what_if.for_article(number=n))] = page
+        self.responses[_host_and_path(constants.what_if.latest)] = page
+
+    def get(self, host, path):
+        """
+        :return: The body of the response, or None for a 404
+        :rtype: Optional[bytes]
+        """
+        body = self.responses.get((host, path))
+        if body is None and (host, path) in self._images:
+            body = self.responses[host, path] = self.image(path)
+        return body
+
+    def image(self, path):
+        """A PNG-looking file of a deterministic size and contents for the path"""
+        rng = random.Random('{}:{}'.format(self.seed, path))
+        size = rng.randint(*IMAGE_SIZES)
+        header = (
+            b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' +
+            struct.pack('>II', rng.randint(100, 1000), rng.randint(100, 1000)) + b'\x08\x06\0\0\0'
+        )
+        chunk = bytes(bytearray(rng.getrandbits(8) for _ in range(4096)))
+        body = header + chunk * (size // len(chunk) + 1)
+        return body[:size]
+
+    def image_paths(self):
+        """The (host, path) of every image, in order of comic number"""
+        return sorted(self._images, key=lambda key: posixpath.basename(key[1]))
+
+    def archive_page(self):
+        rng = random.Random('{}:archive'.format(self.seed))
+        months = (
+            'January', 'February', 'March', 'April', 'May', 'June', 'July',
+            'August', 'September', 'October', 'November', 'December'
+        )
+        entries = []
+        for n in range(1, self.articles + 1):
+            entries.append(
+                u'<div class="archive-entry">\n'
+                u'<a href="/{n}/"><img class="archive-image" src="/imgs/a/{n}/archive.png" title="Article {n}"></a>\n'
+                u'<h1 class="archive-title"><a href="/{n}/">Article number {n}</a></h1>\n'
+                u'<h2 class="archive-date">{month} {day}, {year}</h2>\n'
+                u'</div>\n'.format(
+                    n=n, month=rng.choice(months), day=rng.randint(1, 28), year=2012 + n // 52
+                )
+            )
+        return (
+            u'<!DOCTYPE html>\n<html><head><title>What If? Archive</title></head><body>\n'
+            u'<div id="archive-wrapper">\n' + u''.join(entries) + u'</div>\n</body></html>\n'
+        ).encode('utf-8')
+
+    def article_page(self, n):
+        rng = random.Random('{}:article:{}'.format(self.seed, n))
+        words = (
+            u'light', u'speed', u'baseball', u'ocean', u'energy', u'planet', u'nuclear', u'water',
+            u'atmosphere', u'pressure', u'gravity', u'mass', u'lightning', u'Earth', u'Sun', u'moon'
+        )
+        paragraphs = []
+        for _ in range(rng.randint(8, 20)):
+            sentence = u' '.join(rng.choice(words) for _ in range(rng.randint(40, 120)))
+            paragraphs.append(u'<p>{} <span class="ref"><span class="refnum">[{}]</span>'
+                              u'<span class="refbody">A footnote about {}.</span></span></p>\n'.format(
+                                  sentence, len(paragraphs) + 1, rng.choice(words)))
+            if rng.random() < 0.3:
+                paragraphs.append(u'<img class="illustration" src="/imgs/a/{}/figure.png" title="Figure">\n'.format(n))
+        return (
+            u'<!DOCTYPE html>\n<html><head><title>What If?</title></head><body>\n'
+            u'<article class="entry">\n<a href="/{n}/"><h1>Article number {n}</h1></a>\n'
+            u'<p id="question">What would happen if question number {n} were asked?</p>\n'
+            u'<p id="attribute">&mdash;Reader {n}</p>\n'.format(n=n) +
+            u''.join(paragraphs) + u'</article>\n</body></html>\n'
+        ).encode('utf-8')
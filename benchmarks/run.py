@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+"""Run the benchmarks and print, save or compare the results"""
+
+import os
+import sys
+import gc
+import atexit
+import shutil
+import json
+import timeit
+import argparse
+import platform
+import tempfile
+import collections
+
+from xxkcd import xkcd, WhatIf, load_xkcd_cache
+from xxkcd.policy import Policy
+from xxkcd.store import Store
+from xxkcd.what_if import Archive
+from xxkcd.xkcd import decode_all
+from xxkcd._html_parsing import ParseToTree
+
+from benchmarks.fixtures import Fixtures
+from benchmarks.server import StandInServer
+
+Case = collections.namedtuple('Case', ('setup', 'run', 'items', 'bytes'))
+
+BENCHMARKS = collections.OrderedDict()
+
+# Set to subclasses using the stand-in server by `main`
+xkcdBench = None
+WhatIfBench = None
+
+
+def benchmark(function):
+    """Register a function of the parsed arguments and fixtures that returns a `Case`"""
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+def _nothing():
+    pass
+
+
+@benchmark
+def load_all(args, fixtures):
+    """`xkcd.load_all` from the stand-in server"""
+    def run():
+        xkcdBench.load_all(concurrency=args.concurrency, errors='raise')
+
+    return Case(xkcdBench.delete_all, run, fixtures.comics, 0)
+
+
+@benchmark
+def range_read_ahead(args, fixtures):
+    """Using each comic in `xkcd.range` in turn, with `read_ahead=8`"""
+    def run():
+        for n in xkcdBench.range(1, fixtures.comics + 1, read_ahead=8):
+            if n != 404:
+                xkcdBench(n).title
+
+    return Case(xkcdBench.delete_all, run, fixtures.comics, 0)
+
+
+@benchmark
+def load_xkcd_cache_(args, fixtures):
+    """`load_xkcd_cache` and reading the raw JSON of every bundled comic"""
+    numbers = []
+
+    def setup():
+        xkcd.delete_all()
+        if xkcd._snapshot is not None:
+            xkcd._snapshot.close()
+        xkcd._snapshot = None
+
+    def run():
+        load_xkcd_cache()
+        numbers[:] = xkcd._snapshot
+        for n in numbers:
+            xkcd(n)._raw_json
+
+    setup()
+    run()
+    return Case(setup, run, len(numbers), 0)
+
+
+def _loaded_comics():
+    load_xkcd_cache()
+    # Newer comics' transcripts depend on the latest comic, which would need the network
+    return [xkcd(n, keep_alive=True) for n in range(1, 2100)]
+
+
+@benchmark
+def json_predecoded(args, fixtures):
+    """`xkcd.json` for comics from the pre-decoded bundled snapshot"""
+    comics = []
+
+    def setup():
+        xkcd.delete_all()
+        comics[:] = _loaded_comics()
+        for comic in comics:
+            comic._raw_json
+
+    def run():
+        for comic in comics:
+            comic.json
+
+    return Case(setup, run, 2099, 0)
+
+
+@benchmark
+def json_decode(args, fixtures):
+    """`xkcd.json` decoding the raw JSON at runtime"""
+    comics = []
+
+    def setup():
+        xkcd.delete_all()
+        comics[:] = _loaded_comics()
+        for comic in comics:
+            comic._raw_json
+            comic.__dict__.pop('_decoded_json', None)
+
+    def run():
+        for comic in comics:
+            comic.json
+
+    return Case(setup, run, 2099, 0)
+
+
+@benchmark
+def decode_all_(args, fixtures):
+    """`decode_all` over every bundled comic"""
+    load_xkcd_cache()
+    snapshot = xkcd._snapshot
+    raw_jsons = dict((n, snapshot.get(n)) for n in snapshot)
+
+    def run():
+        decode_all(raw_jsons)
+
+    return Case(_nothing, run, len(raw_jsons), 0)
+
+
+@benchmark
+def stream_image(args, fixtures):
+    """`xkcd.stream_image` of the first `--images` images, one after another"""
+    comics = []
+    xkcdBench.load_all(concurrency=args.concurrency)
+    for n in xkcdBench.range():
+        comic = xkcdBench(n)
+        if n != 404 and comic.img:
+            comics.append(comic)
+        if len(comics) == args.images:
+            break
+    total = [0]
+
+    class Sink(object):
+        @staticmethod
+        def write(data):
+            total[0] += len(data)
+
+    def run():
+        total[0] = 0
+        for comic in comics:
+            comic.stream_image(Sink)
+
+    run()
+    return Case(_nothing, run, len(comics), total[0])
+
+
+@benchmark
+def parse_archive(args, fixtures):
+    """`Archive.parse` on the What If? archive page"""
+    page = fixtures.archive_page()
+
+    def run():
+        for _ in Archive.parse((page,)):
+            pass
+
+    return Case(_nothing, run, 1, len(page))
+
+
+@benchmark
+def parse_articles(args, fixtures):
+    """`ParseToTree` on 20 What If? article pages"""
+    pages = [fixtures.article_page(n) for n in range(1, 21)]
+
+    def run():
+        parser = ParseToTree()
+        for page in pages:
+            parser(page)
+
+    return Case(_nothing, run, len(pages), sum(map(len, pages)))
+
+
+@benchmark
+def archive(args, fixtures):
+    """Downloading and parsing `WhatIf.archive` from the stand-in server"""
+    def run():
+        WhatIfBench.archive.load()
+
+    return Case(WhatIfBench.archive.delete, run, fixtures.articles, 0)
+
+
+@benchmark
+def archive_stored(args, fixtures):
+    """Loading `WhatIf.archive` from a `Store` instead of parsing it"""
+    def offline(url):
+        raise IOError('Should have been read from the store: ' + url)
+
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory, True)
+    WhatIfStored = WhatIf.with_opener(offline, 'WhatIfStored', __name__)
+    WhatIfStored.store = Store(os.path.join(directory, 'store.sqlite3'))
+    WhatIfStored.archive._store(list(Archive.parse((fixtures.archive_page(),))))
+
+    def setup():
+        WhatIfStored.archive._archive = None
+
+    def run():
+        WhatIfStored.archive.load()
+
+    return Case(setup, run, fixtures.articles, 0)
+
+
+def measure(case, repeat):
+    """:return: The time taken by each of `repeat` runs"""
+    times = []
+    for _ in range(repeat):
+        case.setup()
+        gc.collect()
+        start = timeit.default_timer()
+        case.run()
+        times.append(timeit.default_timer() - start)
+    return times
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def format_result(name, result):
+    line = '{:<18} min {:>10.3f} ms   median {:>10.3f} ms'.format(name, result['min'] * 1e3, result['median'] * 1e3)
+    if result['items']:
+        line += '   {:>10.2f} us/item'.format(result['min'] * 1e6 / result['items'])
+    if result['bytes']:
+        line += '   {:>8.1f} MB/s'.format(result['bytes'] / result['min'] / 1e6)
+    return line
+
+
+def compare(results, baseline, threshold):
+    """
+    Print how each result compares to the baseline.
+
+    :return: The names of the benchmarks that got slower by more than `threshold`
+    :rtype: List[str]
+    """
+    if baseline.get('params') != results['params']:
+        print('Warning: the baseline was run with different parameters: {!r}'.format(baseline.get('params')))
+    regressions = []
+    for name, result in results['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        ratio = result['min'] / old['min']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = '  faster'
+        print('{:<18} {:>10.3f} ms -> {:>10.3f} ms  ({:+.1%}){}'.format(
+            name, old['min'] * 1e3, result['min'] * 1e3, ratio - 1, flag
+        ))
+    return regressions
+
+
+def main(argv=None):
+    global xkcdBench, WhatIfBench
+
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = argparse.ArgumentParser(prog='benchmarks', description='Benchmarks xxkcd against a local stand-in server')
+    parser.add_argument('names', nargs='*', help='Benchmarks to run. Default: all of {}'.format(', '.join(BENCHMARKS)))
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='How many times to run each benchmark')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the server waits before each response')
+    parser.add_argument('--comics', type=int, default=500, help='Number of comics the server has')
+    parser.add_argument('--articles', type=int, default=150, help='Number of What If? articles the server has')
+    parser.add_argument('--images', type=int, default=50, help='Number of images for stream_image')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='Concurrency for load_all')
+    parser.add_argument('-o', '--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare with results written by --output')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Slowdown that counts as a regression')
+    args = parser.parse_args(argv)
+
+    names = args.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error('Unknown benchmark {!r}'.format(name))
+
+    fixtures = Fixtures(args.comics, args.articles)
+    results = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'params': {
+            'repeat': args.repeat, 'latency': args.latency, 'comics': args.comics,
+            'articles': args.articles, 'images': args.images, 'concurrency': args.concurrency
+        },
+        'results': {}
+    }
+    with StandInServer(fixtures, args.latency) as server:
+        # No retries, so errors from the stand-in server aren't hidden
+        policy = Policy(retries=0)
+        xkcdBench = xkcd.with_opener(server.opener, 'xkcdBench', __name__, policy=policy)
+        WhatIfBench = WhatIf.with_opener(server.opener, 'WhatIfBench', __name__, policy=policy)
+        for name in names:
+            case = BENCHMARKS[name](args, fixtures)
+            times = measure(case, args.repeat)
+            result = results['results'][name.rstrip('_')] = {
+                'min': min(times), 'median': _median(times), 'items': case.items, 'bytes': case.bytes
+            }
+            print(format_result(name.rstrip('_'), result))
+            sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""A local HTTP/1.1 server standing in for the xkcd sites"""
+
+import time
+import threading
+
+from xxkcd.transport import ConnectionPool
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class StandInServer(object):
+    """
+    Serves `Fixtures` on localhost, waiting `latency` seconds before each response.
+
+    A request for `https://{host}{path}` is made to `{self.base}/{host}{path}`
+    by `self.opener`, which can be given to `xkcd.with_opener` and `WhatIf.with_opener`.
+    """
+
+    def __init__(self, fixtures, latency=0.0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Otherwise the body waits for the headers to be acknowledged
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                _, host, path = self.path.split('/', 2)
+                body = server.fixtures.get(host, '/' + path)
+                if server.latency:
+                    time.sleep(server.latency)
+                if body is None:
+                    self.send_response(404)
+                    body = b'Not found'
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.requests += 1
+                    server.bytes_sent += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+            request_queue_size = 64
+
+        self.httpd = Server(('127.0.0.1', 0), Handler)
+        self.base = 'http://127.0.0.1:{}'.format(self.httpd.server_address[1])
+        self.pool = ConnectionPool(maxsize=32)
+        self.opener = self._make_opener()
+
+    def _make_opener(self):
+        base = self.base
+        pool = self.pool
+
+        class StandInOpener(object):
+            conditional = True
+
+            def __new__(cls, url, headers=None):
+                return pool.urlopen(base + '/' + url.split('://', 1)[1], headers)
+
+        return StandInOpener
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.pool.clear()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -1,27 +1,19 @@
 #!/usr/bin/env python
 
-import os
-import multiprocessing
+import sys
 
 from xxkcd import xkcd
 
 
-def download_image(n):
-    x = xkcd(n)
-    if x.image_filename is None:
-        return  # Comic has no image
-    name = '{number}_{name}'.format(number=n, name=x.image_filename)
-    with open(os.path.join('images', name), 'wb') as f:
-        x.stream_image(f)
+def progress(done, total, n):
+    sys.stdout.write('\r{}/{} images'.format(done, total))
+    sys.stdout.flush()
 
 
 def main():
-    if not os.path.exists('images'):
-        os.mkdir('images')
-    pool = multiprocessing.Pool(4)
-    pool.map(download_image, xkcd.range())
-    pool.close()
-    pool.join()
+    # Only downloads images that aren't already in the directory
+    added = xkcd.mirror_images('images', concurrency=8, progress=progress, errors='retry')
+    print('\nAdded {} images. See images/manifest.json for which file is which comic.'.format(len(added)))
 
 
 if __name__ == '__main__':
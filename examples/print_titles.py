@@ -4,8 +4,8 @@ from xxkcd import xkcd
 
 
 def main():
-    for n in xkcd.range():
-        print(xkcd(n).title)
+    for title in xkcd.fields('title', concurrency=16):
+        print(title)
 
 
 if __name__ == '__main__':
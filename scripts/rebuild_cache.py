@@ -1,57 +1,153 @@
 #!/usr/bin/env python3
+"""
+Regenerates the cache bundled with xxkcd.
+
+By default, only comics that are not in the existing cache are downloaded,
+along with the newest few that are, in case they have changed since.
+Records are written to the new cache one at a time, so only the downloaded
+comics are held in memory.
+"""
 
 import sys
 import os
-import multiprocessing
+import io
+import time
 import argparse
+import contextlib
 
 import xxkcd
+from xxkcd._bulk import BulkLoader
+from xxkcd._snapshot import Snapshot, SnapshotWriter, DECODED
+from xxkcd._util import replace
+from xxkcd.xkcd import _decode_from, _transcript_source
 
 
 def get_raw_json(n):
-    return dict(xxkcd.xkcd(n)._raw_json)
-
-
-PREFIX = '# coding: utf-8\n\nfrom __future__ import unicode_literals\n\ncache = '
-SUFFIX = '\n'
+    comic = xxkcd.xkcd(n)
+    if n == 404:
+        return dict(comic._raw_json)
+    # Not `._raw_json`, which would come from the bundled cache
+    return dict(comic._fetch_raw_json())
+
+
+def stream_snapshot(file, numbers, fetched, old, decode=True):
+    """
+    Write a snapshot of the comics in `numbers`, taking the raw JSON from
+    `fetched` or else `old`, one record at a time.
+
+    Decoded JSON is reused from `old` unless the comic or the comic with its
+    transcript was fetched.
+
+    :param file: Seekable binary file to write to
+    :param List[int] numbers: Every comic to write, in ascending order
+    :param Dict[int, dict] fetched: Raw JSON that was downloaded
+    :param Optional[Snapshot] old: The existing snapshot, or None
+    :param bool decode: Also write the decoded JSON
+    :raises ValueError: A comic in `numbers` is in neither `fetched` nor `old`
+    """
+    latest = numbers[-1] if numbers else 0
+
+    def get_raw_json(n):
+        raw_json = fetched.get(n)
+        if raw_json is None and old is not None:
+            raw_json = old.get(n)
+        return raw_json
+
+    with SnapshotWriter(file, DECODED if decode else 0) as writer:
+        for n in numbers:
+            raw_json = fetched.get(n)
+            decoded = None
+            if raw_json is None:
+                record = None if old is None else old.record(n)
+                if record is None:
+                    raise ValueError('Comic {} was not downloaded and is not in the existing cache'.format(n))
+                raw_json, decoded = record
+            if not decode:
+                decoded = None
+            elif decoded is None or n in fetched or _transcript_source(n) in fetched:
+                decoded = _decode_from(n, raw_json, get_raw_json, latest)
+            writer.add(n, raw_json, decoded)
+
+
+class Timer(object):
+    """Prints how long each phase takes to stderr"""
+
+    def __init__(self):
+        self.start = time.time()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.time()
+        yield
+        sys.stderr.write('{:<8} {:8.3f}s\n'.format(name, time.time() - start))
+
+    def total(self):
+        sys.stderr.write('{:<8} {:8.3f}s\n'.format('total', time.time() - self.start))
 
 
 def main(argv=None):
     if argv is None:
         argv = sys.argv[1:]
     current_directory = os.path.dirname(os.path.realpath(__file__))
-    default_output_file = os.path.join(current_directory, os.pardir, 'xxkcd', '_cache.py')
+    default_output_file = os.path.join(current_directory, os.pardir, 'xxkcd', '_cache.bin')
 
-    parser = argparse.ArgumentParser(prog='rebuild_cache', description='Regenerates xxkcd._cache')
+    parser = argparse.ArgumentParser(prog='rebuild_cache', description='Regenerates the cache bundled with xxkcd')
     parser.add_argument('file', nargs='?', default=default_output_file, help='Where to write the file to')
-    parser.add_argument('-p', '--procs', default=4, type=int, help='If positive, how many processes to use. Else single threaded.')
+    parser.add_argument('--raw', action='store_true', help='Only write the raw JSON, not the decoded JSON too')
+    parser.add_argument('--base', help='The existing cache to update. Defaults to the output file.')
+    parser.add_argument('--full', action='store_true', help='Download every comic, ignoring the existing cache')
+    parser.add_argument('--recheck', default=10, type=int, help='Download the newest comics in the existing cache again in case they changed')
+    parser.add_argument('-c', '--concurrency', '-p', '--procs', default=16, type=int, help='How many comics to download at once')
 
     args = parser.parse_args(argv)
-
-    range = xxkcd.xkcd.range()
-    if args.procs > 0:
-        pool = multiprocessing.Pool(args.procs)
-        raw_json_list = pool.map(get_raw_json, map(xxkcd.xkcd, range))
-        pool.close()
-        pool.join()
-    else:
-        raw_json_list = map(get_raw_json, range)
-
-    raw_json_dict = dict(zip(range, raw_json_list))
-
-    if args.file != '-':
-        with open(args.file, 'w', encoding='utf-8') as f:
-            f.write(PREFIX)
-            f.write(repr(raw_json_dict))
-            f.write(SUFFIX)
-    else:
-        # Don't want to close stdin
-        print(end=PREFIX)
-        print(end=repr(raw_json_dict))
-        print(end=SUFFIX)
-
+    timer = Timer()
+
+    base = args.base
+    if base is None and args.file != '-' and os.path.exists(args.file):
+        base = args.file
+    old = None
+    with timer.phase('open'):
+        if base is not None and not args.full:
+            old = Snapshot(base)
+            existing = old.numbers()
+        else:
+            existing = frozenset()
+
+    try:
+        with timer.phase('latest'):
+            latest = xxkcd.xkcd.latest()
+            numbers = list(range(1, latest + 1))
+
+        to_fetch = [n for n in numbers if n not in existing]
+        to_fetch.extend(sorted(existing)[-args.recheck:] if args.recheck > 0 else ())
+        with timer.phase('fetch'):
+            loader = BulkLoader(concurrency=args.concurrency, errors='retry')
+            fetched = dict(loader.imap(get_raw_json, to_fetch))
+        changed = [n for n in fetched if n not in existing or old.get(n) != fetched[n]]
+        sys.stderr.write('Downloaded {} comics, {} new or changed\n'.format(len(fetched), len(changed)))
+
+        with timer.phase('write'):
+            if args.file == '-':
+                # The snapshot has to be written to a seekable file first
+                f = io.BytesIO()
+                stream_snapshot(f, numbers, fetched, old, not args.raw)
+                getattr(sys.stdout, 'buffer', sys.stdout).write(f.getvalue())
+            else:
+                temp = args.file + '.tmp'
+                with open(temp, 'wb') as f:
+                    stream_snapshot(f, numbers, fetched, old, not args.raw)
+                if old is not None:
+                    # The old snapshot can't be replaced while it is open on Windows
+                    old.close()
+                    old = None
+                replace(temp, args.file)
+    finally:
+        if old is not None:
+            old.close()
+
+    timer.total()
     return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -55,13 +55,18 @@ setup_args = dict(
 
     keywords=['xkcd', 'api', 'wrapper', 'what-if'],
 
-    packages=find_packages(exclude=['contrib', 'docs', 'tests', 'examples']),
+    packages=find_packages(exclude=['contrib', 'docs', 'tests', 'examples', 'benchmarks']),
+    package_data={'xxkcd': ['_cache.bin']},
 
     install_requires=[
         'objecttools>=1.0.1'
     ],
-    extras_require={},
-    entry_points={},
+    extras_require={
+        'numpy': ['numpy']
+    },
+    entry_points={
+        'console_scripts': ['xxkcd = xxkcd.cli:main'],
+    },
 
     test_suite='tests'
 )
@@ -1 +1,6 @@
-from . import test_xkcd
+import sys
+
+from . import test_xkcd, test_store, test_snapshot, test_bulk, test_transport, test_search, test_table, test_comic, test_dates, test_mirror, test_images, test_policy, test_what_if, test_replay, test_metrics, test_lru, test_cli, test_proxy
+
+if sys.version_info >= (3, 7):
+    from . import test_aio
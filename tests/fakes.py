@@ -0,0 +1,106 @@
+# coding: utf-8
+"""Openers that serve the xkcd JSON API without a network connection"""
+
+import io
+import json
+import threading
+
+
+class FakeOpener(object):
+    """Serves made up comic JSON for comics up to `latest` and records each url requested"""
+    calls = []
+    latest = 2000
+    fail = {}
+    _lock = threading.Lock()
+
+    def __init__(self, url):
+        with FakeOpener._lock:
+            FakeOpener.calls.append(url)
+        number = url.rstrip('/').split('/')[-2]
+        number = self.latest if number == 'xkcd.com' else int(number)
+        failures = FakeOpener.fail.get(number, 0)
+        if failures:
+            FakeOpener.fail[number] = failures - 1
+            raise IOError('Simulated failure for {}'.format(number))
+        self._data = io.BytesIO(json.dumps({
+            'month': '1', 'num': number, 'link': '', 'year': '2018', 'news': '',
+            'safe_title': 'Comic {}'.format(number), 'transcript': '', 'alt': '',
+            'img': '', 'title': 'Comic {}'.format(number), 'day': '1'
+        }).encode('utf-8'))
+
+    def read(self, n=-1):
+        return self._data.read(n)
+
+    def close(self):
+        pass
+
+    @classmethod
+    def reset(cls):
+        del cls.calls[:]
+        cls.fail.clear()
+        cls.latest = 2000
+
+
+class LocalServer(object):
+    """
+    A threaded HTTP/1.1 server on localhost serving fixed responses.
+
+    `routes` maps a path to `(status, headers, body)` or to a function of
+    the request handler returning that.
+    """
+
+    def __init__(self, routes):
+        try:
+            from http.server import BaseHTTPRequestHandler, HTTPServer
+            from socketserver import ThreadingMixIn
+        except ImportError:
+            from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+            from SocketServer import ThreadingMixIn
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                with server.lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests.append((self.path, dict(self.headers.items())))
+                route = server.routes.get(self.path.split('?')[0], (404, {}, b'Not found'))
+                if callable(route):
+                    route = route(self)
+                status, headers, body = route
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self.routes = routes
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = []
+        self.httpd = Server(('127.0.0.1', 0), Handler)
+        self.base = 'http://127.0.0.1:{}'.format(self.httpd.server_address[1])
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
@@ -0,0 +1,120 @@
+# coding: utf-8
+
+import json
+import asyncio
+import functools
+import unittest
+
+from xxkcd import xkcd
+from xxkcd.aio import AsyncXkcd, fetch
+from xxkcd._snapshot import Snapshot
+
+
+def should_not_call(url):
+    raise AssertionError('Blocking urlopen called for {}'.format(url))
+
+
+xkcdAio = xkcd.with_opener(should_not_call, 'xkcdAio', __name__)
+
+LATEST = 1700
+
+
+def comic_json(snapshot, n):
+    """The comic from the snapshot, or made up for comics after the snapshot"""
+    if n in snapshot.numbers():
+        return snapshot[n]
+    raw_json = dict(snapshot[max(snapshot.numbers())])
+    raw_json['num'] = n
+    return raw_json
+
+
+async def serve(snapshot, requests, latest, reader, writer):
+    path = (await reader.readline()).split()[1].decode('ascii')
+    while (await reader.readline()) not in (b'\r\n', b''):
+        pass
+    requests.append(path)
+    parts = path.strip('/').split('/')
+    if parts == ['info.0.json']:
+        body, status = json.dumps(comic_json(snapshot, latest)).encode('utf-8'), b'200 OK'
+    elif len(parts) == 2 and parts[1] == 'info.0.json' and int(parts[0]) <= latest:
+        body, status = json.dumps(comic_json(snapshot, int(parts[0]))).encode('utf-8'), b'200 OK'
+    else:
+        body, status = b'Not found', b'404 Not Found'
+    writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Length: ' + str(len(body)).encode('ascii') + b'\r\n\r\n' + body)
+    await writer.drain()
+    writer.close()
+
+
+class TestAsyncXkcd(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = Snapshot()
+        self.requests = []
+
+    def tearDown(self):
+        self.snapshot.close()
+        xkcdAio.delete_all()
+
+    def run_with_server(self, test, latest=LATEST):
+        async def main():
+            server = await asyncio.start_server(
+                functools.partial(serve, self.snapshot, self.requests, latest), '127.0.0.1', 0
+            )
+            base = 'http://127.0.0.1:{}'.format(server.sockets[0].getsockname()[1])
+
+            def local_fetch(url):
+                return fetch(url.replace('https://xkcd.com', base))
+
+            try:
+                return await test(AsyncXkcd(xkcdAio, concurrency=4, fetch=local_fetch))
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        return asyncio.run(main())
+
+    def test_get(self):
+        async def test(client):
+            comic = await client.get(353)
+            self.assertIs(comic, xkcdAio(353))
+            self.assertEqual(comic.title, u'Python')
+            self.assertEqual(await client.latest(), LATEST)
+            self.assertIs(await client.get(-1), xkcdAio(LATEST))
+            # 0 is the latest comic, like for the constructor
+            self.assertIs(await client.get(0), xkcdAio(None))
+            self.assertEqual((await client.json(1609))['transcript'][:7], u'Figure:')
+
+        self.run_with_server(test)
+        self.assertEqual(len(self.requests), len(set(self.requests)), 'Comic requested twice')
+        self.assertNotIn('/0/info.0.json', self.requests)
+
+    def test_after_last_latest(self):
+        async def test(client):
+            self.assertEqual(await client.latest(), 2150)
+            xkcdAio.latest_ttl = 0
+            try:
+                self.assertEqual(await client.latest(), 2150)
+                # Without the blocking `xkcdAio.latest()`
+                self.assertEqual((await client.get(2140)).comic, 2140)
+                self.assertEqual((await client.get(2150))._raw_json['num'], 2150)
+            finally:
+                xkcdAio.latest_ttl = xkcd.latest_ttl
+
+        self.run_with_server(test, latest=2150)
+        # Checked for again every time after the first, with a latest_ttl of 0
+        self.assertEqual(self.requests.count('/info.0.json'), 4)
+
+    def test_gather(self):
+        async def test(client):
+            comics = await client.gather([5, 3, 4], keep_alive=True)
+            self.assertEqual([comic.comic for comic in comics], [5, 3, 4])
+            self.assertIn(3, xkcdAio._keep_alive)
+            self.assertEqual([comic.comic async for comic in client.range(-5)], list(range(LATEST - 4, LATEST + 1)))
+
+        self.run_with_server(test)
+
+    def test_error(self):
+        async def test(client):
+            with self.assertRaises(IOError):
+                await fetch('http://127.0.0.1:1/')
+
+        self.run_with_server(test)
@@ -0,0 +1,181 @@
+# coding: utf-8
+
+import threading
+import unittest
+
+from xxkcd import xkcd, load_xkcd_cache
+from xxkcd._bulk import BulkLoader
+
+from .fakes import FakeOpener
+
+
+xkcdBulk = xkcd.with_opener(FakeOpener, 'xkcdBulk', __name__)
+
+
+class ThreadOpener(FakeOpener):
+    """Records the thread each url is requested on"""
+    threads = []
+
+    def __init__(self, url):
+        ThreadOpener.threads.append((url, threading.current_thread()))
+        FakeOpener.__init__(self, url)
+
+
+xkcdThreads = xkcd.with_opener(ThreadOpener, 'xkcdThreads', __name__)
+
+
+class TestBulkLoader(unittest.TestCase):
+    def setUp(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 40
+
+    def tearDown(self):
+        xkcdBulk.delete_all()
+
+    def test_load_all(self):
+        progress = []
+        failed = xkcdBulk.load_all(concurrency=8, progress=lambda *args: progress.append(args))
+        self.assertEqual(failed, {})
+        self.assertEqual(sorted(p[2] for p in progress), list(range(1, 41)))
+        self.assertEqual(progress[-1][:2], (40, 40))
+        for n in range(1, 41):
+            self.assertEqual(xkcdBulk(n)._raw_json['num'], n, 'Comic assigned to the wrong number')
+        calls = len(FakeOpener.calls)
+        xkcdBulk.load_all(concurrency=8)
+        self.assertEqual(len(FakeOpener.calls), calls, 'Loaded comics were downloaded again')
+
+    def test_skip(self):
+        FakeOpener.fail[7] = 10
+        failed = xkcdBulk.load_all(concurrency=4, errors='skip')
+        self.assertEqual(list(failed), [7])
+        self.assertFalse(xkcdBulk._raw_json.is_cached(xkcdBulk(7)))
+        self.assertTrue(xkcdBulk._raw_json.is_cached(xkcdBulk(8)))
+
+    def test_raise(self):
+        FakeOpener.fail[7] = 1
+        with self.assertRaises(IOError):
+            xkcdBulk.load_all(concurrency=4)
+
+    def test_retry(self):
+        FakeOpener.fail[3] = 2
+        _, failed = xkcdBulk._load_many(range(1, 6), errors='retry', retries=2, backoff=0, concurrency=2)
+        self.assertEqual(failed, {})
+        self.assertEqual(BulkLoader(errors='retry', retries=0).map(abs, [-1, 2]), {-1: 1, 2: 2})
+
+    def test_sync(self):
+        FakeOpener.latest = 10
+        xkcdBulk.load_all(concurrency=4)
+        FakeOpener.latest = 14
+        del FakeOpener.calls[:]
+        self.assertEqual(xkcdBulk.sync(), [11, 12, 13, 14])
+        self.assertEqual(len(FakeOpener.calls), 4, 'Comics that were already cached were requested')
+        self.assertEqual(xkcdBulk.latest(), 14)
+        self.assertEqual(xkcdBulk.sync(), [])
+
+    def test_sync_404(self):
+        FakeOpener.latest = 406
+        self.assertEqual(xkcdBulk.sync(concurrency=8), [n for n in range(1, 407) if n != 404])
+        self.assertNotIn('https://xkcd.com/404/info.0.json', FakeOpener.calls)
+
+
+class TestMany(unittest.TestCase):
+    def setUp(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 40
+        self.snapshot = xkcd._snapshot
+
+    def tearDown(self):
+        xkcdBulk.delete_all()
+        # Undo `load_xkcd_cache()`
+        xkcd.delete_all()
+        if xkcd._snapshot is not self.snapshot:
+            xkcd._snapshot.close()
+            xkcd._snapshot = self.snapshot
+
+    def test_many(self):
+        kept = xkcdBulk(3, keep_alive=True)
+        kept._raw_json
+        del FakeOpener.calls[:]
+        comics = xkcdBulk.many([5, 3, 5, 1, -1], concurrency=4)
+        self.assertEqual([comic.comic for comic in comics], [5, 3, 5, 1, 40])
+        self.assertIs(comics[1], kept)
+        self.assertIs(comics[0], comics[2])
+        self.assertTrue(all(xkcdBulk._raw_json.is_cached(comic) for comic in comics))
+        # The latest comic is found for -1
+        self.assertEqual(sorted(FakeOpener.calls), sorted(
+            ['https://xkcd.com/info.0.json'] + ['https://xkcd.com/{}/info.0.json'.format(n) for n in (1, 5, 40)]
+        ))
+
+    def test_skip(self):
+        FakeOpener.fail[2] = 10
+        comics = xkcdBulk.many([1, 2, 3], errors='skip')
+        self.assertIsNone(comics[1])
+        self.assertEqual(comics[2].comic, 3)
+
+    def test_fields(self):
+        self.assertEqual(xkcdBulk.fields('title', numbers=[2, 1]), ['Comic 2', 'Comic 1'])
+        self.assertEqual(
+            xkcdBulk.fields('num', 'month', numbers=[404, 7], concurrency=2),
+            [(404, 4), (7, 1)]
+        )
+        with self.assertRaises(ValueError):
+            xkcdBulk.fields('date', numbers=[1])
+
+    def test_fields_after_last_latest(self):
+        FakeOpener.latest = 2300
+        del ThreadOpener.threads[:]
+        try:
+            self.assertEqual(xkcdThreads.fields('transcript', numbers=range(2200, 2210), concurrency=4), [''] * 10)
+        finally:
+            xkcdThreads.delete_all()
+        # Only the latest comic, and not the comics with the transcripts one at a time
+        main = threading.current_thread()
+        self.assertEqual([url for url, thread in ThreadOpener.threads if thread is main], ['https://xkcd.com/info.0.json'])
+        self.assertEqual(len(ThreadOpener.threads), 14)
+
+    def test_fields_cached(self):
+        load_xkcd_cache()
+        numbers = [1, 124, 1608, 1700, 2000]
+        calls = len(FakeOpener.calls)
+        expected = [(xkcd(n).title, xkcd(n).alt, xkcd(n).transcript) for n in numbers]
+        self.assertEqual(xkcd.fields('title', 'alt', 'transcript', numbers=numbers), expected)
+        self.assertEqual(len(FakeOpener.calls), calls)
+
+
+class TestReadAhead(unittest.TestCase):
+    def setUp(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 40
+
+    def tearDown(self):
+        xkcdBulk.read_ahead = 0
+        xkcdBulk.delete_all()
+
+    def test_prefetch(self):
+        comics = list(xkcdBulk.prefetch([3, 1, 2], window=2))
+        self.assertEqual([comic.comic for comic in comics], [3, 1, 2])
+        self.assertTrue(all(xkcdBulk._raw_json.is_cached(comic) for comic in comics))
+
+    def test_stops(self):
+        for comic in xkcdBulk.prefetch(range(1, 41), window=4):
+            if comic.comic == 2:
+                break
+        # 2 used, and at most 5 ahead of the first
+        self.assertLessEqual(len(FakeOpener.calls), 7)
+
+    def test_failure(self):
+        FakeOpener.fail[2] = 1
+        comics = list(xkcdBulk.prefetch([1, 2, 3], window=2))
+        self.assertFalse(xkcdBulk._raw_json.is_cached(comics[1]))
+        self.assertEqual(comics[1].title, 'Comic 2')
+
+    def test_iteration(self):
+        xkcdBulk.read_ahead = 3
+        self.assertEqual([comic.comic for comic in xkcdBulk(37)], [37, 38, 39, 40])
+        self.assertEqual([comic.comic for comic in reversed(xkcdBulk(4))], [3, 2, 1])
+        numbers = []
+        for n in xkcdBulk.range(30):
+            numbers.append(n)
+            self.assertTrue(xkcdBulk._raw_json.is_cached(xkcdBulk(n)))
+        self.assertEqual(numbers, list(range(30, 41)))
+        self.assertEqual(xkcdBulk.range(1, 5, read_ahead=0), range(1, 5))
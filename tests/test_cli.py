@@ -0,0 +1,106 @@
+# coding: utf-8
+
+import io
+import os
+import sys
+import csv
+import json
+import shutil
+import tempfile
+import unittest
+
+from xxkcd import xkcd, policy
+from xxkcd.cli import main, _parse_numbers
+
+from .fakes import FakeOpener, LocalServer
+from .test_what_if import ARCHIVE, ARTICLE, LocalOpener, WhatIfLocal
+
+xkcdCli = xkcd.with_opener(FakeOpener, 'xkcdCli', __name__)
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 20
+        self.directory = tempfile.mkdtemp()
+        self.stores = xkcdCli.store, WhatIfLocal.store
+        self.stdout, self.stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = io.BytesIO() if str is bytes else io.StringIO(), io.StringIO()
+
+    def tearDown(self):
+        sys.stdout, sys.stderr = self.stdout, self.stderr
+        xkcdCli.delete_all()
+        # `--store` sets both
+        if xkcdCli.store is not self.stores[0]:
+            xkcdCli.store.close()
+        xkcdCli.store, WhatIfLocal.store = self.stores
+        shutil.rmtree(self.directory)
+
+    def run_cli(self, *argv):
+        status = main(list(argv) + ['--no-bundled'], xkcdCli, WhatIfLocal)
+        output = sys.stdout.getvalue()
+        if isinstance(output, bytes):
+            output = output.decode('utf-8')
+        return status, output
+
+    def test_get(self):
+        status, output = self.run_cli('get', '3', '5-7', 'latest', '-f', 'num', '-f', 'title')
+        self.assertEqual(status, 0)
+        records = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([record['num'] for record in records], [3, 5, 6, 7, 20])
+        self.assertEqual(records[0], {'num': 3, 'title': 'Comic 3'})
+
+    def test_failed(self):
+        FakeOpener.fail[6] = 10
+        status, output = self.run_cli('get', '5-7', '-c', '2')
+        self.assertEqual(status, 1)
+        self.assertEqual([json.loads(line)['num'] for line in output.splitlines()], [5, 7])
+        self.assertIn('6', sys.stderr.getvalue())
+
+    def test_export_csv(self):
+        path = os.path.join(self.directory, 'comics.csv')
+        status, _ = self.run_cli('export', '--format', 'csv', '-f', 'num', '-f', 'year', '-o', path)
+        self.assertEqual(status, 0)
+        with open(path) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ['num', 'year'])
+        self.assertEqual(len(rows), 21)
+        self.assertEqual(rows[1:3], [['1', '2018'], ['2', '2018']])
+
+    def test_sync(self):
+        self.assertEqual(self.run_cli('sync')[0], 2)
+        store = os.path.join(self.directory, 'store.sqlite3')
+        status, _ = self.run_cli('sync', '--store', store, '--rate', '1000')
+        self.assertEqual(status, 0)
+        self.assertEqual(xkcdCli.store.keys('xkcd'), list(range(1, 21)))
+        self.assertIsNone(policy.default_policy.limiter)
+
+    def test_search(self):
+        xkcdCli.load_all(concurrency=4)
+        status, output = self.run_cli('search', 'title:"comic 12"')
+        self.assertEqual(status, 0)
+        self.assertEqual(output.splitlines()[0], u'12\tComic 12')
+
+    def test_what_if(self):
+        routes = {
+            '/archive/': (200, {}, ARCHIVE.encode('utf-8')),
+            '/2/': (200, {}, ARTICLE.encode('utf-8')),
+        }
+        with LocalServer(routes) as server:
+            LocalOpener.base = server.base
+            try:
+                status, output = self.run_cli('what-if', '2', 'latest', '--full')
+            finally:
+                WhatIfLocal(2).delete()
+                WhatIfLocal.archive.delete()
+                LocalOpener.pool.clear()
+        self.assertEqual(status, 0)
+        records = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([record['number'] for record in records], [2, 2])
+        self.assertEqual(records[0]['date'], '2012-07-17')
+        self.assertEqual(records[0]['question'], u'What if a glass of water was, quite literally, half empty?')
+        # Both are the same article, so it is only downloaded once
+        self.assertEqual([path for path, _ in server.requests], ['/archive/', '/2/'])
+
+    def test_parse_numbers(self):
+        self.assertEqual(_parse_numbers(['1', '-2', 'latest', '4-6', '9-'], lambda: 10), [1, -2, None, 4, 5, 6, 9, 10])
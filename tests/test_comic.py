@@ -0,0 +1,46 @@
+# coding: utf-8
+
+import pickle
+import unittest
+
+from xxkcd.comic import Comic
+
+RAW_JSON = {
+    'month': '3', 'num': 1, 'link': '', 'year': '2006', 'news': '', 'safe_title': 'Barrel',
+    'transcript': '', 'alt': 'Alt', 'img': '', 'title': 'Barrel', 'day': '1', 'extra_parts': {'pre': ''}
+}
+
+
+class TestComic(unittest.TestCase):
+    def test_mapping(self):
+        comic = Comic(RAW_JSON)
+        self.assertEqual(comic, RAW_JSON)
+        self.assertEqual(dict(comic), RAW_JSON)
+        self.assertEqual(len(comic), len(RAW_JSON))
+        self.assertEqual(comic['extra_parts'], {'pre': ''})
+        self.assertIn('title', comic)
+        self.assertNotIn('nothing', comic)
+        self.assertIsNone(comic.get('nothing'))
+        self.assertRaises(KeyError, lambda: comic['nothing'])
+        self.assertEqual(Comic({'num': 2}), {'num': 2})
+
+    def test_immutable(self):
+        comic = Comic(RAW_JSON)
+        self.assertFalse(hasattr(comic, '__setitem__'))
+        with self.assertRaises(AttributeError):
+            comic.title = ''
+        copy = comic.copy()
+        copy['title'] = ''
+        self.assertEqual(comic['title'], 'Barrel')
+
+    def test_shared(self):
+        first = Comic(RAW_JSON)
+        second = Comic(dict(RAW_JSON, num=2, day=''.join(['1'])))
+        self.assertIs(first['day'], second['day'])
+        self.assertIs(first['safe_title'], first['title'])
+        decoded = Comic(dict(RAW_JSON, alt=''.join(['Al', 't'])), first)
+        self.assertIs(decoded['alt'], first['alt'])
+
+    def test_pickle(self):
+        comic = Comic(RAW_JSON)
+        self.assertEqual(pickle.loads(pickle.dumps(comic)), comic)
@@ -0,0 +1,85 @@
+# coding: utf-8
+
+import datetime
+import unittest
+
+from xxkcd import xkcd, load_xkcd_cache
+from xxkcd.dates import DateIndex
+
+from .fakes import FakeOpener
+
+xkcdDates = xkcd.with_opener(FakeOpener, 'xkcdDates', __name__)
+
+DATES = {
+    1: datetime.date(2006, 1, 1),
+    2: datetime.date(2006, 1, 1),
+    3: datetime.date(2006, 1, 4),
+    4: datetime.date(2006, 1, 9),
+}
+
+
+class TestDateIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = DateIndex()
+        self.index.update(DATES.items())
+
+    def test_between(self):
+        self.assertEqual(self.index.between(datetime.date(2006, 1, 1), datetime.date(2006, 1, 4)), [1, 2, 3])
+        self.assertEqual(self.index.between(datetime.date(2006, 1, 2)), [3, 4])
+        self.assertEqual(self.index.between(end=datetime.date(2005, 1, 1)), [])
+        self.assertEqual(self.index.on(datetime.date(2006, 1, 1)), [1, 2])
+
+    def test_nearest(self):
+        self.assertEqual(self.index.nearest(datetime.date(2006, 1, 2)), 1)
+        self.assertEqual(self.index.nearest(datetime.date(2006, 1, 7)), 4)
+        self.assertEqual(self.index.nearest(datetime.date(2006, 1, 4)), 3)
+        self.assertEqual(self.index.nearest(datetime.date(2020, 1, 1)), 4)
+        self.assertIsNone(DateIndex().nearest(datetime.date(2006, 1, 1)))
+
+    def test_incremental(self):
+        self.index.add(3, datetime.date(2006, 1, 10))
+        self.assertEqual(self.index.between(datetime.date(2006, 1, 2)), [4, 3])
+        self.index.remove(4)
+        self.assertEqual(self.index.date(3), datetime.date(2006, 1, 10))
+        self.assertEqual(len(self.index), 3)
+
+    def test_xkcd(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 5
+        try:
+            self.assertEqual(xkcdDates.between(), [])
+            comic = xkcdDates(3)
+            comic._raw_json
+            self.assertEqual(xkcdDates.on(datetime.date(2018, 1, 1)), [comic])
+            xkcdDates.load_all()
+            self.assertEqual(len(xkcdDates.between(datetime.date(2018, 1, 1))), 5)
+        finally:
+            xkcdDates.delete_all()
+
+    def test_404(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 406
+        loads = []
+        cached_raw_json = xkcdDates._cached_raw_json
+
+        def counted(numbers=None):
+            loads.append(numbers)
+            return cached_raw_json(numbers)
+
+        xkcdDates._cached_raw_json = counted
+        try:
+            comics = xkcdDates.many(range(400, 407))
+            self.assertEqual(xkcdDates.between(), [comic for comic in comics if comic.comic != 404])
+            self.assertEqual(len(loads), 1)
+            xkcdDates.between()
+            self.assertEqual(len(loads), 1, 'Comics were looked for again')
+        finally:
+            del xkcdDates._cached_raw_json
+            xkcdDates._date_index = None
+            xkcdDates.delete_all()
+
+    def test_bundled(self):
+        load_xkcd_cache()
+        march = xkcd.between(datetime.date(2014, 3, 1), datetime.date(2014, 3, 31))
+        self.assertEqual([comic.comic for comic in march], list(range(1337, 1350)))
+        self.assertEqual(xkcd.nearest(datetime.date(2014, 3, 2)), xkcd(1337))
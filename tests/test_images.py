@@ -0,0 +1,67 @@
+# coding: utf-8
+
+import struct
+import contextlib
+import unittest
+
+from xxkcd.images import ImageInfo, parse_header, read_info
+from xxkcd.transport import ConnectionPool
+
+from .fakes import LocalServer
+
+PNG = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', 740, 320) + b'\x08\x06' + b'\0' * 5000
+GIF = b'GIF89a' + struct.pack('<HH', 400, 300) + b'\0' * 100
+JPEG = (
+    b'\xff\xd8' + b'\xff\xe1' + struct.pack('>H', 6000) + b'\0' * 5998 +
+    b'\xff\xc0' + struct.pack('>HBHH', 17, 8, 480, 640) + b'\0' * 1000 + b'\xff\xd9'
+)
+
+
+class TestParseHeader(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_header(PNG), ImageInfo('png', 740, 320))
+        self.assertEqual(parse_header(GIF), ImageInfo('gif', 400, 300))
+        self.assertEqual(parse_header(JPEG), ImageInfo('jpeg', 640, 480))
+
+    def test_truncated(self):
+        self.assertIsNone(parse_header(PNG[:20]))
+        self.assertIsNone(parse_header(GIF[:8]))
+        self.assertIsNone(parse_header(JPEG[:4096]))
+        self.assertIsNone(parse_header(b'\x89P'))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_header, b'<html></html>')
+        self.assertRaises(ValueError, parse_header, b'\xff\xd8\xff\xda\0\0')
+
+
+class TestReadInfo(unittest.TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.clear()
+
+    def route(self, body):
+        def route(handler):
+            requested = handler.headers.get('Range')
+            if requested is None:
+                return 200, {}, body
+            start, end = map(int, requested[len('bytes='):].split('-'))
+            return 206, {'Content-Range': 'bytes {}-{}/{}'.format(start, end, len(body))}, body[start:end + 1]
+        return route
+
+    def test_range(self):
+        with LocalServer({'/a.png': self.route(PNG), '/a.jpg': self.route(JPEG)}) as server:
+            self.assertEqual(read_info(self.pool, server.base + '/a.png'), ImageInfo('png', 740, 320))
+            self.assertEqual(read_info(self.pool, server.base + '/a.jpg'), ImageInfo('jpeg', 640, 480))
+            ranges = [headers.get('Range') for _, headers in server.requests]
+            self.assertEqual(ranges, ['bytes=0-4095', 'bytes=0-4095', 'bytes=4096-16383'])
+            self.assertEqual(server.connections, 1)
+
+    def test_without_range(self):
+        def urlopen(url):
+            return contextlib.closing(self.pool.urlopen(url))
+
+        with LocalServer({'/a.gif': (200, {}, GIF), '/a.txt': (200, {}, b'text')}) as server:
+            self.assertEqual(read_info(urlopen, server.base + '/a.gif'), ImageInfo('gif', 400, 300))
+            self.assertRaises(ValueError, read_info, urlopen, server.base + '/a.txt')
@@ -0,0 +1,84 @@
+# coding: utf-8
+
+import gc
+import unittest
+
+from xxkcd import xkcd
+from xxkcd._lru import KeepAlive, approximate_size
+
+from .fakes import FakeOpener
+
+xkcdLimited = xkcd.with_opener(FakeOpener, 'xkcdLimited', __name__)
+
+
+class Blob(object):
+    def __init__(self, size):
+        self.data = b'\0' * size
+
+
+class TestKeepAlive(unittest.TestCase):
+    def test_max_entries(self):
+        keep_alive = KeepAlive(max_entries=3)
+        for key in 'abcd':
+            keep_alive[key] = key
+        self.assertEqual(keep_alive.keys(), ['b', 'c', 'd'])
+        keep_alive.touch('b')
+        keep_alive['e'] = 'e'
+        self.assertEqual(keep_alive.keys(), ['d', 'b', 'e'])
+        keep_alive['d'] = 'd'
+        self.assertEqual(keep_alive.keys(), ['b', 'e', 'd'])
+
+    def test_max_bytes(self):
+        keep_alive = KeepAlive(max_bytes=25000)
+        for key in range(5):
+            keep_alive[key] = Blob(10000)
+        self.assertEqual(keep_alive.keys(), [3, 4])
+        self.assertLessEqual(keep_alive.total_bytes, 25000)
+        keep_alive.pop(3)
+        self.assertEqual(keep_alive.total_bytes, approximate_size(keep_alive[4]))
+
+    def test_grows_after_added(self):
+        keep_alive = KeepAlive(max_bytes=25000)
+        blob = keep_alive['a'] = Blob(0)
+        blob.data = b'\0' * 20000
+        # Measured again when the next entry is added
+        keep_alive['b'] = Blob(10000)
+        self.assertEqual(keep_alive.keys(), ['b'])
+
+    def test_set_limits(self):
+        keep_alive = KeepAlive()
+        for key in range(10):
+            keep_alive[key] = key
+        keep_alive.set_limits(max_entries=4)
+        self.assertEqual(keep_alive.keys(), [6, 7, 8, 9])
+        keep_alive.set_limits()
+        for key in range(10):
+            keep_alive[key] = key
+        self.assertEqual(len(keep_alive), 10)
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 50
+
+    def tearDown(self):
+        xkcdLimited.limit_keep_alive()
+        xkcdLimited.delete_all()
+
+    def test_limit(self):
+        xkcdLimited.limit_keep_alive(max_entries=10)
+        xkcdLimited.load_all()
+        self.assertEqual(len(xkcdLimited._keep_alive), 10)
+        gc.collect()
+        # Dead weak references are removed
+        self.assertEqual(set(xkcdLimited._cache), set(xkcdLimited._keep_alive))
+
+    def test_recently_used(self):
+        xkcdLimited.limit_keep_alive(max_entries=2)
+        first = xkcdLimited(1, keep_alive=True)
+        xkcdLimited(2, keep_alive=True)
+        xkcdLimited(1)
+        xkcdLimited(3, keep_alive=True)
+        self.assertEqual(xkcdLimited._keep_alive.keys(), [1, 3])
+        self.assertIs(xkcdLimited._keep_alive[1], first)
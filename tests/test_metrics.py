@@ -0,0 +1,89 @@
+# coding: utf-8
+
+import io
+import unittest
+
+from xxkcd import xkcd, WhatIf, metrics
+from xxkcd.metrics import Metrics, Histogram, url_kind
+
+from .fakes import FakeOpener
+from .test_what_if import ARCHIVE
+
+xkcdMeasured = xkcd.with_opener(FakeOpener, 'xkcdMeasured', __name__)
+
+
+def archive_opener(url):
+    return io.BytesIO(ARCHIVE.encode('utf-8'))
+
+
+WhatIfMeasured = WhatIf.with_opener(archive_opener, 'WhatIfMeasured', __name__)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        FakeOpener.reset()
+        self.events = []
+        self.metrics = metrics.enable(Metrics(hooks=[lambda *event: self.events.append(event)]))
+
+    def tearDown(self):
+        metrics.disable()
+        xkcdMeasured.delete_all()
+        WhatIfMeasured.archive.delete()
+
+    def test_requests(self):
+        comic = xkcdMeasured(1700)
+        comic.json
+        # The transcript of 1700 is in the JSON of 1703
+        self.assertEqual(self.metrics.requests, {'json': 2})
+        self.assertEqual(self.metrics.misses, {'raw_json': 2, 'json': 1})
+        self.assertGreater(self.metrics.bytes['json'], 0)
+        self.assertEqual(self.metrics.latency['json'].count, 2)
+        self.assertEqual([event[:2] for event in self.events], [
+            ('miss', 'raw_json'), ('request', 'json'), ('bytes', 'json'),
+            ('miss', 'json'), ('miss', 'raw_json'), ('request', 'json'), ('bytes', 'json'),
+        ])
+        summary = self.metrics.summary()
+        self.assertEqual(summary['requests']['json']['count'], 2)
+        self.assertEqual(summary['caches']['raw_json'], {'hits': 0, 'misses': 2})
+
+    def test_errors(self):
+        FakeOpener.fail[5] = 1
+        with self.assertRaises(IOError):
+            xkcdMeasured(5)._raw_json
+        self.assertEqual(self.metrics.errors, {'json': 1})
+        self.assertEqual(self.metrics.requests, {'json': 1})
+
+    def test_archive(self):
+        self.assertEqual(len(WhatIfMeasured.archive), 2)
+        WhatIfMeasured.archive.load()
+        self.assertEqual(self.metrics.requests, {'what_if_archive': 1})
+        self.assertEqual(self.metrics.misses, {'archive': 1})
+        self.assertEqual(self.metrics.hits, {'archive': 1})
+        self.assertEqual(self.metrics.hit_rate('archive'), 0.5)
+
+    def test_disabled(self):
+        metrics.disable()
+        xkcdMeasured(1)._raw_json
+        self.assertEqual(self.metrics.requests, {})
+        self.assertEqual(self.events, [])
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantile(self):
+        histogram = Histogram((1, 2, 3))
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in (0.5, 1.5, 1.5, 2.5, 10):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.quantile(0.5), 2)
+        self.assertIsNone(histogram.quantile(1))
+        self.assertEqual(histogram.sum, 16)
+
+    def test_url_kind(self):
+        self.assertEqual(url_kind('https://xkcd.com/info.0.json'), 'latest_json')
+        self.assertEqual(url_kind('https://xkcd.com/1/info.0.json'), 'json')
+        self.assertEqual(url_kind('https://imgs.xkcd.com/comics/barrel_cropped_(1).jpg'), 'image')
+        self.assertEqual(url_kind('https://what-if.xkcd.com/archive/'), 'what_if_archive')
+        self.assertEqual(url_kind('https://what-if.xkcd.com/imgs/a/1/a.png'), 'what_if_image')
+        self.assertEqual(url_kind('https://what-if.xkcd.com/1/'), 'what_if')
+        self.assertEqual(url_kind('https://example.com/'), 'other')
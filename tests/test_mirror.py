@@ -0,0 +1,110 @@
+# coding: utf-8
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from xxkcd import xkcd
+from xxkcd.transport import ConnectionPool
+from xxkcd.images import ImageInfo
+
+from .fakes import LocalServer
+from .test_images import PNG, JPEG
+
+IMAGES = {'/comics/a.png': PNG, '/comics/b.jpg': JPEG}
+IMAGE_OF = {1: '/comics/a.png', 2: '/comics/b.jpg', 3: '/comics/a.png', 4: ''}
+
+
+class MirrorOpener(object):
+    """Sends requests for xkcd.com and imgs.xkcd.com to a `LocalServer`"""
+    conditional = True
+    base = None
+    pool = ConnectionPool()
+
+    def __new__(cls, url, headers=None):
+        for host in ('https://imgs.xkcd.com', 'https://xkcd.com'):
+            url = url.replace(host, cls.base)
+        return cls.pool.urlopen(url, headers)
+
+
+xkcdMirror = xkcd.with_opener(MirrorOpener, 'xkcdMirror', __name__)
+
+
+def json_route(n):
+    img = 'https://imgs.xkcd.com' + IMAGE_OF[n] if IMAGE_OF[n] else ''
+    return 200, {}, json.dumps({
+        'month': '1', 'num': n, 'link': '', 'year': '2018', 'news': '', 'safe_title': str(n),
+        'transcript': '', 'alt': '', 'img': img, 'title': str(n), 'day': '1'
+    }).encode('utf-8')
+
+
+def image_route(path):
+    def route(handler):
+        body = IMAGES[path]
+        requested = handler.headers.get('Range')
+        if requested:
+            start, end = requested[len('bytes='):].split('-')
+            start, end = int(start), int(end or len(body) - 1)
+            return 206, {'Content-Range': 'bytes {}-{}/{}'.format(start, end, len(body))}, body[start:end + 1]
+        return 200, {}, body
+    return route
+
+
+class TestMirror(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        routes = dict(('/{}/info.0.json'.format(n), json_route(n)) for n in IMAGE_OF)
+        routes['/info.0.json'] = json_route(4)
+        routes.update((path, image_route(path)) for path in IMAGES)
+        self.server = LocalServer(routes).__enter__()
+        MirrorOpener.base = self.server.base
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        MirrorOpener.pool.clear()
+        xkcdMirror.delete_all()
+        shutil.rmtree(self.directory)
+
+    def image_requests(self):
+        return [(path, headers) for path, headers in self.server.requests if path.startswith('/comics/')]
+
+    def test_mirror(self):
+        self.assertEqual(xkcdMirror.mirror_images(self.directory, concurrency=2), [1, 2, 3, 4])
+        with open(os.path.join(self.directory, 'manifest.json')) as f:
+            comics = json.load(f)['comics']
+        self.assertEqual(comics['1']['file'], comics['3']['file'])
+        self.assertIsNone(comics['4']['file'])
+        with open(os.path.join(self.directory, comics['2']['file']), 'rb') as f:
+            self.assertEqual(f.read(), IMAGES['/comics/b.jpg'])
+        self.assertEqual(len(os.listdir(os.path.join(self.directory, 'partial'))), 0)
+
+        del self.server.requests[:]
+        self.assertEqual(xkcdMirror.mirror_images(self.directory), [])
+        self.assertEqual(self.image_requests(), [])
+
+    def test_image_infos(self):
+        infos = xkcdMirror.image_infos(concurrency=2)
+        self.assertEqual(sorted(infos), [1, 2, 3, 4])
+        self.assertIsNone(infos[4])
+        self.assertEqual(infos[1], ImageInfo('png', 740, 320))
+        self.assertEqual(infos[2].format, 'jpeg')
+        self.assertEqual(len(self.image_requests()), 4)
+        comic = xkcdMirror(3)
+        self.assertEqual(comic.image_info, infos[1])
+        self.assertEqual(comic.image_info, infos[1])
+        self.assertEqual(len(self.image_requests()), 5)
+
+    def test_resume(self):
+        os.makedirs(os.path.join(self.directory, 'partial'))
+        with open(os.path.join(self.directory, 'partial', '2.part'), 'wb') as f:
+            f.write(IMAGES['/comics/b.jpg'][:500])
+        self.assertEqual(xkcdMirror.mirror_images(self.directory, numbers=[2]), [2])
+        (_, headers), = self.image_requests()
+        self.assertEqual(headers.get('Range'), 'bytes=500-')
+        with open(os.path.join(self.directory, 'manifest.json')) as f:
+            entry = json.load(f)['comics']['2']
+        self.assertEqual(entry['size'], len(IMAGES['/comics/b.jpg']))
+        with open(os.path.join(self.directory, entry['file']), 'rb') as f:
+            self.assertEqual(f.read(), IMAGES['/comics/b.jpg'])
@@ -0,0 +1,65 @@
+# coding: utf-8
+
+import time
+import unittest
+
+from xxkcd.policy import Policy, RateLimiter, CircuitBreaker, CircuitOpenError
+from xxkcd.transport import ConnectionPool
+from xxkcd._util import HTTPError
+
+from .fakes import LocalServer
+
+
+class TestPolicy(unittest.TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool()
+        self.failures = 0
+
+    def tearDown(self):
+        self.pool.clear()
+
+    def flaky(self, handler):
+        if self.failures:
+            self.failures -= 1
+            return 503, {'Retry-After': '0'}, b'Unavailable'
+        return 200, {}, b'OK'
+
+    def get(self, policy, url):
+        with policy.call(url, self.pool.urlopen, url) as http:
+            return http.read()
+
+    def test_retry(self):
+        policy = Policy(retries=2, backoff=0)
+        with LocalServer({'/flaky': self.flaky}) as server:
+            self.failures = 2
+            self.assertEqual(self.get(policy, server.base + '/flaky'), b'OK')
+            self.assertEqual(len(server.requests), 3)
+
+            self.failures = 3
+            with self.assertRaises(HTTPError):
+                self.get(policy, server.base + '/flaky')
+
+            del server.requests[:]
+            with self.assertRaises(HTTPError):
+                self.get(policy, server.base + '/missing')
+            self.assertEqual(len(server.requests), 1, '404 was retried')
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(threshold=2, reset_timeout=0.2)
+        policy = Policy(retries=0, breaker=breaker)
+        with LocalServer({'/flaky': self.flaky}) as server:
+            self.failures = 2
+            for _ in range(2):
+                self.assertRaises(HTTPError, self.get, policy, server.base + '/flaky')
+            self.assertRaises(CircuitOpenError, self.get, policy, server.base + '/flaky')
+            self.assertEqual(len(server.requests), 2)
+            time.sleep(0.2)
+            self.assertEqual(self.get(policy, server.base + '/flaky'), b'OK')
+            self.assertEqual(self.get(policy, server.base + '/flaky'), b'OK')
+
+    def test_rate_limit(self):
+        limiter = RateLimiter(50, burst=2)
+        start = time.time()
+        for _ in range(7):
+            limiter.acquire()
+        self.assertGreaterEqual(time.time() - start, 0.09)
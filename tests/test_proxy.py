@@ -0,0 +1,117 @@
+# coding: utf-8
+
+import json
+import time
+import threading
+import unittest
+
+from xxkcd import xkcd
+from xxkcd.proxy import CachingProxy, opener
+from xxkcd.policy import Policy
+from xxkcd.transport import ConnectionPool
+from xxkcd._util import HTTPError
+
+from .fakes import LocalServer
+from .test_mirror import IMAGES, IMAGE_OF, MirrorOpener, json_route, image_route
+
+xkcdUpstream = xkcd.with_opener(MirrorOpener, 'xkcdUpstream', __name__, policy=Policy(retries=0))
+
+
+def slow(route, seconds):
+    def slow_route(handler):
+        time.sleep(seconds)
+        return route
+    return slow_route
+
+
+class TestCachingProxy(unittest.TestCase):
+    def setUp(self):
+        routes = dict(('/{}/info.0.json'.format(n), json_route(n)) for n in IMAGE_OF)
+        routes['/info.0.json'] = json_route(4)
+        routes['/2/info.0.json'] = slow(json_route(2), 0.2)
+        routes.update((path, image_route(path)) for path in IMAGES)
+        self.upstream = LocalServer(routes).__enter__()
+        MirrorOpener.base = self.upstream.base
+        self.proxy = CachingProxy(comics=xkcdUpstream).start()
+        self.pool = ConnectionPool(maxsize=32)
+        self.client = xkcd.with_opener(opener(self.proxy.base, self.pool), 'xkcdClient', __name__, policy=Policy(retries=0))
+
+    def tearDown(self):
+        self.proxy.shutdown()
+        self.upstream.__exit__(None, None, None)
+        self.pool.clear()
+        MirrorOpener.pool.clear()
+        xkcdUpstream.delete_all()
+        self.client.delete_all()
+
+    def upstream_paths(self):
+        return [path for path, _ in self.upstream.requests]
+
+    def test_serves(self):
+        client = self.client
+        self.assertEqual(client.latest(), 4)
+        self.assertEqual(client(1).title, u'1')
+        self.assertEqual(client(1).read_image(), IMAGES['/comics/a.png'])
+        client.delete_all()
+        self.assertEqual(client(1).title, u'1')
+        self.assertEqual(client(3).read_image(), IMAGES['/comics/a.png'])
+        self.assertEqual(sorted(self.upstream_paths()), ['/1/info.0.json', '/3/info.0.json', '/comics/a.png', '/info.0.json'])
+
+    def test_coalesces(self):
+        bodies = []
+
+        def request():
+            with self.pool.urlopen(self.proxy.base + '/2/info.0.json') as response:
+                bodies.append(response.read())
+
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(bodies), 10)
+        self.assertEqual(len(set(bodies)), 1)
+        # And the latest comic, to know that there is a comic 2
+        self.assertEqual(sorted(self.upstream_paths()), ['/2/info.0.json', '/info.0.json'])
+
+    def test_not_modified(self):
+        with self.pool.urlopen(self.proxy.base + '/1/info.0.json') as response:
+            response.read()
+            etag = response.headers.get('ETag')
+        with self.pool.urlopen(self.proxy.base + '/1/info.0.json', {'If-None-Match': etag}) as response:
+            self.assertEqual(response.status, 304)
+            self.assertEqual(response.read(), b'')
+        with self.pool.urlopen(self.proxy.base + '/info.0.json', {'If-None-Match': etag}) as response:
+            self.assertEqual(response.status, 200)
+            response.read()
+        # The latest comic revalidated by a client
+        self.client.latest_ttl = 0
+        self.assertEqual(self.client.latest(), 4)
+        self.assertEqual(self.client.latest(), 4)
+        self.assertEqual(self.upstream_paths().count('/info.0.json'), 1)
+
+    def test_after_last_latest(self):
+        body = json.loads(json_route(4)[2].decode('utf-8'))
+        body['num'] = 2150
+        body = 200, {}, json.dumps(body).encode('utf-8')
+        self.upstream.routes['/info.0.json'] = self.upstream.routes['/2150/info.0.json'] = body
+        done = []
+        # Waits for the latest comic while holding the lock on `_raw_json`,
+        # which the proxy must not need
+        thread = threading.Thread(target=lambda: done.append(self.client(2150).title))
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+        self.assertEqual(done, [u'4'])
+        with self.assertRaises(HTTPError) as context:
+            self.pool.urlopen(self.proxy.base + '/2151/info.0.json')
+        self.assertEqual(context.exception.code, 404)
+
+    def test_not_found(self):
+        paths = ('/404/info.0.json', '/5/info.0.json', '/9999/info.0.json', '/nothing', '/comics/')
+        for path in paths:
+            with self.assertRaises(HTTPError) as context:
+                self.pool.urlopen(self.proxy.base + path)
+            self.assertEqual(context.exception.code, 404)
+        # Not the latest comic instead, and nothing is kept for it
+        self.assertNotIn(9999, self.proxy.responses)
@@ -0,0 +1,111 @@
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from xxkcd import xkcd, WhatIf
+from xxkcd.replay import Recording, NotRecorded
+from xxkcd.transport import ConnectionPool
+from xxkcd.policy import Policy
+from xxkcd.images import ImageInfo
+from xxkcd._util import HTTPError
+
+from .fakes import LocalServer
+from .test_mirror import IMAGES, IMAGE_OF, json_route, image_route
+from .test_what_if import ARCHIVE, ARTICLE
+
+HOSTS = ('https://imgs.xkcd.com', 'https://what-if.xkcd.com', 'https://xkcd.com')
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'recording.zip')
+        routes = dict(('/{}/info.0.json'.format(n), json_route(n)) for n in IMAGE_OF)
+        routes['/info.0.json'] = json_route(4)
+        routes.update((path, image_route(path)) for path in IMAGES)
+        routes['/archive/'] = (200, {}, ARCHIVE.encode('utf-8'))
+        routes['/2/'] = (200, {'Content-Type': 'text/html'}, ARTICLE.encode('utf-8'))
+        self.server = LocalServer(routes).__enter__()
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.pool.clear()
+        shutil.rmtree(self.directory)
+
+    def opener(self, url):
+        for host in HOSTS:
+            url = url.replace(host, self.server.base)
+        return self.pool.urlopen(url)
+
+    def classes(self, recording):
+        policy = Policy(retries=0)
+        return (
+            xkcd.with_opener(recording, 'xkcdRecorded', __name__, policy=policy),
+            WhatIf.with_opener(recording, 'WhatIfRecorded', __name__, policy=policy)
+        )
+
+    def use(self, recording):
+        """Make the same requests with a recording or a replay"""
+        xkcdRecorded, WhatIfRecorded = self.classes(recording)
+        comics = [xkcdRecorded(n, keep_alive=True) for n in (1, 2, 3)]
+        self.assertEqual(xkcdRecorded.latest(), 4)
+        self.assertEqual([comic.title for comic in comics], ['1', '2', '3'])
+        self.assertEqual(comics[0].read_image(), IMAGES['/comics/a.png'])
+        self.assertEqual(comics[1].image_info, ImageInfo('jpeg', 640, 480))
+        self.assertEqual(len(WhatIfRecorded.archive), 2)
+        self.assertEqual(WhatIfRecorded(2).title, u'Glass Half Empty')
+        with self.assertRaises(HTTPError) as cm:
+            xkcdRecorded(5)._raw_json
+        self.assertEqual(cm.exception.code, 404)
+
+    def test_record_and_replay(self):
+        with Recording(self.path, record=True, opener=self.opener) as recording:
+            self.use(recording)
+        requests = len(self.server.requests)
+        self.assertTrue(os.path.exists(self.path))
+
+        replay = Recording(self.path)
+        self.use(replay)
+        replay.close()
+        self.assertEqual(len(self.server.requests), requests, 'Request made while replaying')
+
+    def test_not_recorded(self):
+        with Recording(self.path, record=True, opener=self.opener) as recording:
+            xkcdRecorded, _ = self.classes(recording)
+            xkcdRecorded(1)._raw_json
+        xkcdReplayed, _ = self.classes(Recording(self.path))
+        self.assertEqual(xkcdReplayed(1).title, '1')
+        with self.assertRaises(NotRecorded):
+            xkcdReplayed(2)._raw_json
+
+    def test_update(self):
+        with Recording(self.path, record=True, opener=self.opener) as recording:
+            recording('https://xkcd.com/1/info.0.json').read()
+        with Recording(self.path, record=True, opener=self.opener) as recording:
+            recording('https://xkcd.com/2/info.0.json').read()
+        self.assertEqual(len(self.server.requests), 2)
+        recording = Recording(self.path)
+        self.assertEqual(sorted(recording.responses), [
+            'https://xkcd.com/1/info.0.json', 'https://xkcd.com/2/info.0.json'
+        ])
+        recording.close()
+
+    def test_conditional(self):
+        with Recording(self.path, record=True, opener=self.opener) as recording:
+            recording('https://imgs.xkcd.com/comics/a.png').read()
+        recording = Recording(self.path)
+        url = 'https://imgs.xkcd.com/comics/a.png'
+        body = IMAGES['/comics/a.png']
+        with recording(url, {'Range': 'bytes=4-9'}) as response:
+            self.assertEqual(response.status, 206)
+            self.assertEqual(response.read(), body[4:10])
+        with recording(url, {'Range': 'bytes=10-'}) as response:
+            self.assertEqual(response.read(), body[10:])
+        with self.assertRaises(HTTPError) as cm:
+            recording(url, {'Range': 'bytes={}-'.format(len(body))})
+        self.assertEqual(cm.exception.code, 416)
+        recording.close()
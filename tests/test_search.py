@@ -0,0 +1,110 @@
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from xxkcd import xkcd
+from xxkcd.store import Store
+from xxkcd.search import SearchIndex, parse_query
+
+from .fakes import FakeOpener
+
+xkcdSearch = xkcd.with_opener(FakeOpener, 'xkcdSearch', __name__)
+
+COMICS = {
+    1: {'title': u'Python', 'alt': u'Perl, I am leaving you.', 'transcript': u'I just typed import antigravity'},
+    2: {'title': u'Antigravity', 'alt': u'', 'transcript': u'Import the module. Gravity is optional.'},
+    3: {'title': u'Clich\xe9d Exchanges', 'alt': u'Python python python', 'transcript': u''},
+}
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.update(sorted(COMICS.items()))
+
+    def numbers(self, query, **kwargs):
+        return [n for n, _ in self.index.search(query, **kwargs)]
+
+    def test_ranking(self):
+        self.assertEqual(self.numbers('python'), [1, 3])
+        self.assertEqual(self.numbers('python', fields=('alt',)), [3])
+        self.assertEqual(self.numbers('clich\xe9d'), [3])
+        self.assertEqual(self.numbers('nothing'), [])
+
+    def test_phrase(self):
+        self.assertEqual(self.numbers('"import antigravity"'), [1])
+        self.assertEqual(sorted(self.numbers('import')), [1, 2])
+        self.assertEqual(self.numbers('title:antigravity import'), [2])
+        self.assertEqual(parse_query('12:00')[0].terms, ['12', '00'])
+
+    def test_incremental(self):
+        self.index.add(4, {'title': u'Python 3', 'alt': u'', 'transcript': u''})
+        self.assertIn(4, self.numbers('title:python'))
+        self.index.remove(1)
+        self.assertEqual(self.numbers('title:python'), [4])
+        self.assertEqual(len(self.index), 3)
+
+    def test_save(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'index.json')
+            self.index.save(path)
+            loaded = SearchIndex.load(path)
+            self.assertEqual(loaded.search('"import antigravity"'), self.index.search('"import antigravity"'))
+            self.assertEqual(loaded.numbers, set(COMICS))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_xkcd_search(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 20
+        try:
+            self.assertEqual(xkcdSearch.search('comic'), [])
+            xkcdSearch.load_all(concurrency=4)
+            self.assertEqual(xkcdSearch.search('title:"comic 12"'), [xkcdSearch(12)])
+            self.assertEqual(len(xkcdSearch.search('comic', limit=None)), 20)
+        finally:
+            xkcdSearch.delete_all()
+
+    def test_xkcd_store(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 20
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'store.sqlite3')
+            xkcdSearch._search_index = None
+            xkcdSearch.store = Store(path)
+            xkcdSearch.many(range(1, 6))
+            xkcdSearch.delete_all()
+            del FakeOpener.calls[:]
+            self.assertEqual(len(xkcdSearch.search('comic', limit=None)), 5)
+            self.assertEqual(FakeOpener.calls, [], 'Comics were downloaded instead of read from the store')
+            xkcdSearch._search_index = None
+            # Stale comics aren't cached, so they aren't downloaded again to index them
+            xkcdSearch.store = Store(path, max_age=-1)
+            self.assertEqual(xkcdSearch.search('comic'), [])
+            self.assertEqual(FakeOpener.calls, [])
+        finally:
+            xkcdSearch.store = None
+            xkcdSearch._search_index = None
+            xkcdSearch.delete_all()
+            shutil.rmtree(directory)
+
+    def test_xkcd_transcript_source(self):
+        FakeOpener.reset()
+        xkcdSearch._search_index = None
+        try:
+            comics = xkcdSearch.many(range(1663, 1670))
+            del FakeOpener.calls[:]
+            # 1667 to 1669 have their transcripts in 1670 to 1672, which aren't cached
+            self.assertEqual(xkcdSearch.search_index().numbers, set(range(1663, 1667)))
+            self.assertEqual(len(xkcdSearch.search('comic', limit=None)), 4)
+            self.assertEqual(FakeOpener.calls, [], 'Comics were downloaded to search')
+            comics.extend(xkcdSearch.many(range(1670, 1673)))
+            self.assertEqual(xkcdSearch.search_index().numbers, set(range(1663, 1670)))
+        finally:
+            xkcdSearch._search_index = None
+            xkcdSearch.delete_all()
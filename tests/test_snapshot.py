@@ -0,0 +1,79 @@
+# coding: utf-8
+
+import os
+import tempfile
+import unittest
+
+from xxkcd import xkcd, load_xkcd_cache
+from xxkcd._snapshot import Snapshot, SnapshotWriter, DECODED
+from xxkcd.xkcd import decode_all, _decode
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            with SnapshotWriter(f) as writer:
+                writer.add(3, {'num': 3, 'title': u'Tr\xe8s'})
+                writer.add(1, {'num': 1, 'title': u'One'})
+                writer.add(3, {'num': 3, 'title': u'Three'})
+        try:
+            with Snapshot(f.name) as snapshot:
+                self.assertEqual(list(snapshot), [1, 3])
+                self.assertEqual(snapshot[1], {'num': 1, 'title': u'One'})
+                self.assertEqual(snapshot[3]['title'], u'Three')
+                self.assertNotIn(2, snapshot)
+        finally:
+            os.remove(f.name)
+
+    def test_decoded(self):
+        raw_jsons = dict(
+            (n, {'num': n, 'title': u'Clich\xc3\xa9d &amp;', 'safe_title': u'', 'alt': u'', 'img': u'',
+                 'transcript': u'Transcript {}'.format(n), 'day': u'1', 'month': u'', 'year': u'2017'})
+            for n in (1, 1700, 1703, 1710)
+        )
+        decoded = decode_all(raw_jsons)
+        self.assertEqual(decoded[1]['title'], u'Clich\xe9d &')
+        self.assertEqual(decoded[1]['month'], None)
+        self.assertEqual(decoded[1700]['transcript'], u'Transcript 1703')
+        self.assertIsNone(decoded[1703])
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            with SnapshotWriter(f, DECODED) as writer:
+                for n in raw_jsons:
+                    writer.add(n, raw_jsons[n], decoded[n])
+        try:
+            with Snapshot(f.name) as snapshot:
+                self.assertTrue(snapshot.decoded)
+                self.assertEqual(snapshot[1], raw_jsons[1])
+                self.assertEqual(snapshot.record(1700), (raw_jsons[1700], decoded[1700]))
+                self.assertEqual(snapshot.record(1703), (raw_jsons[1703], None))
+        finally:
+            os.remove(f.name)
+
+    def test_decode(self):
+        self.assertEqual(_decode(u'ASCII'), u'ASCII')
+        self.assertEqual(_decode(u'&lt;&gt;'), u'<>')
+        self.assertEqual(_decode(u'\xc3\x83\xc2\xa9'), u'\xe9')
+
+    def test_bundled(self):
+        with Snapshot() as snapshot:
+            self.assertEqual(snapshot.max(), len(snapshot))
+            self.assertEqual(snapshot[353]['title'], u'Python')
+            self.assertNotIn(0, snapshot)
+            self.assertIsNone(snapshot.get(10 ** 6))
+
+    def test_load_xkcd_cache(self):
+        def should_not_call(*_, **__):
+            raise AssertionError('xkcd.urlopen called')
+
+        xkcd_urlopen = staticmethod(xkcd.urlopen)
+        xkcd.delete_all()
+        try:
+            xkcd.urlopen = should_not_call
+            load_xkcd_cache()
+            self.assertEqual(xkcd(353).title, u'Python')
+            self.assertEqual(xkcd(259).title, u'Clich\xe9d Exchanges')
+            decoded = xkcd(1700)._raw_json and xkcd(1700).__dict__['_decoded_json']
+            self.assertEqual(xkcd(1700).transcript, decoded['transcript'])
+            self.assertIn(353, xkcd._keep_alive)
+        finally:
+            xkcd.urlopen = xkcd_urlopen
@@ -0,0 +1,56 @@
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from xxkcd import xkcd
+from xxkcd.store import Store
+
+from .fakes import FakeOpener
+
+
+xkcdFake = xkcd.with_opener(FakeOpener, 'xkcdFake', __name__)
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'store.sqlite3')
+        FakeOpener.reset()
+
+    def tearDown(self):
+        xkcdFake.store = None
+        xkcdFake.delete_all()
+        shutil.rmtree(self.directory)
+
+    def test_freshness(self):
+        store = Store(self.path, max_age=None, latest_max_age=-1)
+        store.put('xkcd', 1, u'one')
+        store.put('xkcd', Store.LATEST, u'latest')
+        self.assertEqual(store.get('xkcd', 1), u'one')
+        self.assertIsNone(store.get('xkcd', Store.LATEST), 'Stale entry returned')
+        self.assertIsNone(store.get('what_if', 1))
+        self.assertEqual(store.keys('xkcd'), [1])
+        store.delete('xkcd', 1)
+        self.assertIsNone(store.get('xkcd', 1))
+
+    def test_put_many(self):
+        store = Store(self.path)
+        store.put('xkcd', 2, u'kept')
+        store.put_many('xkcd', [(1, u'a'), (2, u'b')], replace=False)
+        self.assertEqual(store.get('xkcd', 1), u'a')
+        self.assertEqual(store.get('xkcd', 2), u'kept')
+
+    def test_write_through(self):
+        xkcdFake.store = Store(self.path)
+        self.assertEqual(xkcdFake(5).title, u'Comic 5')
+        self.assertEqual(len(FakeOpener.calls), 1)
+        xkcdFake.delete_all()
+        # A new process would see the same database
+        xkcdFake.store = Store(self.path)
+        self.assertEqual(xkcdFake(5).title, u'Comic 5')
+        self.assertEqual(len(FakeOpener.calls), 1, 'Comic was not read from the store')
+        xkcdFake.delete_one(5)
+        self.assertIsNone(xkcdFake.store.get('xkcd', 5))
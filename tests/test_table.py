@@ -0,0 +1,65 @@
+# coding: utf-8
+
+import unittest
+
+from xxkcd import xkcd
+from xxkcd.table import ComicTable
+from xxkcd._snapshot import Snapshot
+
+from .fakes import FakeOpener
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+xkcdTable = xkcd.with_opener(FakeOpener, 'xkcdTable', __name__)
+
+RAW_JSONS = {
+    2: {'month': '2', 'num': 2, 'link': '', 'year': '2006', 'news': '', 'safe_title': 'Two',
+        'transcript': '', 'alt': 'Alt', 'img': 'https://imgs.xkcd.com/comics/two.jpg', 'title': 'Two', 'day': '3'},
+    1: {'month': '1', 'num': 1, 'link': 'https://xkcd.com', 'year': '2006', 'news': '', 'safe_title': 'One',
+        'transcript': 'Text', 'alt': '', 'img': 'https://imgs.xkcd.com/comics/one.png', 'title': 'One', 'day': '1'},
+}
+
+
+class TestComicTable(unittest.TestCase):
+    def test_columns(self):
+        table = ComicTable.from_raw_json(RAW_JSONS)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(list(table.num), [1, 2])
+        self.assertEqual(list(table['has_transcript']), [1, 0])
+        self.assertEqual(list(table.has_link), [1, 0])
+        self.assertEqual(list(table.alt_length), [0, 3])
+        self.assertEqual([table.image_exts[i] for i in table.image_ext], ['.png', '.jpg'])
+        self.assertEqual(table.row(1)['title'], 'Two')
+        self.assertEqual(table.row(1)['ordinal'] - table.row(0)['ordinal'], 33)
+
+    def test_transcript_source(self):
+        snapshot = Snapshot()
+        try:
+            table = ComicTable.from_raw_json(dict((n, snapshot.get(n)) for n in range(1600, 1700)))
+            has_transcript = dict(zip(table.num, table.has_transcript))
+            # The raw JSON of 1608 and 1666 has the transcripts of 1606 and 1663
+            for n in (1608, 1611, 1666):
+                self.assertEqual(has_transcript[n], bool(snapshot.record(n)[1]['transcript']), n)
+            self.assertEqual((has_transcript[1608], has_transcript[1666]), (0, 1))
+        finally:
+            snapshot.close()
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        table = ComicTable.from_raw_json(RAW_JSONS).to_numpy()
+        self.assertEqual(list(table.num[table.has_transcript]), [1])
+        self.assertEqual(table.title_length.sum(), 6)
+
+    def test_xkcd_table(self):
+        FakeOpener.reset()
+        FakeOpener.latest = 10
+        try:
+            xkcdTable.load_all()
+            table = xkcdTable.table()
+            self.assertEqual(list(table.num), list(range(1, 11)))
+            self.assertEqual(table.title[4], 'Comic 5')
+        finally:
+            xkcdTable.delete_all()
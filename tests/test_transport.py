@@ -0,0 +1,96 @@
+# coding: utf-8
+
+import json
+import unittest
+
+from xxkcd import xkcd
+from xxkcd.transport import ConnectionPool
+from xxkcd._util import HTTPError
+
+from .fakes import LocalServer
+
+ROUTES = {
+    '/data': (200, {}, b'x' * 100000),
+    '/moved': (301, {'Location': '/data'}, b''),
+    '/json': (200, {'Content-Type': 'application/json'}, b'{}'),
+}
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_keep_alive(self):
+        pool = ConnectionPool(maxsize=2)
+        with LocalServer(ROUTES) as server:
+            for _ in range(5):
+                with pool.urlopen(server.base + '/json') as http:
+                    self.assertEqual(http.read(), b'{}')
+            with pool.urlopen(server.base + '/moved') as http:
+                self.assertEqual(len(http.read()), 100000)
+            self.assertEqual(server.connections, 1, 'Connection not reused')
+            pool.clear()
+
+    def test_partial_read(self):
+        pool = ConnectionPool()
+        with LocalServer(ROUTES) as server:
+            with pool.urlopen(server.base + '/data') as http:
+                self.assertEqual(http.read(10), b'x' * 10)
+            # The rest of the unread response must not be read as the next response
+            with pool.urlopen(server.base + '/json') as http:
+                self.assertEqual(http.read(), b'{}')
+            self.assertEqual(server.connections, 2)
+            pool.clear()
+
+    def test_error(self):
+        pool = ConnectionPool()
+        with LocalServer(ROUTES) as server:
+            with self.assertRaises(HTTPError) as cm:
+                pool.urlopen(server.base + '/missing')
+            self.assertEqual(cm.exception.code, 404)
+            with pool.urlopen(server.base + '/json') as http:
+                self.assertEqual(http.read(), b'{}')
+            self.assertEqual(server.connections, 1)
+            pool.clear()
+
+
+class LocalOpener(object):
+    """Sends requests for xkcd.com to a `LocalServer`"""
+    conditional = True
+    base = None
+    pool = ConnectionPool()
+
+    def __new__(cls, url, headers=None):
+        return cls.pool.urlopen(url.replace('https://xkcd.com', cls.base), headers)
+
+
+xkcdLocal = xkcd.with_opener(LocalOpener, 'xkcdLocal', __name__)
+
+
+class TestLatest(unittest.TestCase):
+    def setUp(self):
+        self.latest = 100
+
+    def tearDown(self):
+        xkcdLocal.latest_ttl = xkcd.latest_ttl
+        xkcdLocal.delete_all()
+        LocalOpener.pool.clear()
+
+    def latest_route(self, handler):
+        etag = '"{}"'.format(self.latest)
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag}, json.dumps({'num': self.latest}).encode('utf-8')
+
+    def test_revalidate(self):
+        with LocalServer({'/info.0.json': self.latest_route}) as server:
+            LocalOpener.base = server.base
+            xkcdLocal.latest_ttl = None
+            self.assertEqual(xkcdLocal.latest(), 100)
+            self.latest = 101
+            self.assertEqual(xkcdLocal.latest(), 100, 'Latest comic checked before its TTL')
+            self.assertEqual(len(server.requests), 1)
+
+            xkcdLocal.latest_ttl = 0
+            self.assertEqual(xkcdLocal.latest(), 101)
+            self.assertEqual(xkcdLocal()._raw_json['num'], 101)
+            self.assertEqual(xkcdLocal.latest(), 101)
+            self.assertEqual(server.requests[-1][1].get('If-None-Match'), '"101"')
+            self.assertEqual(len(server.requests), 3)
@@ -0,0 +1,124 @@
+# coding: utf-8
+
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from xxkcd import WhatIf
+from xxkcd.store import Store
+from xxkcd.transport import ConnectionPool
+from xxkcd.what_if import Archive, ArchiveEntry
+
+from .fakes import LocalServer
+
+ARCHIVE = u'''<html><body>
+<div class="archive-entry">
+<a href="/1/"><img class="archive-image" src="/imgs/a/1/relativistic_baseball.png"></a>
+<h1 class="archive-title"><a href="/1/">Relativistic Baseball</a></h1>
+<h2 class="archive-date">July 9, 2012</h2>
+</div>
+<div class="archive-entry">
+<a href="/2/"><img class="archive-image" src="/imgs/a/2/glass.png"></a>
+<h1 class="archive-title"><a href="/2/">Glass Half Empty</a></h1>
+<h2 class="archive-date">July 17, 2012</h2>
+</div>
+</body></html>'''
+
+ARTICLE = u'''<html><body><article class="entry">
+<a href="/2/"><h1>Glass Half Empty</h1></a>
+<p id="question">What if a glass of water was, quite literally, half empty?</p>
+<p id="attribute">—Vittorio Iacovella</p>
+<p>Pessimist: The glass is half empty.</p>
+</article></body></html>'''
+
+
+class LocalOpener(object):
+    """Sends requests for what-if.xkcd.com to a `LocalServer`"""
+    base = None
+    pool = ConnectionPool()
+
+    def __new__(cls, url):
+        return cls.pool.urlopen(url.replace('https://what-if.xkcd.com', cls.base))
+
+
+WhatIfLocal = WhatIf.with_opener(LocalOpener, 'WhatIfLocal', __name__)
+
+
+class TestWhatIf(unittest.TestCase):
+    def tearDown(self):
+        WhatIfLocal.archive.delete()
+        LocalOpener.pool.clear()
+
+    def test_archive_per_class(self):
+        with LocalServer({'/archive/': (200, {}, ARCHIVE.encode('utf-8'))}) as server:
+            LocalOpener.base = server.base
+            self.assertEqual(len(WhatIfLocal.archive), 2)
+            self.assertEqual(WhatIfLocal.archive.load()[2].title, u'Glass Half Empty')
+            # Forgets the loaded archive, and not the class's `archive`
+            del WhatIfLocal(1).archive
+            self.assertIsNone(WhatIfLocal.archive._archive)
+            self.assertEqual(len(WhatIfLocal.archive), 2)
+            self.assertEqual([path for path, _ in server.requests], ['/archive/', '/archive/'])
+        self.assertIsNone(WhatIf.archive._archive, 'Archive shared with WhatIf')
+
+    def test_with_opener(self):
+        routes = {
+            '/archive/': (200, {}, ARCHIVE.encode('utf-8')),
+            '/2/': (200, {}, ARTICLE.encode('utf-8')),
+        }
+        with LocalServer(routes) as server:
+            LocalOpener.base = server.base
+            self.assertEqual(WhatIfLocal.latest(), 2)
+            article = WhatIfLocal(2)
+            self.assertEqual(article.title, u'Glass Half Empty')
+            self.assertEqual(article.date, datetime.date(2012, 7, 17))
+            self.assertEqual(article.question, u'What if a glass of water was, quite literally, half empty?')
+            self.assertEqual(article.attribute, u'—Vittorio Iacovella')
+            self.assertEqual(WhatIfLocal(-1), article)
+            self.assertEqual([path for path, _ in server.requests], ['/archive/', '/2/'])
+        self.assertIsNone(WhatIf.archive._archive, 'Archive shared with WhatIf')
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = LocalServer({'/archive/': (200, {}, ARCHIVE.encode('utf-8'))}).__enter__()
+        LocalOpener.base = self.server.base
+
+    def tearDown(self):
+        WhatIfLocal.archive.delete()
+        WhatIfLocal.store = None
+        self.server.__exit__(None, None, None)
+        LocalOpener.pool.clear()
+        shutil.rmtree(self.directory)
+
+    def test_parse(self):
+        page = ARCHIVE.encode('utf-8')
+        expected = [
+            ArchiveEntry(
+                'https://what-if.xkcd.com/imgs/a/1/relativistic_baseball.png',
+                u'Relativistic Baseball', datetime.date(2012, 7, 9)
+            ),
+            ArchiveEntry('https://what-if.xkcd.com/imgs/a/2/glass.png', u'Glass Half Empty', datetime.date(2012, 7, 17)),
+        ]
+        self.assertEqual(list(Archive.parse([page])), expected)
+        # Split inside tags, text and UTF-8 sequences
+        self.assertEqual(list(Archive.parse(page[i:i + 5] for i in range(0, len(page), 5))), expected)
+        self.assertEqual(list(Archive.parse([u'<div class="archive-entry"><a><img src="/a.png"></a>'
+                                             u'<h1><a>Fish and Chips <em>!</em></a></h1><h2>July 1, 2012</h2></div>'])),
+                         [ArchiveEntry('https://what-if.xkcd.com/a.png', u'Fish and Chips ', datetime.date(2012, 7, 1))])
+
+    def test_store(self):
+        WhatIfLocal.store = Store(os.path.join(self.directory, 'store.sqlite3'))
+        self.assertEqual(WhatIfLocal.latest(), 2)
+        stored = dict(WhatIfLocal.archive.load())
+        WhatIfLocal.archive._archive = None
+        self.assertEqual(dict(WhatIfLocal.archive.load()), stored)
+        self.assertEqual(len(self.server.requests), 1, 'Archive not read from the store')
+        # Stale after `latest_max_age`
+        WhatIfLocal.store.latest_max_age = 0
+        WhatIfLocal.archive._archive = None
+        self.assertEqual(dict(WhatIfLocal.archive.load()), stored)
+        self.assertEqual(len(self.server.requests), 2)
@@ -0,0 +1,5 @@
+import sys
+
+from xxkcd.cli import main
+
+sys.exit(main())
@@ -0,0 +1,142 @@
+"""Run network-bound work for many comics or articles on a pool of threads"""
+
+import time
+import itertools
+import collections
+import multiprocessing.pool
+
+from xxkcd._util import HTTPError, range
+
+__all__ = ('BulkLoader', 'read_ahead')
+
+ERROR_POLICIES = ('raise', 'skip', 'retry')
+
+
+def is_transient(error):
+    """
+    :return: True if the request that raised `error` might succeed if retried
+    :rtype: bool
+    """
+    if isinstance(error, HTTPError):
+        return error.code >= 500 or error.code == 429
+    return isinstance(error, (EnvironmentError, ValueError))
+
+
+class BulkLoader(object):
+    """
+    Calls a function for many items on `concurrency` threads.
+
+    Typical usage:
+
+        loader = BulkLoader(concurrency=16, errors='skip')
+        for n, raw_json in loader.imap(fetch, numbers):
+            ...
+        print('Failed:', loader.failed)
+    """
+
+    def __init__(self, concurrency=None, progress=None, errors='raise', retries=3, backoff=0.5):
+        """
+        :param Optional[int] concurrency: Number of threads to use.
+            If None, everything is done in the current thread.
+        :param progress: If not None, called in the current thread as
+            `progress(done, total, item)` after each item finishes.
+        :param str errors: What to do when an item fails. 'raise' to stop and
+            re-raise the error, 'skip' to record it in `.failed` and carry on,
+            or 'retry' to try again up to `retries` times on transient errors
+            before raising.
+        :param int retries: Maximum number of retries for `errors='retry'`
+        :param float backoff: Seconds to wait before the first retry. Doubles
+            with every retry.
+        """
+        if errors not in ERROR_POLICIES:
+            raise ValueError('errors must be one of {!r}'.format(ERROR_POLICIES))
+        self.concurrency = concurrency
+        self.progress = progress
+        self.errors = errors
+        self.retries = retries
+        self.backoff = backoff
+        self.failed = {}
+
+    def _call(self, func, item):
+        attempts = self.retries + 1 if self.errors == 'retry' else 1
+        for attempt in range(attempts):
+            try:
+                return item, func(item), None
+            except Exception as e:
+                if attempt + 1 == attempts or not is_transient(e):
+                    return item, None, e
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def imap(self, func, items):
+        """
+        Call `func(item)` for every item, yielding `(item, result)` in the
+        order they finish. Items that fail with `errors='skip'` are not yielded.
+
+        :param Callable func: Function to call with each item
+        :param Iterable items: Items to call the function with
+        :return: Iterator of (item, result) pairs
+        """
+        items = list(items)
+        total = len(items)
+        if self.concurrency is None or self.concurrency <= 1 or total <= 1:
+            results = (self._call(func, item) for item in items)
+            pool = None
+        else:
+            pool = multiprocessing.pool.ThreadPool(min(self.concurrency, total))
+            results = pool.imap_unordered(lambda item: self._call(func, item), items)
+        try:
+            for done, (item, result, error) in enumerate(results, 1):
+                if error is not None:
+                    if self.errors != 'skip':
+                        raise error
+                    self.failed[item] = error
+                if self.progress is not None:
+                    self.progress(done, total, item)
+                if error is None:
+                    yield item, result
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def map(self, func, items):
+        """
+        Like `imap`, but returns a dict of `{item: result}` once all items are done.
+
+        :rtype: dict
+        """
+        return dict(self.imap(func, items))
+
+
+def read_ahead(items, func, window):
+    """
+    Yield `(item, func(item))` for each item in order, calling `func` for
+    up to `window` items ahead on background threads.
+
+    Results are None for items where `func` raised, so the error happens
+    again when the consumer does the work itself. Nothing more is started
+    once the generator is closed (or garbage collected).
+
+    :param Iterable items: Items to call the function with
+    :param Callable func: Function to call with each item
+    :param int window: How many items to work on ahead of the consumer
+    :return: Iterator of (item, result) pairs
+    """
+    items = iter(items)
+    pool = multiprocessing.pool.ThreadPool(window)
+    pending = collections.deque()
+    try:
+        for item in itertools.islice(items, window):
+            pending.append((item, pool.apply_async(func, (item,))))
+        while pending:
+            item, result = pending.popleft()
+            for following in itertools.islice(items, 1):
+                pending.append((following, pool.apply_async(func, (following,))))
+            try:
+                value = result.get()
+            except Exception:
+                value = None
+            yield item, value
+    finally:
+        # Not joined, so stopping early doesn't wait for requests in progress
+        pool.terminate()
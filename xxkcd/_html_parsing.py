@@ -128,3 +128,95 @@ class ParseToTree(HTMLParser):
         parsed = self.tree
         self.reset()
         return parsed
+
+
+class ArchiveParser(HTMLParser):
+    """
+    Finds the entries of the What If? archive page while it is fed,
+    without building a tree. For each element with the class
+    `archive-entry`, `entries` gets `(src, title, date)`:
+
+        src    The `src` of the first element in the entry's first child
+        title  The text at the start of the first element in its second child
+        date   The text at the start of its third child
+
+    These are the same as walking the tree from `ParseToTree`. Use
+    `pop_entries()` after each `feed()` to take the entries found so far.
+    """
+
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self._reset_state()
+
+    def _reset_state(self):
+        self.entries = []
+        # Tags of the open elements
+        self._open = []
+        # How many elements are open outside the current entry, or None if not in one
+        self._entry_depth = None
+        self._entry = None
+        self._child = -1
+        # Whether the next element opened in the current child is its first
+        self._first_in_child = False
+        # Which field of the entry the text being read goes to
+        self._text_field = None
+        self._text = []
+
+    def reset(self):
+        HTMLParser.reset(self)
+        self._reset_state()
+
+    def _end_text(self):
+        if self._text_field is not None:
+            if self._text:
+                self._entry[self._text_field] = u''.join(self._text)
+            self._text_field = None
+            self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        self._end_text()
+        depth = len(self._open)
+        self._open.append(tag.lower())
+        entry_depth = self._entry_depth
+        if entry_depth is None:
+            # `HTMLNode.attr_dict` takes the first of repeated attributes
+            if next((value for name, value in attrs if name == 'class'), None) == 'archive-entry':
+                self._entry_depth = depth
+                self._entry = [None, None, None]
+                self._child = -1
+            return
+        if depth == entry_depth + 1:
+            self._child += 1
+            self._first_in_child = True
+            if self._child == 2:
+                self._text_field = 2
+        elif depth == entry_depth + 2 and self._first_in_child:
+            self._first_in_child = False
+            if self._child == 0:
+                self._entry[0] = next((value for name, value in attrs if name == 'src'), None)
+            elif self._child == 1:
+                self._text_field = 1
+
+    def handle_endtag(self, tag):
+        self._end_text()
+        tag = tag.lower()
+        if tag not in self._open:
+            return
+        while self._open.pop() != tag:
+            pass
+        if self._entry_depth is not None and len(self._open) <= self._entry_depth:
+            self.entries.append(tuple(self._entry))
+            self._entry_depth = self._entry = None
+
+    def handle_data(self, data):
+        if self._text_field is not None:
+            # Text can be split between calls, until the next tag
+            self._text.append(data)
+
+    def pop_entries(self):
+        """
+        :return: The entries found since the last call
+        :rtype: List[Tuple[Optional[Text], Optional[Text], Optional[Text]]]
+        """
+        entries, self.entries = self.entries, []
+        return entries
@@ -0,0 +1,180 @@
+"""The `_cache` and `_keep_alive` registries of `xkcd` and `WhatIf`"""
+
+import sys
+import weakref
+import threading
+import collections
+
+__all__ = ('KeepAlive', 'approximate_size', 'weak_entry')
+
+
+def weak_entry(cache, key, value):
+    """
+    :param dict cache: `{key: weakref}`
+    :return: A weak reference to `value` that removes itself from `cache`
+        when `value` is garbage collected
+    :rtype: weakref.ref
+    """
+    def remove(ref):
+        # Only if a new object hasn't been registered for the key since
+        if cache.get(key) is ref:
+            cache.pop(key, None)
+
+    return weakref.ref(value, remove)
+
+
+_ATOMIC = (type(None), bool, int, float, type(u''), bytes)
+
+
+def approximate_size(value, depth=4):
+    """
+    :return: An approximation of the bytes used by `value` and the objects
+        it holds, up to `depth` levels down. Objects held more than once are
+        counted every time.
+    :rtype: int
+    """
+    size = sys.getsizeof(value, 64)
+    if depth <= 0 or isinstance(value, _ATOMIC):
+        return size
+    depth -= 1
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += approximate_size(k, depth) + approximate_size(v, depth)
+        return size
+    if isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += approximate_size(item, depth)
+        return size
+    for slot in getattr(type(value), '__slots__', ()):
+        if slot not in ('__dict__', '__weakref__'):
+            size += approximate_size(getattr(value, slot, None), depth)
+    attributes = getattr(value, '__dict__', None)
+    if isinstance(attributes, dict):
+        size += approximate_size(attributes, depth)
+    return size
+
+
+class KeepAlive(object):
+    """
+    Strong references to objects by key, so they are not garbage collected.
+
+    With a maximum number of entries and/or an approximate maximum number
+    of bytes, the least recently used entries are dropped past the limit.
+    Sizes are measured with `sizeof` when an entry is added, and the
+    previous entry is measured again then, since objects are usually kept
+    alive just before their data is loaded.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, sizeof=approximate_size):
+        """
+        :param Optional[int] max_entries: None for no limit
+        :param Optional[int] max_bytes: None for no limit
+        :param Callable[[Any], int] sizeof: Approximate size of an object
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.total_bytes = 0
+        self._entries = collections.OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+
+    def _move_to_end(self, key):
+        # No `OrderedDict.move_to_end` in Python 2
+        self._entries[key] = self._entries.pop(key)
+
+    def _measure(self, key):
+        size = self.sizeof(self._entries[key])
+        self.total_bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries) or
+            (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            key, _ = self._entries.popitem(last=False)
+            self.total_bytes -= self._sizes.pop(key, 0)
+
+    def set_limits(self, max_entries=None, max_bytes=None):
+        """
+        Change the limits, dropping entries now if they are over the new limits.
+
+        :return: None
+        """
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            if max_bytes is None:
+                self._sizes.clear()
+                self.total_bytes = 0
+            else:
+                for key in self._entries:
+                    self._measure(key)
+            self._evict()
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if self.max_entries is None and self.max_bytes is None:
+                self._entries[key] = value
+                return
+            if key in self._entries:
+                self.total_bytes -= self._sizes.pop(key, 0)
+                del self._entries[key]
+            previous = next(reversed(self._entries), None) if self._entries else None
+            self._entries[key] = value
+            if self.max_bytes is not None:
+                if previous is not None:
+                    self._measure(previous)
+                self._measure(key)
+            self._evict()
+
+    def touch(self, key):
+        """Mark the entry for `key` (if there is one) as just used."""
+        if key in self._entries and (self.max_entries is not None or self.max_bytes is not None):
+            with self._lock:
+                if key in self._entries:
+                    self._move_to_end(key)
+
+    def __getitem__(self, key):
+        return self._entries[key]
+
+    def get(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def pop(self, key, *default):
+        with self._lock:
+            self.total_bytes -= self._sizes.pop(key, 0)
+            return self._entries.pop(key, *default)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def values(self):
+        with self._lock:
+            return list(self._entries.values())
+
+    def items(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    def __repr__(self):
+        return '<{type.__name__} {n} entries, max_entries={max_entries!r}, max_bytes={max_bytes!r}>'.format(
+            type=type(self), n=len(self), max_entries=self.max_entries, max_bytes=self.max_bytes
+        )
@@ -0,0 +1,144 @@
+"""A directory of comic images, stored once per distinct image"""
+
+import os
+import json
+import errno
+import hashlib
+import posixpath
+import threading
+
+from xxkcd._util import HTTPError, replace
+
+__all__ = ('ImageMirror',)
+
+MANIFEST_VERSION = 1
+
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+class ImageMirror(object):
+    """
+    Layout::
+
+        manifest.json          {"version": 1, "comics": {comic number: entry}}
+        objects/ab/abcd...png  Images, named by the SHA-256 of their contents
+        partial/123.part       Downloads that haven't finished yet
+
+    Each entry is `{"url": ..., "file": path relative to the directory,
+    "sha256": ..., "size": ...}`, with a `file` of null for comics without an image.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self._lock = threading.Lock()
+        try:
+            with open(self.manifest_path, 'rb') as f:
+                manifest = json.loads(f.read().decode('utf-8'))
+        except EnvironmentError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            manifest = {'version': MANIFEST_VERSION, 'comics': {}}
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError('{!r} is not a version {} manifest'.format(self.manifest_path, MANIFEST_VERSION))
+        self.comics = dict((int(n), entry) for n, entry in manifest['comics'].items())
+
+    def path(self, comic):
+        """
+        :param int comic: The comic number
+        :return: Where the comic's image is, or None if it isn't mirrored or doesn't have one
+        :rtype: Optional[str]
+        """
+        entry = self.comics.get(comic)
+        if entry is None or entry['file'] is None:
+            return None
+        return os.path.join(self.directory, *entry['file'].split('/'))
+
+    def __contains__(self, comic):
+        entry = self.comics.get(comic)
+        if entry is None:
+            return False
+        return entry['file'] is None or os.path.exists(self.path(comic))
+
+    def add(self, comic, url, urlopen, chunk_size=65536):
+        """
+        Download an image (resuming a partial download if the opener takes
+        request headers) and add it to the manifest.
+
+        :param int comic: The comic number
+        :param str url: The image URL, or an empty string if the comic doesn't have one
+        :param urlopen: The opener to download with (e.g. `xkcd.urlopen`)
+        :param int chunk_size: How many bytes to read at once
+        :return: The manifest entry for the comic
+        :rtype: Dict[str, Any]
+        """
+        if not url:
+            entry = {'url': url, 'file': None, 'sha256': None, 'size': 0}
+        else:
+            partial_directory = os.path.join(self.directory, 'partial')
+            _makedirs(partial_directory)
+            partial = os.path.join(partial_directory, '{}.part'.format(comic))
+            self._download(url, partial, urlopen, chunk_size)
+            sha256 = hashlib.sha256()
+            size = 0
+            with open(partial, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    sha256.update(chunk)
+                    size += len(chunk)
+            digest = sha256.hexdigest()
+            ext = posixpath.splitext(posixpath.basename(url))[1].lower()
+            file = 'objects/{}/{}{}'.format(digest[:2], digest, ext)
+            path = os.path.join(self.directory, *file.split('/'))
+            if os.path.exists(path):
+                # Another comic has the same image
+                os.remove(partial)
+            else:
+                _makedirs(os.path.dirname(path))
+                replace(partial, path)
+            entry = {'url': url, 'file': file, 'sha256': digest, 'size': size}
+        with self._lock:
+            self.comics[comic] = entry
+        return entry
+
+    @staticmethod
+    def _download(url, partial, urlopen, chunk_size):
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        if offset and getattr(urlopen, 'conditional', False):
+            try:
+                opened = urlopen(url, {'Range': 'bytes={}-'.format(offset)})
+            except HTTPError as e:
+                if e.code != 416:
+                    raise
+                # The partial file is not a prefix of the image any more
+                os.remove(partial)
+                opened = urlopen(url)
+        else:
+            opened = urlopen(url)
+        with opened as http:
+            # Servers that ignore the Range header send the whole image
+            mode = 'ab' if getattr(http, 'status', 200) == 206 else 'wb'
+            with open(partial, mode) as f:
+                for chunk in iter(lambda: http.read(chunk_size), b''):
+                    f.write(chunk)
+
+    def save(self):
+        """
+        Write the manifest. Replaces the old manifest all at once, so it is
+        never left half written.
+
+        :return: None
+        """
+        _makedirs(self.directory)
+        with self._lock:
+            comics = dict((str(n), entry) for n, entry in self.comics.items())
+        dumped = json.dumps({'version': MANIFEST_VERSION, 'comics': comics}, indent=1, sort_keys=True)
+        temporary = self.manifest_path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(dumped.encode('utf-8'))
+        replace(temporary, self.manifest_path)
@@ -0,0 +1,229 @@
+"""
+A compact, random-access file of raw comic JSON.
+
+Layout (all integers little-endian)::
+
+    header:  magic (8 bytes), version (u16), flags (u16), count (u32), index offset (u64)
+    records: zlib compressed UTF-8 JSON, one per comic. With the `DECODED`
+             flag, each record is `[raw JSON, decoded JSON or null]`.
+    index:   count * (comic number (u32), record offset (u64), record length (u32)),
+             sorted by comic number
+
+The index is at the end so that records can be streamed to the file and the
+index written once all of them are known.
+"""
+
+import os
+import io
+import json
+import mmap
+import zlib
+import struct
+
+from xxkcd._util import range
+
+__all__ = ('Snapshot', 'SnapshotWriter', 'BUNDLED', 'DECODED', 'dumps')
+
+MAGIC = b'XXKCDSNP'
+VERSION = 1
+
+# Records also have the JSON as `xkcd.json` would return it
+DECODED = 1
+
+_HEADER = struct.Struct('<8sHHIQ')
+_INDEX_ENTRY = struct.Struct('<IQI')
+
+BUNDLED = os.path.join(os.path.dirname(os.path.abspath(__file__)), '_cache.bin')
+
+
+class Snapshot(object):
+    """
+    Read-only view of a snapshot file.
+
+    Opening only reads the header. Lookups binary search the index in place
+    and only decompress and decode the requested record.
+    """
+    __slots__ = ('path', 'flags', '_file', '_map', '_count', '_index_offset', '_numbers')
+
+    def __init__(self, path=BUNDLED):
+        self.path = path
+        self._numbers = None
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        magic, version, self.flags, self._count, self._index_offset = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError('{!r} is not a version {} xxkcd snapshot'.format(path, VERSION))
+
+    def _entry(self, i):
+        return _INDEX_ENTRY.unpack_from(self._map, self._index_offset + i * _INDEX_ENTRY.size)
+
+    def _find(self, comic):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._entry(mid)
+            if entry[0] < comic:
+                lo = mid + 1
+            elif entry[0] > comic:
+                hi = mid
+            else:
+                return entry
+        return None
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, comic):
+        return self._find(comic) is not None
+
+    def __iter__(self):
+        """Iterate over the comic numbers in ascending order"""
+        for i in range(self._count):
+            yield self._entry(i)[0]
+
+    def numbers(self):
+        """
+        :return: Every comic number in the snapshot
+        :rtype: FrozenSet[int]
+        """
+        if self._numbers is None:
+            self._numbers = frozenset(self)
+        return self._numbers
+
+    def max(self):
+        """
+        :return: The number of the newest comic in the snapshot, or 0 if it is empty
+        :rtype: int
+        """
+        if not self._count:
+            return 0
+        return self._entry(self._count - 1)[0]
+
+    @property
+    def decoded(self):
+        """True if records have the decoded JSON as well as the raw JSON"""
+        return bool(self.flags & DECODED)
+
+    def record(self, comic):
+        """
+        :param int comic: The comic number
+        :return: The raw JSON for the comic and its decoded JSON (None if the
+            snapshot does not have it), or None if the comic is not in the snapshot.
+        :rtype: Optional[Tuple[Dict[Text, Any], Optional[Dict[Text, Any]]]]
+        """
+        entry = self._find(comic)
+        if entry is None:
+            return None
+        _, offset, length = entry
+        record = json.loads(zlib.decompress(self._map[offset:offset + length]).decode('utf-8'))
+        if self.flags & DECODED:
+            return record[0], record[1]
+        return record, None
+
+    def get(self, comic, default=None):
+        """
+        :param int comic: The comic number
+        :return: The raw JSON for the comic, or `default` if it is not in the snapshot
+        :rtype: Dict[Text, Any]
+        """
+        record = self.record(comic)
+        if record is None:
+            return default
+        return record[0]
+
+    def __getitem__(self, comic):
+        raw_json = self.get(comic)
+        if raw_json is None:
+            raise KeyError(comic)
+        return raw_json
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return '{type.__name__}({path!r})'.format(type=type(self), path=self.path)
+
+
+class SnapshotWriter(object):
+    """
+    Writes a snapshot to a seekable binary file, one record at a time.
+
+    Typical usage:
+
+        with open(path, 'wb') as f, SnapshotWriter(f) as writer:
+            for raw_json in comics:
+                writer.add(raw_json['num'], raw_json)
+
+    With `flags=DECODED`, pass the decoded JSON as well (or None) to `add`.
+    """
+
+    def __init__(self, file, flags=0, level=9):
+        self.file = file
+        self.flags = flags
+        self.level = level
+        self._start = file.tell()
+        self._index = {}
+        file.write(b'\0' * _HEADER.size)
+
+    def add(self, comic, raw_json, decoded=None):
+        """
+        Append a record for a comic. Adding the same comic again replaces it.
+
+        :param int comic: The comic number
+        :param raw_json: The JSON for the comic
+        :param decoded: The decoded JSON for the comic. Only written with the `DECODED` flag.
+        :return: None
+        """
+        record = dict(raw_json)
+        if self.flags & DECODED:
+            record = [record, None if decoded is None else dict(decoded)]
+        data = zlib.compress(
+            json.dumps(record, ensure_ascii=False, sort_keys=True).encode('utf-8'),
+            self.level
+        )
+        offset = self.file.tell() - self._start
+        self.file.write(data)
+        self._index[comic] = (offset, len(data))
+
+    def close(self):
+        """Write the index and the header. Does not close the underlying file."""
+        index_offset = self.file.tell() - self._start
+        for comic in sorted(self._index):
+            offset, length = self._index[comic]
+            self.file.write(_INDEX_ENTRY.pack(comic, offset, length))
+        end = self.file.tell()
+        self.file.seek(self._start)
+        self.file.write(_HEADER.pack(MAGIC, VERSION, self.flags, len(self._index), index_offset))
+        self.file.seek(end)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+
+
+def dumps(items):
+    """
+    :param Iterable[Tuple[int, Mapping]] items: (comic number, raw JSON) pairs
+    :return: A snapshot as bytes
+    :rtype: bytes
+    """
+    f = io.BytesIO()
+    with SnapshotWriter(f) as writer:
+        for comic, raw_json in items:
+            writer.add(comic, raw_json)
+    return f.getvalue()
@@ -1,18 +1,29 @@
 # Compatibility
 
+import os
+
 try:
     import builtins
 except ImportError:
     import __builtin__ as builtins
 
 try:
-    from urllib.request import urlopen
+    from urllib.error import HTTPError, URLError
+except ImportError:
+    from urllib2 import HTTPError, URLError
+
+try:
+    from urllib.parse import urlsplit, urljoin
+except ImportError:
+    from urlparse import urlsplit, urljoin
+
+try:
+    import http.client as http_client
 except ImportError:
-    from urllib2 import urlopen as _urlopen
-    import contextlib
+    import httplib as http_client
 
-    def urlopen(*args, **kwargs):
-        return contextlib.closing(_urlopen(*args, **kwargs))
+# Python 2's os.rename fails on Windows if the destination exists
+replace = getattr(os, 'replace', os.rename)
 
 try:
     from html.parser import HTMLParser
@@ -0,0 +1,358 @@
+"""
+asyncio interface to the xkcd and What If? APIs. Requires Python 3.6+.
+
+The objects returned are the usual `xkcd` and `WhatIf` objects (in the same
+`_cache` and `_keep_alive` registries), with their data already loaded, so
+accessing their properties afterwards does not block.
+
+Typical usage:
+
+    client = AsyncXkcd(concurrency=16)
+    comic = await client.get(353)
+    print(comic.title)
+    comics = await client.gather(range(1, 101))
+    async for comic in client.range(-10):
+        print(comic.title)
+"""
+
+import asyncio
+import json
+import ssl
+import time
+import timeit
+import email.message
+
+from urllib.error import HTTPError
+from urllib.parse import urlsplit, urljoin
+
+from xxkcd import constants
+from xxkcd import metrics as _metrics
+from xxkcd.metadata import __version__
+from xxkcd.xkcd import xkcd, _transcript_source, _LAST_LATEST as _XKCD_LAST_LATEST
+from xxkcd.what_if import WhatIf, _LAST_LATEST as _WHAT_IF_LAST_LATEST
+from xxkcd.comic import Comic
+from xxkcd._util import coerce_
+
+__all__ = ('AsyncXkcd', 'AsyncWhatIf', 'fetch')
+
+USER_AGENT = 'xxkcd/' + __version__
+
+_REDIRECTS = frozenset((301, 302, 303, 307, 308))
+
+
+async def _read_body(reader, headers):
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0], 16)
+            if size == 0:
+                # Trailers
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length']))
+    return await reader.read()
+
+
+async def _request(url, headers):
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, port, ssl=ssl.create_default_context() if secure else None
+    )
+    try:
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        request_headers = {
+            'Host': parts.netloc, 'User-Agent': USER_AGENT,
+            'Accept-Encoding': 'identity', 'Connection': 'close'
+        }
+        request_headers.update(headers)
+        request = ['GET {} HTTP/1.1'.format(path)]
+        request.extend('{}: {}'.format(k, v) for k, v in request_headers.items())
+        writer.write(('\r\n'.join(request) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+        status_line = (await reader.readline()).decode('latin-1').split(None, 2)
+        if len(status_line) < 2:
+            raise ConnectionError('Invalid HTTP response from {}'.format(url))
+        status = int(status_line[1])
+        reason = status_line[2].strip() if len(status_line) > 2 else ''
+        response_headers = email.message.Message()
+        lowered = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            response_headers[name.strip()] = value.strip()
+            lowered[name.strip().lower()] = value.strip()
+        body = await _read_body(reader, lowered)
+        return status, reason, response_headers, body
+    finally:
+        writer.close()
+
+
+async def fetch(url, headers=None, timeout=30, max_redirects=5):
+    """
+    Make a GET request without blocking the event loop.
+
+    :param str url: URL to request. `http:` and `https:` are supported.
+    :param Optional[Dict[str, str]] headers: Extra request headers
+    :param Optional[float] timeout: Seconds to wait for each response
+    :param int max_redirects: How many redirects to follow
+    :return: The body of the response
+    :rtype: bytes
+    :raises urllib.error.HTTPError: The response had an error status
+    """
+    headers = headers or {}
+    for _ in range(max_redirects + 1):
+        status, reason, response_headers, body = await asyncio.wait_for(_request(url, headers), timeout)
+        if status in _REDIRECTS and 'Location' in response_headers:
+            url = urljoin(url, response_headers['Location'])
+            continue
+        if status >= 400:
+            raise HTTPError(url, status, reason, response_headers, None)
+        return body
+    raise HTTPError(url, status, 'Too many redirects', response_headers, None)
+
+
+class _NeedsLatest(Exception):
+    pass
+
+
+def _needs_latest():
+    raise _NeedsLatest
+
+
+class _AsyncClient(object):
+    _last_latest = None
+
+    def __init__(self, cls, concurrency, fetch):
+        self.cls = cls
+        self.concurrency = concurrency
+        self.fetch = fetch
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _fetch(self, url):
+        async with self._semaphore:
+            metrics = _metrics.active
+            if metrics is None:
+                return await self.fetch(url)
+            kind = _metrics.url_kind(url)
+            start = timeit.default_timer()
+            try:
+                body = await self.fetch(url)
+            except Exception as e:
+                metrics.error(kind, timeit.default_timer() - start, e)
+                raise
+            metrics.request(kind, timeit.default_timer() - start, len(body))
+            return body
+
+    async def gather(self, numbers, keep_alive=False):
+        """
+        Load many at once, making at most `concurrency` requests at a time.
+
+        :param Iterable[Optional[int]] numbers: The numbers to load
+        :param bool keep_alive: Passed to the constructor
+        :return: The loaded objects, in the same order as `numbers`
+        :rtype: list
+        """
+        return await asyncio.gather(*(self.get(n, keep_alive) for n in numbers))
+
+    async def _number(self, n):
+        """Like `coerce_` in the constructor, but awaits `self.latest()` instead of calling `cls.latest()`"""
+        try:
+            return coerce_(n, _needs_latest, self._last_latest)
+        except _NeedsLatest:
+            latest = await self.latest()
+            return coerce_(n, lambda: latest, self._last_latest)
+
+    async def _bound(self, n):
+        """Resolve a negative bound of `range` from the latest"""
+        if n < 0:
+            return max(await self.latest() + 1 + n, 1)
+        return n
+
+    def range(self, from_=1, to=None, step=1, keep_alive=False):
+        """
+        Asynchronously iterate over loaded objects in order, like `cls.range`.
+        Up to `concurrency` objects ahead are loaded while the current one is
+        being used.
+
+        :return: An async iterator
+        """
+        return self._range(from_, to, step, keep_alive)
+
+    async def _range(self, from_, to, step, keep_alive):
+        from_ = await self._bound(from_)
+        if to is None:
+            to = 0 if step < 0 else await self.latest() + 1
+        else:
+            to = await self._bound(to)
+        pending = []
+        numbers = iter(range(from_, to, step))
+        window = self.concurrency
+        for n in numbers:
+            pending.append(asyncio.ensure_future(self.get(n, keep_alive)))
+            if len(pending) >= window:
+                break
+        try:
+            while pending:
+                result = await pending.pop(0)
+                for n in numbers:
+                    pending.append(asyncio.ensure_future(self.get(n, keep_alive)))
+                    break
+                yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class AsyncXkcd(_AsyncClient):
+    """Load `xkcd` comics without blocking the event loop"""
+    _last_latest = _XKCD_LAST_LATEST
+
+    def __init__(self, cls=xkcd, concurrency=8, fetch=fetch):
+        """
+        :param type cls: The `xkcd` class (or a subclass from `xkcd.with_opener`) to load
+        :param int concurrency: Maximum number of requests in progress at once
+        :param fetch: Coroutine function taking a url and returning the body
+            of the response as bytes. Defaults to `xxkcd.aio.fetch`.
+        """
+        super(AsyncXkcd, self).__init__(cls, concurrency, fetch)
+
+    async def get(self, comic=None, keep_alive=False):
+        """
+        :param Optional[int] comic: Same as the `xkcd` constructor
+        :param bool keep_alive: Same as the `xkcd` constructor
+        :return: The comic, with its JSON loaded
+        :rtype: xkcd
+        """
+        cls = self.cls
+        if isinstance(comic, xkcd):
+            comic = comic.comic
+        # Not `cls(comic)`, which calls the blocking `cls.latest()` for comics after `_LAST_LATEST`
+        comic = cls._registered(await self._number(comic), keep_alive)
+        if cls._raw_json.is_cached(comic):
+            return comic
+        raw_json = comic._local_raw_json()
+        if raw_json is None:
+            raw_json = await self._fetch_raw_json(comic)
+        comic._raw_json = raw_json
+        return comic
+
+    async def _fetch_raw_json(self, comic):
+        """Like `comic._fetch_raw_json()`"""
+        raw_json = json.loads((await self._fetch(comic._json_url)).decode('utf-8'))
+        if comic.comic is None:
+            # `fetch` doesn't return the response headers to revalidate with
+            comic._validation = (time.time(), None, None)
+        self.cls._store_raw_json(comic.comic, raw_json)
+        return Comic(raw_json)
+
+    async def latest(self):
+        """
+        The latest comic is checked for again once it is `cls.latest_ttl`
+        seconds old, like `xkcd.latest()`.
+
+        :return: The number of the latest comic
+        :rtype: int
+        """
+        latest = await self.get(None, keep_alive=True)
+        ttl = self.cls.latest_ttl
+        if ttl is not None:
+            validation = latest._validation
+            if validation is None:
+                # Loaded from the store, or before latest_ttl was set
+                latest._validation = (time.time(), None, None)
+            elif time.time() - validation[0] >= ttl:
+                raw_json = await self._fetch_raw_json(latest)
+                del latest.json
+                latest._raw_json = raw_json
+        return latest._raw_json['num']
+
+    async def json(self, comic):
+        """
+        Like `xkcd(comic).json`, but also loads the comic the transcript is taken from.
+
+        :rtype: Mapping[Text, Any]
+        """
+        comic = await self.get(comic)
+        n = comic.comic
+        other = None
+        if n is not None:
+            source = _transcript_source(n)
+            if source != n and source < await self.latest() - 3:
+                # Keep a reference so it is still loaded when `comic.json` needs it
+                other = await self.get(source)
+        decoded = comic.json
+        del other
+        return decoded
+
+    async def read_image(self, comic):
+        """
+        Like `xkcd(comic).read_image()`
+
+        :rtype: bytes
+        """
+        comic = await self.get(comic)
+        if not comic.img:
+            raise ValueError('Comic {} does not have an image!'.format(comic))
+        return await self._fetch(comic.img)
+
+
+class AsyncWhatIf(_AsyncClient):
+    """Load `WhatIf` articles without blocking the event loop"""
+    _last_latest = _WHAT_IF_LAST_LATEST
+
+    def __init__(self, cls=WhatIf, concurrency=8, fetch=fetch):
+        """
+        :param type cls: The `WhatIf` class to load
+        :param int concurrency: Maximum number of requests in progress at once
+        :param fetch: Coroutine function taking a url and returning the body
+            of the response as bytes. Defaults to `xxkcd.aio.fetch`.
+        """
+        super(AsyncWhatIf, self).__init__(cls, concurrency, fetch)
+
+    async def archive(self):
+        """
+        :return: The What If? archive, like `WhatIf.archive`
+        :rtype: Mapping[int, ArchiveEntry]
+        """
+        archive = self.cls.archive
+        if archive._archive is None and archive._load_local() is None:
+            return archive._set(await self._fetch(constants.what_if.archive))
+        return archive.load()
+
+    async def latest(self):
+        """
+        :return: The number of the latest article
+        :rtype: int
+        """
+        return len(await self.archive())
+
+    async def get(self, article=None, keep_alive=False):
+        """
+        :param Optional[int] article: Same as the `WhatIf` constructor
+        :param bool keep_alive: Same as the `WhatIf` constructor
+        :return: The article, with its page loaded
+        :rtype: WhatIf
+        """
+        cls = self.cls
+        if isinstance(article, WhatIf):
+            article = article.article
+        article = cls(await self._number(article), keep_alive)
+        if cls.full_page.is_cached(article):
+            return article
+        page = article._local_full_page()
+        if page is None:
+            page = (await self._fetch(article.url)).decode('utf-8')
+            article._store_full_page(page)
+        article.full_page = page
+        return article
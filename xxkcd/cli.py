@@ -0,0 +1,330 @@
+"""
+The `xxkcd` command.
+
+    xxkcd get 353 1000-1010 latest
+    xxkcd what-if 1-10
+    xxkcd sync --store ~/.cache/xxkcd.sqlite3
+    xxkcd mirror images/
+    xxkcd export --format csv --field num --field title -o titles.csv
+    xxkcd search 'python' --limit 5
+    xxkcd serve --port 8080
+
+Every subcommand takes `--concurrency`, `--rate`, `--store` and
+`--no-bundled`. Comics are read from the cache bundled with xxkcd and the
+store before anything is downloaded, and the rest are downloaded on
+`--concurrency` threads at once.
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import argparse
+
+from xxkcd import xkcd, WhatIf, policy as _policy
+from xxkcd.comic import FIELDS
+from xxkcd.search import FIELDS as SEARCH_FIELDS
+from xxkcd.store import Store
+from xxkcd.proxy import CachingProxy
+from xxkcd._bulk import BulkLoader
+from xxkcd._mirror import ImageMirror
+from xxkcd._snapshot import Snapshot
+from xxkcd._util import range, str_is_bytes
+
+__all__ = ('main',)
+
+_STORE_ENVIRONMENT_VARIABLE = 'XXKCD_STORE'
+
+
+def _write(file, text):
+    if str_is_bytes and isinstance(text, type(u'')):
+        text = text.encode('utf-8')
+    file.write(text)
+
+
+def _parse_numbers(specs, latest):
+    """
+    :param List[str] specs: Comic or article numbers: `n`, `-n` (n before the
+        latest), `latest`, `a-b` (a to b inclusive) or `a-` (a to the latest)
+    :param Callable[[], int] latest: Returns the latest number
+    :return: The numbers, None for the latest
+    :rtype: List[Optional[int]]
+    """
+    numbers = []
+    for spec in specs:
+        if spec == 'latest':
+            numbers.append(None)
+            continue
+        start, dash, end = spec.partition('-')
+        try:
+            if not start:
+                numbers.append(-int(end))
+            elif not dash:
+                numbers.append(int(start))
+            else:
+                numbers.extend(range(int(start), (int(end) if end else latest()) + 1))
+        except ValueError:
+            raise argparse.ArgumentTypeError('Not a number or range of numbers: {!r}'.format(spec))
+    return numbers
+
+
+class _Progress(object):
+    """Prints `done/total` to stderr, on one line"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.shown = False
+
+    def __call__(self, done, total, item):
+        if self.enabled:
+            sys.stderr.write('\r{}/{}'.format(done, total))
+            sys.stderr.flush()
+            self.shown = True
+
+    def finish(self):
+        if self.shown:
+            sys.stderr.write('\n')
+            self.shown = False
+
+
+def _open_output(path):
+    """:return: A text file to write to, and whether it should be closed"""
+    if path is None or path == '-':
+        return sys.stdout, False
+    if str_is_bytes:
+        return open(path, 'wb'), True
+    return io.open(path, 'w', encoding='utf-8', newline=''), True
+
+
+def _report_failed(kind, numbers):
+    if numbers:
+        sys.stderr.write('xxkcd: could not load {} {}\n'.format(kind, ', '.join(map(str, sorted(numbers)))))
+        return 1
+    return 0
+
+
+def _get(args, comics, articles):
+    names = args.field or FIELDS
+    numbers = _parse_numbers(args.numbers or ['latest'], comics.latest)
+    values = comics.fields(
+        *names, numbers=numbers, concurrency=args.concurrency, progress=args.progress, errors='skip'
+    )
+    args.progress.finish()
+    failed = []
+    for n, value in zip(numbers, values):
+        if value is None:
+            failed.append(comics.latest() if n is None else n)
+            continue
+        if len(names) == 1:
+            value = value,
+        _write(sys.stdout, json.dumps(dict(zip(names, value)), sort_keys=True) + '\n')
+    return _report_failed('comics', failed)
+
+
+def _what_if(args, comics, articles):
+    numbers = _parse_numbers(args.numbers or ['latest'], articles.latest)
+    numbers = [articles.latest() if n is None else n for n in numbers]
+    loaded = {}
+    if args.full:
+        loader = BulkLoader(args.concurrency, args.progress, errors='skip')
+        for n, (article, page) in loader.imap(articles._load_full_page, sorted(set(numbers))):
+            if page is not None and not articles.full_page.is_cached(article):
+                article.full_page = page
+            loaded[n] = article
+        args.progress.finish()
+    failed = []
+    for n in numbers:
+        article = loaded.get(n) if args.full else articles(n)
+        if article is None:
+            failed.append(n)
+            continue
+        record = {
+            'number': article.number,
+            'title': article.title,
+            'date': article.date.isoformat(),
+            'url': article.url,
+            'image': article.image,
+        }
+        if args.full:
+            record['question'] = article.question
+            record['attribute'] = article.attribute
+            record['body'] = article.body
+        _write(sys.stdout, json.dumps(record, sort_keys=True) + '\n')
+    return _report_failed('articles', failed)
+
+
+def _sync(args, comics, articles):
+    if comics.store is None:
+        sys.stderr.write('xxkcd: sync needs somewhere to keep the comics (--store or ${})\n'.format(
+            _STORE_ENVIRONMENT_VARIABLE
+        ))
+        return 2
+    added = comics.sync(concurrency=args.concurrency, progress=args.progress, errors='skip')
+    args.progress.finish()
+    sys.stderr.write('Added {} comics\n'.format(len(added)))
+    missing = set()
+    if added:
+        missing.update(range(1, added[-1]))
+        missing.difference_update(comics._cached_numbers())
+        missing.discard(404)
+    return _report_failed('comics', missing)
+
+
+def _mirror(args, comics, articles):
+    numbers = None
+    if args.numbers:
+        numbers = [comics.latest() if n is None else n for n in _parse_numbers(args.numbers, comics.latest)]
+    added = comics.mirror_images(
+        args.directory, concurrency=args.concurrency, numbers=numbers, progress=args.progress, errors='skip'
+    )
+    args.progress.finish()
+    sys.stderr.write('Mirrored {} images\n'.format(len(added)))
+    if numbers is None:
+        numbers = comics.range(read_ahead=0)
+    mirror = ImageMirror(args.directory)
+    return _report_failed('images for comics', [n for n in numbers if n != 404 and n not in mirror])
+
+
+def _export(args, comics, articles):
+    names = args.field or FIELDS
+    if args.numbers:
+        numbers = _parse_numbers(args.numbers, comics.latest)
+    else:
+        numbers = list(comics.range(read_ahead=0))
+    values = comics.fields(
+        *names, numbers=numbers, concurrency=args.concurrency, progress=args.progress, errors='skip'
+    )
+    args.progress.finish()
+    output, close = _open_output(args.output)
+    failed = []
+    try:
+        if args.format == 'csv':
+            writer = csv.writer(output)
+            writer.writerow(names)
+        for n, value in zip(numbers, values):
+            if value is None:
+                failed.append(comics.latest() if n is None else n)
+                continue
+            if len(names) == 1:
+                value = value,
+            if args.format == 'csv':
+                row = [u'' if v is None else v for v in value]
+                if str_is_bytes:
+                    row = [v.encode('utf-8') if isinstance(v, type(u'')) else v for v in row]
+                writer.writerow(row)
+            else:
+                _write(output, json.dumps(dict(zip(names, value)), sort_keys=True) + '\n')
+    finally:
+        if close:
+            output.close()
+    return _report_failed('comics', failed)
+
+
+def _search(args, comics, articles):
+    results = comics.search_index(args.index).search(args.query, args.fields or SEARCH_FIELDS, args.limit)
+    for n, score in results:
+        _write(sys.stdout, u'{}\t{}\n'.format(n, comics(n).title))
+    return 0 if results else 1
+
+
+def _serve(args, comics, articles):
+    proxy = CachingProxy(args.host, args.port, comics, args.max_bytes)
+    sys.stderr.write('Serving the xkcd JSON API and images on {}\n'.format(proxy.base))
+    try:
+        proxy.serve_forever()
+    finally:
+        proxy.shutdown()
+    return 0
+
+
+def _parser():
+    common = argparse.ArgumentParser(add_help=False)
+    group = common.add_argument_group('common options')
+    group.add_argument('-c', '--concurrency', type=int, default=8, help='How many requests to make at once (default: 8)')
+    group.add_argument('--rate', type=float, help='The most requests to make a second (default: no limit)')
+    group.add_argument(
+        '--store', default=os.environ.get(_STORE_ENVIRONMENT_VARIABLE),
+        help='SQLite database to keep downloaded comics and articles in (default: ${})'.format(_STORE_ENVIRONMENT_VARIABLE)
+    )
+    group.add_argument(
+        '--no-bundled', dest='bundled', action='store_false',
+        help="Don't read comics from the cache bundled with xxkcd"
+    )
+    group.add_argument('--progress', action='store_true', help='Show progress on stderr')
+
+    parser = argparse.ArgumentParser(prog='xxkcd', description='Download and search xkcd comics and What If? articles')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    def add(name, function, help):
+        subparser = subparsers.add_parser(name, parents=[common], help=help, description=help)
+        subparser.set_defaults(function=function)
+        return subparser
+
+    numbers_help = 'Numbers (n, -n for n before the latest, latest, a-b or a-)'
+
+    get = add('get', _get, 'Print the JSON of comics, one per line')
+    get.add_argument('numbers', nargs='*', help=numbers_help + ' (default: latest)')
+    get.add_argument('-f', '--field', action='append', choices=FIELDS, help='Only print this field (can be repeated)')
+
+    what_if = add('what-if', _what_if, 'Print What If? articles as JSON, one per line')
+    what_if.add_argument('numbers', nargs='*', help=numbers_help + ' (default: latest)')
+    what_if.add_argument('--full', action='store_true', help='Also download the question, attribution and body')
+
+    add('sync', _sync, 'Download the comics newer than the newest one in the store')
+
+    mirror = add('mirror', _mirror, 'Download comic images into a directory')
+    mirror.add_argument('directory', help='Where to keep the images')
+    mirror.add_argument('numbers', nargs='*', help=numbers_help + ' (default: all)')
+
+    export = add('export', _export, 'Write the JSON of many comics as NDJSON or CSV')
+    export.add_argument('numbers', nargs='*', help=numbers_help + ' (default: all)')
+    export.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson', help='(default: ndjson)')
+    export.add_argument('-f', '--field', action='append', choices=FIELDS, help='Only write this field (can be repeated)')
+    export.add_argument('-o', '--output', help='File to write to (default: stdout)')
+
+    search = add('search', _search, 'Search the title, alt text and transcript of cached comics')
+    search.add_argument('query', help='Words, "phrases" and field:word')
+    search.add_argument('--limit', type=int, default=10, help='The most results to show (default: 10)')
+    search.add_argument('--fields', action='append', choices=SEARCH_FIELDS, help='Only search this field (can be repeated)')
+    search.add_argument('--index', help='File to keep the search index in, so it is only built once')
+
+    serve = add('serve', _serve, 'Run a caching proxy for the xkcd JSON API and images (see xxkcd.proxy)')
+    serve.add_argument('--host', default='127.0.0.1', help='The address to listen on (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=8080, help='The port to listen on (default: 8080)')
+    serve.add_argument(
+        '--max-bytes', type=int, default=64 * 2 ** 20,
+        help='Approximate maximum size of the responses kept in memory (default: 64 MiB)'
+    )
+
+    return parser
+
+
+def main(argv=None, comics=xkcd, articles=WhatIf):
+    """
+    :param Optional[List[str]] argv: The arguments. Defaults to `sys.argv[1:]`.
+    :param type comics: The `xkcd` class (or subclass) to use
+    :param type articles: The `WhatIf` class (or subclass) to use
+    :return: The exit status
+    :rtype: int
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    try:
+        args.progress = _Progress(args.progress)
+        if args.store is not None:
+            comics.store = articles.store = Store(args.store)
+        if args.bundled and comics._snapshot is None:
+            comics._snapshot = Snapshot()
+        limiter = _policy.default_policy.limiter
+        if args.rate is not None:
+            _policy.default_policy.limiter = _policy.RateLimiter(args.rate)
+        try:
+            return args.function(args, comics, articles)
+        finally:
+            _policy.default_policy.limiter = limiter
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        return 130
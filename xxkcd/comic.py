@@ -0,0 +1,106 @@
+"""A compact, read-only record of the JSON of one comic"""
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+__all__ = ('Comic', 'FIELDS')
+
+# The keys every comic has in the xkcd JSON API
+FIELDS = ('month', 'num', 'link', 'year', 'news', 'safe_title', 'transcript', 'alt', 'img', 'title', 'day')
+
+# Fields with few distinct values, which are shared between every comic
+_SHARED_FIELDS = frozenset(('month', 'year', 'news', 'day'))
+_shared = {}
+_STRING_TYPES = (type(u''), type(b''))
+
+# Stands in for fields that a comic doesn't have
+_MISSING = object()
+
+
+class Comic(Mapping):
+    """
+    Immutable JSON of a comic, as a mapping of field name to value.
+
+    Takes much less memory than a `dict`: the fields are stored in slots,
+    and the values of fields that are the same for many comics (like an
+    empty `news`) are the same object. Keys that are not in `FIELDS`
+    (e.g. `extra_parts`) are kept too.
+    """
+    __slots__ = FIELDS + ('_extra',)
+
+    def __init__(self, mapping=(), like=None):
+        """
+        :param Union[Mapping, Iterable[Tuple[str, Any]]] mapping: The JSON of the comic
+        :param Optional[Comic] like: A record (e.g. the raw JSON for this comic)
+            to reuse equal values from
+        """
+        if not isinstance(mapping, Mapping):
+            mapping = dict(mapping)
+        extra = None
+        set_field = object.__setattr__
+        for key in mapping:
+            value = mapping[key]
+            if key not in FIELDS:
+                if extra is None:
+                    extra = {}
+                extra[str(key)] = value
+                continue
+            if key in _SHARED_FIELDS:
+                if isinstance(value, _STRING_TYPES):
+                    value = _shared.setdefault(value, value)
+            elif like is not None and like.get(key, _MISSING) == value:
+                value = like[key]
+            set_field(self, str(key), value)
+        title = self._get('title')
+        if title is not _MISSING and self._get('safe_title') == title:
+            set_field(self, 'safe_title', title)
+        set_field(self, '_extra', extra)
+
+    def _get(self, key):
+        return getattr(self, key, _MISSING)
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            for key in self._extra:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        if key in FIELDS:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def copy(self):
+        """
+        :return: A mutable copy
+        :rtype: dict
+        """
+        return dict(self.items())
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{type.__name__} is immutable'.format(type=type(self)))
+
+    def __delattr__(self, name):
+        raise AttributeError('{type.__name__} is immutable'.format(type=type(self)))
+
+    def __reduce__(self):
+        return type(self), (self.copy(),)
+
+    def __repr__(self):
+        return '{type.__name__}({mapping!r})'.format(type=type(self), mapping=self.copy())
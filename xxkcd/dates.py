@@ -0,0 +1,144 @@
+"""An index of comics by the date they were published"""
+
+import bisect
+import datetime
+import threading
+
+__all__ = ('DateIndex',)
+
+
+def _ordinal(date):
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    return date.toordinal()
+
+
+class DateIndex(object):
+    """
+    Comic numbers sorted by publication date, for range and nearest-date queries.
+
+    Typical usage:
+
+        index = DateIndex()
+        index.update((n, xkcd(n).date) for n in numbers)
+        index.between(datetime.date(2014, 3, 1), datetime.date(2014, 3, 31))
+    """
+
+    def __init__(self):
+        # Sorted (date ordinal, comic number) pairs
+        self._entries = []
+        self._dates = {}
+        self._lock = threading.RLock()
+
+    @property
+    def numbers(self):
+        """
+        :return: The comics in the index
+        :rtype: Set[int]
+        """
+        return set(self._dates)
+
+    def __len__(self):
+        return len(self._dates)
+
+    def __contains__(self, comic):
+        return comic in self._dates
+
+    def add(self, comic, date):
+        """
+        Add (or move) a comic.
+
+        :param int comic: The comic number
+        :param datetime.date date: When the comic was published
+        :return: None
+        """
+        self.update(((comic, date),))
+
+    def update(self, comics):
+        """
+        Add many comics.
+
+        :param Iterable[Tuple[int, datetime.date]] comics: (comic number, date) pairs
+        :return: None
+        """
+        with self._lock:
+            added = []
+            for comic, date in comics:
+                self.remove(comic)
+                ordinal = _ordinal(date)
+                self._dates[comic] = ordinal
+                added.append((ordinal, comic))
+            if len(added) > 16:
+                self._entries.extend(added)
+                self._entries.sort()
+            else:
+                for entry in added:
+                    bisect.insort(self._entries, entry)
+
+    def remove(self, comic):
+        """
+        Remove a comic if it is in the index.
+
+        :param int comic: The comic number
+        :return: None
+        """
+        with self._lock:
+            ordinal = self._dates.pop(comic, None)
+            if ordinal is not None:
+                del self._entries[bisect.bisect_left(self._entries, (ordinal, comic))]
+
+    def date(self, comic):
+        """
+        :param int comic: The comic number
+        :return: When the comic was published, or None if it is not in the index
+        :rtype: Optional[datetime.date]
+        """
+        ordinal = self._dates.get(comic)
+        if ordinal is None:
+            return None
+        return datetime.date.fromordinal(ordinal)
+
+    def between(self, start=None, end=None):
+        """
+        :param Optional[datetime.date] start: The first date to include. None for no limit.
+        :param Optional[datetime.date] end: The last date to include. None for no limit.
+        :return: The comics published from `start` to `end` inclusive, in order of date
+        :rtype: List[int]
+        """
+        with self._lock:
+            entries = self._entries
+            lo = 0 if start is None else bisect.bisect_left(entries, (_ordinal(start),))
+            hi = len(entries) if end is None else bisect.bisect_left(entries, (_ordinal(end) + 1,))
+            return [comic for _, comic in entries[lo:hi]]
+
+    def on(self, date):
+        """
+        :param datetime.date date: The date
+        :return: The comics published on that date
+        :rtype: List[int]
+        """
+        return self.between(date, date)
+
+    def nearest(self, date):
+        """
+        :param datetime.date date: The date
+        :return: The comic published closest to `date` (the earliest one if
+            there is a tie), or None if the index is empty
+        :rtype: Optional[int]
+        """
+        ordinal = _ordinal(date)
+        with self._lock:
+            entries = self._entries
+            if not entries:
+                return None
+            i = bisect.bisect_left(entries, (ordinal,))
+            if i == len(entries):
+                return entries[-1][1]
+            after = entries[i]
+            if i == 0 or after[0] == ordinal:
+                return after[1]
+            before_ordinal = entries[i - 1][0]
+            if ordinal - before_ordinal <= after[0] - ordinal:
+                # The first comic published on the earlier day
+                return entries[bisect.bisect_left(entries, (before_ordinal,))][1]
+            return after[1]
@@ -0,0 +1,118 @@
+"""Image format and dimensions from the first few bytes of an image file"""
+
+import struct
+import collections
+
+__all__ = ('ImageInfo', 'parse_header', 'read_info')
+
+ImageInfo = collections.namedtuple('ImageInfo', ('format', 'width', 'height'))
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_GIF_SIGNATURES = (b'GIF87a', b'GIF89a')
+_JPEG_SIGNATURE = b'\xff\xd8'
+
+# Start of frame markers, which have the dimensions. Not DHT (C4), JPG (C8) or DAC (CC).
+_JPEG_SOF = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+# Markers without a length
+_JPEG_STANDALONE = frozenset((0x01,) + tuple(range(0xD0, 0xD9)))
+
+
+def _parse_jpeg(data):
+    data = bytearray(data)
+    i = 2
+    while True:
+        while i < len(data) and data[i] == 0xFF:
+            # Fill bytes before the marker
+            i += 1
+        if i + 1 > len(data):
+            return None
+        marker = data[i]
+        i += 1
+        if marker in _JPEG_STANDALONE:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise ValueError('JPEG has no frame header before its image data')
+        if i + 2 > len(data):
+            return None
+        length, = struct.unpack_from('>H', data, i)
+        if marker in _JPEG_SOF:
+            if i + 7 > len(data):
+                return None
+            height, width = struct.unpack_from('>HH', data, i + 3)
+            return ImageInfo('jpeg', width, height)
+        i += length
+        if i >= len(data):
+            return None
+        if data[i] != 0xFF:
+            raise ValueError('Invalid JPEG marker')
+
+
+def parse_header(data):
+    """
+    :param bytes data: The start of a PNG, GIF or JPEG file
+    :return: The format ('png', 'gif' or 'jpeg') and dimensions of the image,
+        or None if more of the file is needed to find them
+    :rtype: Optional[ImageInfo]
+    :raises ValueError: The data is not the start of a PNG, GIF or JPEG file
+    """
+    if data.startswith(_PNG_SIGNATURE):
+        if len(data) < 24:
+            return None
+        if data[12:16] != b'IHDR':
+            raise ValueError('PNG does not start with an IHDR chunk')
+        width, height = struct.unpack_from('>II', data, 16)
+        return ImageInfo('png', width, height)
+    if data[:6] in _GIF_SIGNATURES:
+        if len(data) < 10:
+            return None
+        width, height = struct.unpack_from('<HH', data, 6)
+        return ImageInfo('gif', width, height)
+    if data.startswith(_JPEG_SIGNATURE):
+        return _parse_jpeg(data)
+    if len(data) < len(_PNG_SIGNATURE) and any(
+        signature.startswith(data) for signature in (_PNG_SIGNATURE, _JPEG_SIGNATURE) + _GIF_SIGNATURES
+    ):
+        return None
+    raise ValueError('Not a PNG, GIF or JPEG file')
+
+
+def read_info(urlopen, url, first=4096, limit=1 << 20, chunk_size=4096):
+    """
+    Download only as much of an image as is needed to find its format and dimensions.
+
+    If the opener takes request headers, the first `first` bytes are
+    requested with a Range request, then ranges 4 times bigger until the
+    header is found. Otherwise, the response is read until the header is found.
+
+    :param urlopen: The opener (e.g. `xkcd.urlopen`)
+    :param str url: The URL of the image
+    :param int first: The size of the first range to request
+    :param int limit: Give up after this many bytes
+    :param int chunk_size: How many bytes to read at once
+    :return: The format and dimensions of the image
+    :rtype: ImageInfo
+    :raises ValueError: The image isn't a PNG, GIF or JPEG, or its header wasn't in the first `limit` bytes
+    """
+    ranged = getattr(urlopen, 'conditional', False)
+    data = b''
+    end = first
+    while True:
+        if ranged:
+            opened = urlopen(url, {'Range': 'bytes={}-{}'.format(len(data), end - 1)})
+        else:
+            opened = urlopen(url)
+        with opened as http:
+            if getattr(http, 'status', 200) != 206:
+                # The whole image, from the start
+                ranged = False
+                data = b''
+            for chunk in iter(lambda: http.read(chunk_size), b''):
+                data += chunk
+                info = parse_header(data)
+                if info is not None:
+                    return info
+                if len(data) >= limit:
+                    break
+        if not ranged or len(data) < end or len(data) >= limit:
+            raise ValueError('Could not find the dimensions of the image at {}'.format(url))
+        end = min(end * 4, limit)
@@ -0,0 +1,281 @@
+"""
+Counters and latency histograms for HTTP requests, and cache hits and misses.
+
+Nothing is measured until metrics are enabled:
+
+    metrics = xxkcd.metrics.enable()
+    xxkcd.xkcd(1700).json
+    print(metrics.summary())
+
+Requests are counted per kind of URL (see `url_kind`). Caches are counted
+per name: 'raw_json' and 'full_page' hit when found in the store or the
+bundled snapshot instead of downloaded, 'json' hits when it was already
+decoded in the snapshot, 'archive' hits when the What If? archive is
+already loaded, and 'proxy' hits when a `xxkcd.proxy.CachingProxy` already
+has the response. Values cached on an object are not counted again.
+
+To send the measurements somewhere else as well, give hooks. Each is
+called with `(event, name, value)` for the events:
+
+    'request', url kind, seconds (from making the request to closing the response)
+    'bytes', url kind, number of bytes read
+    'error', url kind, the exception
+    'retry', url kind, the exception
+    'hit' or 'miss', cache name, 1
+
+Hooks are called in the thread the event happened in.
+"""
+
+import bisect
+import threading
+import timeit
+
+from xxkcd import constants
+
+__all__ = ('Metrics', 'Histogram', 'enable', 'disable', 'url_kind')
+
+# The enabled `Metrics`, or None. While disabled, instrumented code only checks that this is None.
+active = None
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_URL_KINDS = (
+    (constants.xkcd.images.base, 'image'),
+    (constants.what_if.archive, 'what_if_archive'),
+    (constants.what_if.base + '/imgs/', 'what_if_image'),
+    (constants.what_if.base, 'what_if'),
+    (constants.xkcd.c.what_if.news, 'what_if_news'),
+)
+
+
+def url_kind(url):
+    """
+    :return: What the URL is for: 'json', 'latest_json', 'image',
+        'what_if', 'what_if_archive', 'what_if_image', 'what_if_news' or 'other'
+    :rtype: str
+    """
+    if url.endswith(constants.xkcd.json.suffix):
+        return 'latest_json' if url == constants.xkcd.json.latest else 'json'
+    for prefix, kind in _URL_KINDS:
+        if url.startswith(prefix):
+            return kind
+    return 'other'
+
+
+class Histogram(object):
+    """Counts of values in `BUCKETS`, with their count and sum"""
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        # The last count is for values bigger than every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        :param float q: Between 0 and 1
+        :return: The upper bound of the bucket with the `q` quantile, None
+            if it is in the last bucket or nothing was observed
+        :rtype: Optional[float]
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(zip(self.buckets + ('inf',), self.counts)),
+        }
+
+
+class _ObservedResponse(object):
+    """Counts the bytes read from a response, and reports the request when it is closed"""
+    __slots__ = ('_opened', '_response', '_metrics', '_kind', '_start', '_bytes')
+
+    def __init__(self, opened, metrics, kind, start):
+        self._opened = opened
+        self._response = None
+        self._metrics = metrics
+        self._kind = kind
+        self._start = start
+        self._bytes = 0
+
+    def __enter__(self):
+        self._response = self._opened.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            return self._opened.__exit__(exc_type, exc_val, exc_tb)
+        finally:
+            self._metrics.request(self._kind, timeit.default_timer() - self._start, self._bytes)
+
+    def read(self, *args):
+        data = self._response.read(*args)
+        self._bytes += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._opened if self._response is None else self._response, name)
+
+
+class Metrics(object):
+    """Measurements of requests and caches, safe to update from any thread"""
+
+    def __init__(self, hooks=()):
+        """
+        :param Iterable[Callable[[str, str, Any], None]] hooks: Called with every event
+        """
+        self.hooks = list(hooks)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything measured so far."""
+        with self._lock:
+            self.requests = {}
+            self.errors = {}
+            self.retries = {}
+            self.bytes = {}
+            self.latency = {}
+            self.hits = {}
+            self.misses = {}
+
+    def _emit(self, event, name, value):
+        for hook in self.hooks:
+            hook(event, name, value)
+
+    def observe(self, url, open_, *args):
+        """
+        Open a URL, measuring the request.
+
+        :param str url: The URL being opened
+        :param open_: Function that opens the URL and returns a context manager
+        :param args: Arguments to call `open_` with
+        :return: The response from `open_`, reporting the request when closed
+        """
+        kind = url_kind(url)
+        start = timeit.default_timer()
+        try:
+            opened = open_(*args)
+        except Exception as e:
+            self.error(kind, timeit.default_timer() - start, e)
+            raise
+        return _ObservedResponse(opened, self, kind, start)
+
+    def _observe_latency(self, kind, seconds):
+        histogram = self.latency.get(kind)
+        if histogram is None:
+            histogram = self.latency[kind] = Histogram()
+        histogram.observe(seconds)
+
+    def request(self, kind, seconds, size):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.bytes[kind] = self.bytes.get(kind, 0) + size
+            self._observe_latency(kind, seconds)
+        if self.hooks:
+            self._emit('request', kind, seconds)
+            self._emit('bytes', kind, size)
+
+    def error(self, kind, seconds, error):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+            self._observe_latency(kind, seconds)
+        if self.hooks:
+            self._emit('request', kind, seconds)
+            self._emit('error', kind, error)
+
+    def retry(self, url, error):
+        kind = url_kind(url)
+        with self._lock:
+            self.retries[kind] = self.retries.get(kind, 0) + 1
+        if self.hooks:
+            self._emit('retry', kind, error)
+
+    def hit(self, name):
+        with self._lock:
+            self.hits[name] = self.hits.get(name, 0) + 1
+        if self.hooks:
+            self._emit('hit', name, 1)
+
+    def miss(self, name):
+        with self._lock:
+            self.misses[name] = self.misses.get(name, 0) + 1
+        if self.hooks:
+            self._emit('miss', name, 1)
+
+    def hit_rate(self, name):
+        """
+        :return: The fraction of lookups in the cache that were hits, or None if there were none
+        :rtype: Optional[float]
+        """
+        hits = self.hits.get(name, 0)
+        total = hits + self.misses.get(name, 0)
+        return hits / float(total) if total else None
+
+    def summary(self):
+        """
+        :return: Everything measured, as JSON serializable data
+        :rtype: dict
+        """
+        with self._lock:
+            kinds = sorted(self.requests)
+            return {
+                'requests': dict((kind, {
+                    'count': self.requests[kind],
+                    'errors': self.errors.get(kind, 0),
+                    'retries': self.retries.get(kind, 0),
+                    'bytes': self.bytes.get(kind, 0),
+                    'latency': self.latency[kind].as_dict(),
+                    'p50': self.latency[kind].quantile(0.5),
+                    'p99': self.latency[kind].quantile(0.99),
+                }) for kind in kinds),
+                'caches': dict((name, {
+                    'hits': self.hits.get(name, 0),
+                    'misses': self.misses.get(name, 0),
+                }) for name in set(self.hits) | set(self.misses)),
+            }
+
+    def __repr__(self):
+        return '<{type.__name__} requests={requests!r} hits={hits!r} misses={misses!r}>'.format(
+            type=type(self), requests=self.requests, hits=self.hits, misses=self.misses
+        )
+
+
+def enable(metrics=None):
+    """
+    Start measuring.
+
+    :param Optional[Metrics] metrics: Where to record measurements. Defaults to a new `Metrics()`.
+    :return: The enabled metrics
+    :rtype: Metrics
+    """
+    global active
+    if metrics is None:
+        metrics = Metrics()
+    active = metrics
+    return metrics
+
+
+def disable():
+    """Stop measuring. Responses already open are still measured."""
+    global active
+    active = None
@@ -0,0 +1,202 @@
+"""
+Rate limiting, retries and circuit breaking for HTTP requests.
+
+Every request made by `xkcd`, `WhatIf` and `xkcd.with_opener` subclasses
+goes through `default_policy` (unless another policy is given to
+`with_opener`). To make at most 5 requests a second:
+
+    xxkcd.policy.default_policy.limiter = xxkcd.policy.RateLimiter(5)
+"""
+
+import time
+import random
+import socket
+import threading
+
+from xxkcd import metrics as _metrics
+from xxkcd._util import builtins, http_client, urlsplit, HTTPError, URLError
+
+__all__ = ('Policy', 'RateLimiter', 'CircuitBreaker', 'CircuitOpenError', 'default_policy')
+
+_CONNECTION_ERRORS = (
+    URLError, http_client.HTTPException, socket.timeout,
+    getattr(builtins, 'ConnectionError', socket.error)
+)
+
+
+def is_retryable(error):
+    """
+    :return: True if a request that failed with `error` should be retried:
+        5xx and 429 responses, and connection errors
+    :rtype: bool
+    """
+    if isinstance(error, HTTPError):
+        return error.code >= 500 or error.code == 429
+    return isinstance(error, _CONNECTION_ERRORS)
+
+
+class CircuitOpenError(URLError):
+    """Raised instead of making a request to a host that keeps failing"""
+
+    def __init__(self, host, retry_in):
+        super(CircuitOpenError, self).__init__(
+            'Requests to {} are failing. Not retrying for {:.1f} seconds.'.format(host, retry_in)
+        )
+        self.host = host
+        self.retry_in = retry_in
+
+
+class RateLimiter(object):
+    """
+    A token bucket, shared by every thread: requests are let through at
+    `rate` per second on average, in bursts of up to `burst` at once.
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        :param float rate: Requests per second
+        :param int burst: The most requests let through at once after being idle
+        """
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Wait until a request can be made.
+
+        :return: None
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Take the token now, so threads waiting at the same time don't get the same one
+            self._tokens -= 1
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class CircuitBreaker(object):
+    """
+    Stops requests to a host after `threshold` failures in a row, for
+    `reset_timeout` seconds. Then one request is let through: the circuit
+    closes again if it succeeds, and stays open for another
+    `reset_timeout` seconds if it fails.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        """
+        :param int threshold: Number of failures in a row that opens the circuit
+        :param float reset_timeout: Seconds the circuit stays open for
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        # {host: (failures in a row, time opened or None)}
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def before(self, host):
+        """
+        :raises CircuitOpenError: The circuit for the host is open
+        """
+        with self._lock:
+            failures, opened = self._hosts.get(host, (0, None))
+            if opened is None:
+                return
+            retry_in = opened + self.reset_timeout - time.time()
+            if retry_in > 0:
+                raise CircuitOpenError(host, retry_in)
+            # Half open: let this request through, and keep others out until it is done
+            self._hosts[host] = (failures, time.time())
+
+    def success(self, host):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def failure(self, host):
+        with self._lock:
+            failures, opened = self._hosts.get(host, (0, None))
+            failures += 1
+            if failures >= self.threshold:
+                opened = time.time()
+            self._hosts[host] = (failures, opened)
+
+
+class Policy(object):
+    """
+    Calls an opener with rate limiting, retries with exponential backoff
+    and jitter, and a circuit breaker per host.
+
+    Only 5xx and 429 responses and connection errors are retried, and only
+    while the response is being opened (not while its body is being read).
+    """
+
+    def __init__(self, limiter=None, retries=2, backoff=0.5, max_backoff=30, breaker=None):
+        """
+        :param Optional[RateLimiter] limiter: Limits the rate of requests
+            (including retries). None for no limit.
+        :param int retries: How many times to retry a request
+        :param float backoff: Seconds to wait before the first retry. Doubles
+            with every retry, and a random amount up to the same again is added.
+        :param float max_backoff: The longest to wait before a retry, also
+            used as the limit for `Retry-After` headers
+        :param Optional[CircuitBreaker] breaker: None for no circuit breaker
+        """
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker
+
+    def _delay(self, attempt, error):
+        retry_after = None
+        if isinstance(error, HTTPError) and getattr(error, 'hdrs', None) is not None:
+            retry_after = error.hdrs.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass  # An HTTP date
+        delay = self.backoff * 2 ** attempt
+        return min(delay + random.uniform(0, delay), self.max_backoff)
+
+    def call(self, url, open_, *args):
+        """
+        :param str url: The URL being opened
+        :param open_: Function that opens the URL
+        :param args: Arguments to call `open_` with
+        :return: What `open_(*args)` returns
+        """
+        host = urlsplit(url).hostname
+        for attempt in range(self.retries + 1):
+            if self.breaker is not None:
+                self.breaker.before(host)
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                response = open_(*args)
+            except Exception as e:
+                if not is_retryable(e):
+                    if self.breaker is not None and isinstance(e, HTTPError):
+                        # The server answered, so the host is up
+                        self.breaker.success(host)
+                    raise
+                if self.breaker is not None:
+                    self.breaker.failure(host)
+                if attempt == self.retries:
+                    raise
+                metrics = _metrics.active
+                if metrics is not None:
+                    metrics.retry(url, e)
+                time.sleep(self._delay(attempt, e))
+            else:
+                if self.breaker is not None:
+                    self.breaker.success(host)
+                return response
+
+
+default_policy = Policy(breaker=CircuitBreaker(threshold=10))
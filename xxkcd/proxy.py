@@ -0,0 +1,340 @@
+"""
+A caching HTTP proxy for the xkcd JSON API and comic images.
+
+Many processes can share one proxy, so each comic is only downloaded once:
+
+    proxy = xxkcd.proxy.CachingProxy(port=8080).start()
+
+And in every client:
+
+    xkcdProxied = xkcd.with_opener(xxkcd.proxy.opener('http://proxy-host:8080'), 'xkcdProxied', __name__)
+
+The proxy serves `/info.0.json`, `/{n}/info.0.json` and `/comics/{image}`
+(the paths on xkcd.com and imgs.xkcd.com) from the caches of its `xkcd`
+class: its store, the bundled snapshot if loaded, and the responses it has
+already made, which it keeps up to `max_bytes`. Responses have an ETag,
+and conditional requests are answered with 304 Not Modified. Concurrent
+requests for something that isn't cached yet wait for a single upstream
+request.
+
+The latest comic is checked for again after `xkcd.latest_ttl` seconds.
+"""
+
+import json
+import time
+import hashlib
+import mimetypes
+import threading
+
+from xxkcd import constants
+from xxkcd import metrics as _metrics
+from xxkcd import transport as _transport
+from xxkcd.xkcd import xkcd
+from xxkcd._lru import KeepAlive
+from xxkcd._util import HTTPError
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+__all__ = ('CachingProxy', 'opener')
+
+_IMAGE_HOST = constants.xkcd.with_subdomain(subdomain='imgs')
+
+# Seconds clients may use a comic's JSON or image for without revalidating
+_IMMUTABLE_MAX_AGE = 86400
+
+
+class _CachedResponse(object):
+    __slots__ = ('body', 'etag', 'content_type', 'max_age')
+
+    def __init__(self, body, content_type, max_age, etag=None):
+        self.body = body
+        if etag is None:
+            etag = '"{}"'.format(hashlib.sha256(body).hexdigest()[:32])
+        self.etag = etag
+        self.content_type = content_type
+        self.max_age = max_age
+
+
+def _response_size(response):
+    return len(response.body) + 256
+
+
+class _Call(object):
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Coalescer(object):
+    """
+    Calls a function at most once at a time per key. Callers that ask for
+    a key while it is being called wait for that call and share its result
+    (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def call(self, key, func, *args):
+        """
+        :param key: What is being computed
+        :param func: Function to compute it
+        :param args: Arguments to call `func` with
+        :return: `func(*args)`, from this call or a concurrent one
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+
+class CachingProxy(object):
+    """
+    An HTTP/1.1 server that serves the xkcd JSON API and images from cache,
+    on a thread per connection.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, comics=xkcd, max_bytes=64 * 2 ** 20):
+        """
+        :param str host: The address to listen on
+        :param int port: The port to listen on. 0 for any free port.
+        :param type comics: The `xkcd` class (or subclass) to load comics and images with
+        :param Optional[int] max_bytes: Approximate maximum size of the
+            responses kept in memory. None for no limit.
+        """
+        self.comics = comics
+        self.responses = KeepAlive(max_bytes=max_bytes, sizeof=_response_size)
+        self._coalescer = _Coalescer()
+        # (time checked, raw JSON) of the latest comic
+        self._latest = (None, None)
+        self._thread = None
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Otherwise the body waits for the headers to be acknowledged
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                proxy._handle(self, send_body=True)
+
+            def do_HEAD(self):
+                proxy._handle(self, send_body=False)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+            request_queue_size = 128
+
+        self.httpd = Server((host, port), Handler)
+        self.base = 'http://{}:{}'.format(*self.httpd.server_address[:2])
+
+    def _cached(self, key, load, *args):
+        response = self.responses.get(key)
+        metrics = _metrics.active
+        if metrics is not None:
+            if response is None:
+                metrics.miss('proxy')
+            else:
+                metrics.hit('proxy')
+        if response is not None:
+            self.responses.touch(key)
+            return response
+        return self._coalescer.call(key, self._load, key, load, args)
+
+    def _load(self, key, load, args):
+        # Might have been loaded while waiting for the coalescer
+        response = self.responses.get(key)
+        if response is None:
+            response = load(*args)
+            self.responses[key] = response
+        return response
+
+    def _json_response(self, raw_json, max_age):
+        body = json.dumps(dict(raw_json), sort_keys=True).encode('utf-8')
+        return _CachedResponse(body, 'application/json', max_age)
+
+    def _load_comic(self, n):
+        # Not through `self.comics(n)` or `comic._raw_json`, which may need the
+        # lock on `_raw_json`. It may be held by a client of this proxy in the
+        # same process, waiting for this response.
+        comic = self.comics._registered(n)
+        raw_json = comic._local_raw_json()
+        if raw_json is None:
+            raw_json = comic._fetch_raw_json()
+        return self._json_response(raw_json, _IMMUTABLE_MAX_AGE)
+
+    def _latest_raw_json(self):
+        checked, raw_json = self._latest
+        ttl = self.comics.latest_ttl
+        if raw_json is None or (ttl is not None and time.time() - checked >= ttl):
+            # Concurrent checks for a newer comic are made once
+            raw_json = self._coalescer.call(None, self._load_latest)
+        return raw_json
+
+    def _load_latest(self):
+        previous = self._latest[1]
+        comic = self.comics(keep_alive=True)
+        if previous is None:
+            raw_json = comic._local_raw_json()
+            if raw_json is None:
+                raw_json = comic._fetch_raw_json()
+        else:
+            # None if it hasn't changed
+            raw_json = comic._fetch_raw_json(revalidate=True) or previous
+        self._latest = (time.time(), raw_json)
+        return raw_json
+
+    def _load_image(self, path):
+        with self.comics.urlopen(_IMAGE_HOST + path) as http:
+            body = http.read()
+            headers = getattr(http, 'headers', None)
+        content_type = headers.get('Content-Type') if headers is not None else None
+        if not content_type:
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return _CachedResponse(body, content_type, _IMMUTABLE_MAX_AGE)
+
+    def _route(self, path):
+        """
+        :return: The response for a path
+        :rtype: _CachedResponse
+        :raises HTTPError: The path isn't found here or upstream
+        """
+        path = path.split('?', 1)[0]
+        suffix = constants.xkcd.json.suffix
+        if path == suffix:
+            raw_json = self._latest_raw_json()
+            response = self._cached(raw_json['num'], self._json_response, raw_json, _IMMUTABLE_MAX_AGE)
+            # The same response as for the comic's number, but it changes when there is a new comic
+            return _CachedResponse(response.body, response.content_type, self.comics.latest_ttl or 0, response.etag)
+        if path.endswith(suffix):
+            number = path[1:-len(suffix)]
+            if number.isdigit() and number[0] != '0' and number != '404':
+                n = int(number)
+                # Not cached, so it is found once there is a comic n
+                if n <= self._latest_raw_json()['num']:
+                    return self._cached(n, self._load_comic, n)
+        elif path.startswith('/comics/') and len(path) > len('/comics/'):
+            return self._cached(path, self._load_image, path)
+        raise HTTPError(path, 404, 'Not Found', None, None)
+
+    def _handle(self, handler, send_body):
+        try:
+            response = self._route(handler.path)
+        except HTTPError as e:
+            self._send_error(handler, e.code, e.msg, send_body)
+            return
+        except Exception:
+            self._send_error(handler, 502, 'Bad Gateway', send_body)
+            return
+        etags = handler.headers.get('If-None-Match')
+        if etags is not None and (etags.strip() == '*' or response.etag in (e.strip() for e in etags.split(','))):
+            handler.send_response(304)
+            handler.send_header('ETag', response.etag)
+            handler.send_header('Cache-Control', 'max-age={}'.format(response.max_age))
+            handler.end_headers()
+            return
+        handler.send_response(200)
+        handler.send_header('Content-Type', response.content_type)
+        handler.send_header('Content-Length', str(len(response.body)))
+        handler.send_header('ETag', response.etag)
+        handler.send_header('Cache-Control', 'max-age={}'.format(response.max_age))
+        handler.end_headers()
+        if send_body:
+            handler.wfile.write(response.body)
+
+    @staticmethod
+    def _send_error(handler, status, reason, send_body):
+        body = '{} {}'.format(status, reason).encode('utf-8')
+        handler.send_response(status, reason)
+        handler.send_header('Content-Type', 'text/plain')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if send_body:
+            handler.wfile.write(body)
+
+    def serve_forever(self):
+        """Handle requests in the current thread until `shutdown()` is called."""
+        self.httpd.serve_forever()
+
+    def start(self):
+        """
+        Handle requests on a background thread.
+
+        :return: self
+        :rtype: CachingProxy
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        """Stop handling requests, and close the server's socket."""
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def __repr__(self):
+        return '<{type.__name__} at {base}>'.format(type=type(self), base=self.base)
+
+
+def opener(base, pool=None):
+    """
+    An opener for `xkcd.with_opener` that makes requests for xkcd.com and
+    imgs.xkcd.com to a `CachingProxy` instead.
+
+    :param str base: The URL of the proxy, like `CachingProxy.base`
+    :param Optional[xxkcd.transport.ConnectionPool] pool: The pool to make
+        requests with. Defaults to `xxkcd.transport.default_pool`.
+    :return: The opener
+    """
+    if pool is None:
+        pool = _transport.default_pool
+    base = base.rstrip('/')
+    hosts = (_IMAGE_HOST, constants.xkcd.base)
+
+    def proxied(url, headers=None):
+        for host in hosts:
+            if url.startswith(host):
+                url = base + url[len(host):]
+                break
+        return pool.urlopen(url, headers)
+
+    proxied.conditional = True
+    return proxied
@@ -0,0 +1,274 @@
+"""
+Record responses to a file, and serve them back without a network connection.
+
+To record every request made while loading some comics and What If? articles:
+
+    with xxkcd.replay.Recording('responses.zip', record=True) as recording:
+        xkcdRecorded = xxkcd.xkcd.with_opener(recording, 'xkcdRecorded', __name__)
+        WhatIfRecorded = xxkcd.WhatIf.with_opener(recording, 'WhatIfRecorded', __name__)
+        ...
+
+And to replay them later, raising `NotRecorded` for anything else:
+
+    xkcdReplayed = xxkcd.xkcd.with_opener(xxkcd.replay.Recording('responses.zip'), 'xkcdReplayed', __name__)
+
+The file is a zip archive of an index of the responses and their bodies.
+Identical bodies (like the JSON of the latest comic) are only stored once.
+"""
+
+import io
+import os
+import json
+import hashlib
+import zipfile
+import threading
+
+from xxkcd._util import replace, HTTPError
+
+__all__ = ('Recording', 'RecordedResponse', 'NotRecorded')
+
+VERSION = 1
+
+_INDEX = 'index.json'
+
+# Response headers that are recorded
+_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class NotRecorded(LookupError):
+    """Raised when replaying a request that was not recorded"""
+
+
+class _Headers(dict):
+    """Response headers, looked up case insensitively"""
+
+    def __init__(self, headers=()):
+        super(_Headers, self).__init__((name.lower(), value) for name, value in dict(headers).items())
+
+    def get(self, name, default=None):
+        return super(_Headers, self).get(name.lower(), default)
+
+    def __getitem__(self, name):
+        return super(_Headers, self).__getitem__(name.lower())
+
+    def __contains__(self, name):
+        return super(_Headers, self).__contains__(name.lower())
+
+
+class RecordedResponse(object):
+    """A response served from a `Recording`"""
+    __slots__ = ('url', 'status', 'reason', 'headers', '_body')
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._body = io.BytesIO(body)
+
+    def read(self, n=None):
+        if n is None or n < 0:
+            return self._body.read()
+        return self._body.read(n)
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return '<{type.__name__} [{status}] {url!r}>'.format(type=type(self), status=self.status, url=self.url)
+
+
+def _parse_range(header, size):
+    """:return: (start, end) of a `bytes=start-[end]` range, or None if it can't be satisfied"""
+    unit, _, spec = header.partition('=')
+    start, _, end = spec.partition('-')
+    if unit.strip() != 'bytes' or ',' in spec or not start:
+        return 0, size
+    start = int(start)
+    end = min(int(end) + 1, size) if end else size
+    if start >= size or start >= end:
+        return None
+    return start, end
+
+
+def _not_modified(request_headers, response_headers):
+    """:return: True if a conditional request should get a 304 response"""
+    if 'If-None-Match' in request_headers:
+        return request_headers['If-None-Match'] == response_headers.get('ETag')
+    last_modified = response_headers.get('Last-Modified')
+    return last_modified is not None and request_headers.get('If-Modified-Since') == last_modified
+
+
+class Recording(object):
+    """
+    An opener for `xkcd.with_opener` and `WhatIf.with_opener` that serves
+    responses recorded in a file.
+
+    With `record`, requests that have not been recorded are made with
+    `opener` and their responses recorded. `save()` (or leaving the
+    `with` block) writes every recorded response to the file.
+
+    Whole responses are always recorded. Range and conditional requests
+    are answered from them, with 206 and 304 responses.
+    """
+
+    # Accepts request headers, and returns 304 responses instead of raising
+    conditional = True
+
+    def __init__(self, path, record=False, opener=None):
+        """
+        :param str path: The file of recorded responses. It does not have
+            to exist yet when recording.
+        :param bool record: Make and record requests that are not in the file
+        :param opener: Makes the requests when recording. Defaults to
+            `xxkcd.transport.default_pool`. Called with only the URL.
+        """
+        if opener is None:
+            from xxkcd.transport import default_pool as opener
+        self.path = path
+        self.record = record
+        self.opener = opener
+        # {url: (status, reason, headers, body name)}
+        self.responses = {}
+        # {body name: body} for bodies not yet saved to the file
+        self._bodies = {}
+        self._zip = None
+        self._lock = threading.Lock()
+        if not record or os.path.exists(path):
+            self._open()
+
+    def _open(self):
+        self._zip = zipfile.ZipFile(self.path)
+        index = json.loads(self._zip.read(_INDEX).decode('utf-8'))
+        if index.get('version') != VERSION:
+            self._zip.close()
+            self._zip = None
+            raise ValueError('{!r} is not a version {} xxkcd recording'.format(self.path, VERSION))
+        self.responses = dict(
+            (url, (status, reason, _Headers(headers), body))
+            for url, (status, reason, headers, body) in index['responses'].items()
+        )
+
+    def _body(self, name):
+        with self._lock:
+            body = self._bodies.get(name)
+            if body is None:
+                body = self._zip.read(name)
+        return body
+
+    def _record(self, url):
+        try:
+            opened = self.opener(url)
+        except HTTPError as e:
+            headers = _Headers((name, e.hdrs.get(name)) for name in _HEADERS if e.hdrs and e.hdrs.get(name))
+            entry = (e.code, e.msg, headers, None)
+        else:
+            try:
+                response_headers = getattr(opened, 'headers', None) or {}
+                headers = _Headers(
+                    (name, response_headers.get(name)) for name in _HEADERS if response_headers.get(name)
+                )
+                body = opened.read()
+            finally:
+                opened.close()
+            name = 'bodies/' + hashlib.sha256(body).hexdigest()
+            with self._lock:
+                self._bodies[name] = body
+            entry = (getattr(opened, 'status', 200), getattr(opened, 'reason', 'OK'), headers, name)
+        with self._lock:
+            self.responses[url] = entry
+        return entry
+
+    def __call__(self, url, headers=None):
+        """
+        :param str url: URL to request
+        :param Optional[Dict[str, str]] headers: Request headers. Only range
+            and conditional headers have an effect.
+        :rtype: RecordedResponse
+        :raises NotRecorded: The URL was not recorded, and the recording is not recording
+        :raises urllib.error.HTTPError: The recorded response had an error status
+        """
+        entry = self.responses.get(url)
+        if entry is None:
+            if not self.record:
+                raise NotRecorded('No recorded response for {}'.format(url))
+            entry = self._record(url)
+        status, reason, response_headers, name = entry
+        if status >= 400:
+            raise HTTPError(url, status, reason, response_headers, None)
+        body = self._body(name)
+        headers = headers or {}
+        if _not_modified(headers, response_headers):
+            return RecordedResponse(url, 304, 'Not Modified', response_headers, b'')
+        if headers.get('Range') is not None:
+            byte_range = _parse_range(headers['Range'], len(body))
+            if byte_range is None:
+                raise HTTPError(url, 416, 'Range Not Satisfiable', response_headers, None)
+            if byte_range != (0, len(body)):
+                return RecordedResponse(url, 206, 'Partial Content', response_headers, body[slice(*byte_range)])
+        return RecordedResponse(url, status, reason, response_headers, body)
+
+    def save(self):
+        """
+        Write every recorded response to the file. Replaces the old file
+        all at once, so it is never left half written.
+
+        :return: None
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        temp = self.path + '.tmp'
+        with self._lock:
+            responses = dict(self.responses)
+            written = set()
+            with zipfile.ZipFile(temp, 'w', zipfile.ZIP_DEFLATED) as out:
+                for url, (status, reason, headers, name) in sorted(responses.items()):
+                    if name is None or name in written:
+                        continue
+                    body = self._bodies.get(name)
+                    if body is None:
+                        body = self._zip.read(name)
+                    # Images are already compressed
+                    content_type = headers.get('Content-Type') or ''
+                    compression = zipfile.ZIP_STORED if content_type.startswith('image/') else zipfile.ZIP_DEFLATED
+                    out.writestr(name, body, compression)
+                    written.add(name)
+                out.writestr(_INDEX, json.dumps({
+                    'version': VERSION,
+                    'responses': dict(
+                        (url, [status, reason, dict(headers), name])
+                        for url, (status, reason, headers, name) in responses.items()
+                    )
+                }, sort_keys=True))
+            if self._zip is not None:
+                self._zip.close()
+            replace(temp, self.path)
+            self._bodies.clear()
+            self._open()
+
+    def close(self):
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.record and exc_type is None:
+            self.save()
+        self.close()
+
+    def __repr__(self):
+        return '{type.__name__}({path!r}, record={record!r})'.format(type=type(self), path=self.path, record=self.record)
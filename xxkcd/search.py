@@ -0,0 +1,267 @@
+"""Full-text search over the title, alt text and transcript of comics"""
+
+import re
+import json
+import math
+import threading
+import collections
+
+__all__ = ('SearchIndex', 'FIELDS')
+
+FIELDS = ('title', 'alt', 'transcript')
+
+# How much a match in each field counts for
+WEIGHTS = {'title': 3.0, 'alt': 1.5, 'transcript': 1.0}
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+_QUERY = re.compile(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))', re.UNICODE)
+
+Clause = collections.namedtuple('Clause', ('fields', 'terms', 'required'))
+
+
+def tokenize(text):
+    """
+    :param Text text: Text to split into words
+    :return: The lowercase words in the text
+    :rtype: List[Text]
+    """
+    return _WORD.findall(text.lower())
+
+
+def parse_query(query, fields=FIELDS):
+    """
+    Parse a query into clauses.
+
+    * `word` matches a word in any of `fields`.
+    * `"some words"` only matches those words next to each other.
+    * `title:word` or `alt:"some words"` only match in that field.
+
+    Phrases and clauses restricted to a field are required. At least one
+    of the other words must match if there are no required clauses.
+
+    :param Text query: The query
+    :param Iterable[str] fields: Fields that unrestricted clauses match in
+    :rtype: List[Clause]
+    """
+    fields = tuple(fields)
+    clauses = []
+    for field, phrase, word in _QUERY.findall(query):
+        if field and field.lower() not in FIELDS:
+            # Not a field name, so part of the word (e.g. "12:00")
+            word = field + ':' + (word or phrase)
+            field = ''
+            phrase = ''
+        terms = tokenize(phrase or word)
+        if not terms:
+            continue
+        if field:
+            clauses.append(Clause((field.lower(),), terms, True))
+        else:
+            clauses.append(Clause(fields, terms, len(terms) > 1 or bool(phrase)))
+    return clauses
+
+
+class SearchIndex(object):
+    """
+    An inverted index of comics with BM25 ranking and phrase queries.
+
+    Typical usage:
+
+        index = SearchIndex()
+        index.update((n, xkcd(n).json) for n in numbers)
+        index.search('title:python "import antigravity"')
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        # {field: {term: {comic: [positions]}}}
+        self._postings = dict((field, {}) for field in FIELDS)
+        # {field: {comic: number of words}}
+        self._lengths = dict((field, {}) for field in FIELDS)
+        self._total_lengths = dict.fromkeys(FIELDS, 0)
+        self._lock = threading.RLock()
+
+    @property
+    def numbers(self):
+        """
+        :return: The comics in the index
+        :rtype: Set[int]
+        """
+        return set(self._lengths[FIELDS[0]])
+
+    def __len__(self):
+        return len(self._lengths[FIELDS[0]])
+
+    def __contains__(self, comic):
+        return comic in self._lengths[FIELDS[0]]
+
+    def add(self, comic, fields):
+        """
+        Add (or replace) a comic.
+
+        :param int comic: The comic number
+        :param Mapping[str, Text] fields: The decoded JSON of the comic (`xkcd.json`)
+        :return: None
+        """
+        with self._lock:
+            if comic in self:
+                self.remove(comic)
+            for field in FIELDS:
+                words = tokenize(fields.get(field) or u'')
+                postings = self._postings[field]
+                for position, word in enumerate(words):
+                    postings.setdefault(word, {}).setdefault(comic, []).append(position)
+                self._lengths[field][comic] = len(words)
+                self._total_lengths[field] += len(words)
+
+    def update(self, comics):
+        """
+        Add many comics.
+
+        :param Iterable[Tuple[int, Mapping[str, Text]]] comics: (comic number, decoded JSON) pairs
+        :return: None
+        """
+        with self._lock:
+            for comic, fields in comics:
+                self.add(comic, fields)
+
+    def remove(self, comic):
+        """
+        Remove a comic if it is in the index.
+
+        :param int comic: The comic number
+        :return: None
+        """
+        with self._lock:
+            if comic not in self:
+                return
+            for field in FIELDS:
+                postings = self._postings[field]
+                for word in [word for word, comics in postings.items() if comic in comics]:
+                    del postings[word][comic]
+                    if not postings[word]:
+                        del postings[word]
+                self._total_lengths[field] -= self._lengths[field].pop(comic)
+
+    def _phrase_matches(self, field, terms):
+        """:return: {comic: number of times the phrase appears in the field}"""
+        postings = self._postings[field]
+        try:
+            candidates = [postings[term] for term in terms]
+        except KeyError:
+            return {}
+        matches = {}
+        for comic in set(candidates[0]).intersection(*candidates[1:]):
+            positions = [set(c[comic]) for c in candidates[1:]]
+            count = sum(
+                1 for start in candidates[0][comic]
+                if all(start + i in p for i, p in enumerate(positions, 1))
+            )
+            if count:
+                matches[comic] = count
+        return matches
+
+    def _bm25(self, field, counts):
+        """:return: {comic: score} for a term that appears `counts[comic]` times in field"""
+        lengths = self._lengths[field]
+        n = len(lengths)
+        if not n or not counts:
+            return {}
+        average = float(self._total_lengths[field]) / n or 1.0
+        idf = math.log(1.0 + (n - len(counts) + 0.5) / (len(counts) + 0.5))
+        k1, b = self.k1, self.b
+        weight = WEIGHTS[field]
+        return dict(
+            (comic, weight * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[comic] / average)))
+            for comic, tf in counts.items()
+        )
+
+    def search(self, query, fields=FIELDS, limit=10):
+        """
+        :param Text query: The query. See `parse_query` for the syntax.
+        :param Iterable[str] fields: The fields to search in if a clause isn't restricted to one
+        :param Optional[int] limit: Maximum number of results. None for all of them.
+        :return: (comic number, score) pairs, best match first
+        :rtype: List[Tuple[int, float]]
+        """
+        if fields is None:
+            fields = FIELDS
+        for field in fields:
+            if field not in FIELDS:
+                raise ValueError('Can only search in fields {!r}'.format(FIELDS))
+        clauses = parse_query(query, fields)
+        scores = collections.defaultdict(float)
+        required = None
+        with self._lock:
+            for clause in clauses:
+                matched = set()
+                for field in clause.fields:
+                    if len(clause.terms) == 1:
+                        counts = dict(
+                            (comic, len(positions))
+                            for comic, positions in self._postings[field].get(clause.terms[0], {}).items()
+                        )
+                    else:
+                        counts = self._phrase_matches(field, clause.terms)
+                    for comic, score in self._bm25(field, counts).items():
+                        scores[comic] += score * len(clause.terms)
+                    matched.update(counts)
+                if clause.required:
+                    required = matched if required is None else required & matched
+        if required is not None:
+            results = [(comic, scores[comic]) for comic in required]
+        else:
+            results = list(scores.items())
+        results.sort(key=lambda result: (-result[1], result[0]))
+        if limit is not None:
+            del results[limit:]
+        return results
+
+    def save(self, path):
+        """
+        Write the index to a file.
+
+        :param str path: Where to write the index to
+        :return: None
+        """
+        with self._lock:
+            data = {
+                'postings': dict(
+                    (field, dict(
+                        (term, dict((str(comic), positions) for comic, positions in comics.items()))
+                        for term, comics in postings.items()
+                    ))
+                    for field, postings in self._postings.items()
+                ),
+                'lengths': dict(
+                    (field, dict((str(comic), length) for comic, length in lengths.items()))
+                    for field, lengths in self._lengths.items()
+                )
+            }
+            dumped = json.dumps(data, separators=(',', ':'))
+        with open(path, 'wb') as f:
+            f.write(dumped.encode('ascii'))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an index written by `save`.
+
+        :param str path: Where the index was written to
+        :rtype: SearchIndex
+        """
+        with open(path, 'rb') as f:
+            data = json.loads(f.read().decode('ascii'))
+        self = cls()
+        for field in FIELDS:
+            self._postings[field] = dict(
+                (term, dict((int(comic), positions) for comic, positions in comics.items()))
+                for term, comics in data['postings'][field].items()
+            )
+            lengths = self._lengths[field] = dict(
+                (int(comic), length) for comic, length in data['lengths'][field].items()
+            )
+            self._total_lengths[field] = sum(lengths.values())
+        return self
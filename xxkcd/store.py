@@ -0,0 +1,183 @@
+"""Persistent storage for data fetched from the xkcd APIs"""
+
+import os
+import time
+import sqlite3
+import threading
+
+__all__ = ('Store',)
+
+LATEST = 0
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+'''
+
+
+class Store(object):
+    """
+    An SQLite database of responses, shared between threads and processes.
+
+    Entries are keyed by a namespace (`'xkcd'` for comic JSON, `'what_if'`
+    for What If? pages) and the comic or article number. The latest
+    comic or article is stored under `Store.LATEST` (0).
+
+    Typical usage:
+
+        xkcd.store = WhatIf.store = Store('~/.cache/xxkcd.sqlite3')
+    """
+
+    LATEST = LATEST
+
+    def __init__(self, path, max_age=None, latest_max_age=3600, timeout=30):
+        """
+        :param str path: Path to the database file. Created if it does not exist.
+        :param Optional[float] max_age: Number of seconds an entry stays fresh for.
+            `None` for entries to never go stale.
+        :param Optional[float] latest_max_age: Like `max_age`, but for the
+            entry stored under `Store.LATEST`.
+        :param float timeout: Number of seconds to wait for another process
+            to finish writing.
+        """
+        self.path = os.path.expanduser(path)
+        self.max_age = max_age
+        self.latest_max_age = latest_max_age
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads or across a fork
+        local = self._local
+        pid = os.getpid()
+        if getattr(local, 'pid', None) != pid:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            try:
+                connection.execute('PRAGMA journal_mode=WAL')
+            except sqlite3.DatabaseError:
+                pass
+            connection.execute(_SCHEMA)
+            local.connection = connection
+            local.pid = pid
+        return local.connection
+
+    def _is_fresh(self, key, fetched):
+        max_age = self.latest_max_age if key == LATEST else self.max_age
+        return max_age is None or time.time() - fetched <= max_age
+
+    def get(self, namespace, key):
+        """
+        :param str namespace: The namespace of the entry
+        :param int key: The comic or article number
+        :return: The stored value, or None if it is missing or stale.
+        :rtype: Optional[Text]
+        """
+        row = self._connection().execute(
+            'SELECT value, fetched FROM entries WHERE namespace = ? AND key = ?',
+            (namespace, key)
+        ).fetchone()
+        if row is None or not self._is_fresh(key, row[1]):
+            return None
+        return row[0]
+
+    def put(self, namespace, key, value):
+        """
+        Store a value, replacing any previous value.
+
+        :param str namespace: The namespace of the entry
+        :param int key: The comic or article number
+        :param Text value: Value to store
+        :return: None
+        """
+        self._connection().execute(
+            'INSERT OR REPLACE INTO entries (namespace, key, value, fetched) VALUES (?, ?, ?, ?)',
+            (namespace, key, value, time.time())
+        )
+
+    def put_many(self, namespace, items, replace=True):
+        """
+        Store many values in a single transaction.
+
+        :param str namespace: The namespace of the entries
+        :param Iterable[Tuple[int, Text]] items: (key, value) pairs
+        :param bool replace: False to keep values that are already stored
+        :return: None
+        """
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'INSERT OR {} INTO entries (namespace, key, value, fetched) VALUES (?, ?, ?, ?)'.format(
+                    'REPLACE' if replace else 'IGNORE'
+                ),
+                ((namespace, key, value, now) for key, value in items)
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def delete(self, namespace, key):
+        """
+        Remove an entry if it exists.
+
+        :param str namespace: The namespace of the entry
+        :param int key: The comic or article number
+        :return: None
+        """
+        self._connection().execute(
+            'DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, key)
+        )
+
+    def keys(self, namespace):
+        """
+        :param str namespace: The namespace to list
+        :return: The stored comic or article numbers in ascending order,
+            not including `Store.LATEST`. May include stale entries.
+        :rtype: List[int]
+        """
+        return [row[0] for row in self._connection().execute(
+            'SELECT key FROM entries WHERE namespace = ? AND key != ? ORDER BY key',
+            (namespace, LATEST)
+        )]
+
+    def items(self, namespace):
+        """
+        :param str namespace: The namespace to list
+        :return: (key, value) pairs of the fresh entries in ascending order of
+            key, not including `Store.LATEST`
+        :rtype: Iterator[Tuple[int, Text]]
+        """
+        for key, value, fetched in self._connection().execute(
+            'SELECT key, value, fetched FROM entries WHERE namespace = ? AND key != ? ORDER BY key',
+            (namespace, LATEST)
+        ):
+            if self._is_fresh(key, fetched):
+                yield key, value
+
+    def clear(self, namespace=None):
+        """
+        Remove all entries in a namespace, or every entry if `namespace` is None.
+
+        :return: None
+        """
+        if namespace is None:
+            self._connection().execute('DELETE FROM entries')
+        else:
+            self._connection().execute('DELETE FROM entries WHERE namespace = ?', (namespace,))
+
+    def close(self):
+        """Close this thread's connection to the database."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+        self._local = threading.local()
+
+    def __repr__(self):
+        return '{type.__name__}({path!r})'.format(type=type(self), path=self.path)
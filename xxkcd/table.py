@@ -0,0 +1,162 @@
+"""Column-oriented metadata for many comics at once"""
+
+import array
+import datetime
+import posixpath
+
+from xxkcd import constants
+from xxkcd._util import range
+from xxkcd.xkcd import _transcript_source
+
+__all__ = ('ComicTable',)
+
+# (name, array typecode) of the numeric columns
+NUMERIC_COLUMNS = (
+    ('num', 'i'),
+    ('year', 'i'),
+    ('month', 'b'),
+    ('day', 'b'),
+    ('ordinal', 'i'),  # `datetime.date.toordinal()` of the publication date
+    ('title_length', 'i'),
+    ('alt_length', 'i'),
+    ('has_image', 'b'),
+    ('has_transcript', 'b'),
+    ('has_link', 'b'),
+    ('has_news', 'b'),
+    ('image_ext', 'b'),  # Index into `ComicTable.image_exts`
+)
+
+# Columns that are lists of strings
+TEXT_COLUMNS = ('title', 'img')
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class ComicTable(object):
+    """
+    The metadata of many comics as one array per field, sorted by comic number.
+
+    Numeric columns are `array.array`s (or NumPy arrays, see `to_numpy`).
+    Image extensions are stored as indices into the `image_exts` string table.
+
+    Typical usage:
+
+        table = xkcd.table(numpy=True)
+        table['has_transcript'].mean()
+        table.num[table.year == 2014]
+    """
+
+    columns = tuple(name for name, _ in NUMERIC_COLUMNS) + TEXT_COLUMNS
+
+    def __init__(self, columns, image_exts):
+        self._columns = columns
+        self.image_exts = image_exts
+
+    @classmethod
+    def from_raw_json(cls, raw_jsons, decode=lambda s: s, latest=None):
+        """
+        :param Mapping[int, Mapping] raw_jsons: The raw JSON of each comic, by number
+        :param Callable[[Text], Text] decode: Function to decode the raw title and alt text with
+        :param Optional[int] latest: The number of the latest comic, for
+            which transcripts have been moved to newer comics. Defaults to
+            the newest comic in `raw_jsons`.
+        :rtype: ComicTable
+        """
+        numeric = dict((name, array.array(typecode)) for name, typecode in NUMERIC_COLUMNS)
+        text = dict((name, []) for name in TEXT_COLUMNS)
+        image_exts = ['']
+        ext_codes = {'': 0}
+        blank = constants.xkcd.images.blank
+        if latest is None:
+            latest = max(raw_jsons) if raw_jsons else 0
+        for n in sorted(raw_jsons):
+            raw_json = raw_jsons[n]
+            # The transcript is in another comic's raw JSON, like for `xkcd.json`
+            source = _transcript_source(n)
+            if source != n and source < latest - 3:
+                transcript = raw_jsons[source]['transcript'] if source in raw_jsons else ''
+            else:
+                transcript = raw_json['transcript']
+            year, month, day = _int(raw_json['year']), _int(raw_json['month']), _int(raw_json['day'])
+            try:
+                ordinal = datetime.date(year, month, day).toordinal()
+            except ValueError:
+                ordinal = 0
+            title = decode(raw_json['title'])
+            img = raw_json['img'] if raw_json['img'] != blank else ''
+            ext = posixpath.splitext(posixpath.basename(img))[1].lower()
+            if ext not in ext_codes:
+                ext_codes[ext] = len(image_exts)
+                image_exts.append(ext)
+            row = (
+                n, year, month, day, ordinal, len(title), len(decode(raw_json['alt'])), bool(img),
+                bool(transcript), bool(raw_json['link']), bool(raw_json['news']),
+                ext_codes[ext]
+            )
+            for (name, _), value in zip(NUMERIC_COLUMNS, row):
+                numeric[name].append(value)
+            text['title'].append(title)
+            text['img'].append(img)
+        numeric.update(text)
+        return cls(numeric, tuple(image_exts))
+
+    def __len__(self):
+        return len(self._columns['num'])
+
+    def __getitem__(self, column):
+        """
+        :param str column: The name of the column
+        :return: The column
+        """
+        return self._columns[column]
+
+    def __getattr__(self, column):
+        try:
+            return self.__dict__['_columns'][column]
+        except KeyError:
+            raise AttributeError(column)
+
+    def __contains__(self, column):
+        return column in self._columns
+
+    def row(self, i):
+        """
+        :param int i: The index of the row (not the comic number)
+        :return: The values of every column for that row
+        :rtype: Dict[str, Any]
+        """
+        return dict((name, self._columns[name][i]) for name in self.columns)
+
+    def rows(self):
+        """Iterate over every row as a dict"""
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_numpy(self):
+        """
+        :return: A table whose numeric columns are NumPy arrays (flags are
+            `bool` arrays, the rest share memory with this table's) and whose
+            text columns are NumPy object arrays. Requires NumPy.
+        :rtype: ComicTable
+        """
+        import numpy
+
+        columns = {}
+        for name, typecode in NUMERIC_COLUMNS:
+            column = self._columns[name]
+            if isinstance(column, array.array):
+                column = numpy.frombuffer(column, dtype=typecode)
+            columns[name] = column
+        for name in TEXT_COLUMNS:
+            columns[name] = numpy.array(self._columns[name], dtype=object)
+        for name in ('has_image', 'has_transcript', 'has_link', 'has_news'):
+            columns[name] = columns[name].astype(bool)
+        return type(self)(columns, self.image_exts)
+
+    def __repr__(self):
+        return '<{type.__name__} of {n} comics>'.format(type=type(self), n=len(self))
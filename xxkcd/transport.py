@@ -0,0 +1,242 @@
+"""
+HTTP transport that keeps connections open between requests.
+
+`urlopen` is the default opener for `xkcd`, `WhatIf` and their images, so
+loading many comics only connects to each host once per thread.
+To change how many idle connections are kept per host:
+
+    xxkcd.transport.default_pool.maxsize = 16
+
+Requests made with `urlopen` are rate limited and retried as set by
+`xxkcd.policy.default_policy`, and measured by `xxkcd.metrics` if enabled.
+"""
+
+import ssl
+import socket
+import threading
+import contextlib
+
+from xxkcd import policy as _policy
+from xxkcd import metrics as _metrics
+from xxkcd.metadata import __version__
+from xxkcd._util import http_client, urlsplit, urljoin, HTTPError, URLError
+
+__all__ = ('ConnectionPool', 'Response', 'default_pool', 'urlopen', 'wrap_opener')
+
+USER_AGENT = 'xxkcd/' + __version__
+
+_REDIRECTS = frozenset((301, 302, 303, 307, 308))
+
+
+class Response(object):
+    """
+    A response from a `ConnectionPool`. Returns its connection to the pool
+    when closed after being read to the end.
+    """
+    __slots__ = ('url', 'status', 'reason', 'headers', '_pool', '_key', '_connection', '_response')
+
+    def __init__(self, url, pool, key, connection, response):
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.msg
+        self._pool = pool
+        self._key = key
+        self._connection = connection
+        self._response = response
+
+    def read(self, n=None):
+        """
+        :param Optional[int] n: Maximum number of bytes to read. None or
+            negative to read the rest of the response.
+        :rtype: bytes
+        """
+        if self._response is None:
+            return b''
+        if n is None or n < 0:
+            return self._response.read()
+        return self._response.read(n)
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def close(self):
+        response, self._response = self._response, None
+        if response is None:
+            return
+        connection, self._connection = self._connection, None
+        if response.isclosed() and not response.will_close:
+            self._pool._release(self._key, connection)
+        else:
+            # Unread data would be read as the start of the next response
+            response.close()
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, '_connection', None) is not None:
+            self._connection.close()
+
+    def __repr__(self):
+        return '<{type.__name__} [{status}] {url!r}>'.format(type=type(self), status=self.status, url=self.url)
+
+
+class ConnectionPool(object):
+    """A thread-safe pool of persistent HTTP and HTTPS connections, per host"""
+
+    # Accepts request headers, and returns 304 responses instead of raising
+    conditional = True
+
+    def __init__(self, maxsize=8, timeout=30, max_redirects=5, ssl_context=None):
+        """
+        :param int maxsize: Maximum number of idle connections kept per host
+        :param Optional[float] timeout: Socket timeout in seconds
+        :param int max_redirects: How many redirects to follow
+        :param Optional[ssl.SSLContext] ssl_context: Context for HTTPS connections.
+            Defaults to `ssl.create_default_context()`.
+        """
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.ssl_context = ssl_context
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _new_connection(self, key):
+        scheme, host, port = key
+        if scheme == 'https':
+            if self.ssl_context is None:
+                self.ssl_context = ssl.create_default_context()
+            return http_client.HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context)
+        if scheme == 'http':
+            return http_client.HTTPConnection(host, port, timeout=self.timeout)
+        raise URLError('unknown url type: {}'.format(scheme))
+
+    def _acquire(self, key):
+        """:return: A connection, and whether it has been used before"""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._new_connection(key), False
+
+    def _release(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _request(self, url, headers):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == 'https' else 80))
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        request_headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': 'identity'}
+        if headers:
+            request_headers.update(headers)
+        while True:
+            connection, reused = self._acquire(key)
+            try:
+                connection.request('GET', path, headers=request_headers)
+                return Response(url, self, key, connection, connection.getresponse())
+            except (http_client.HTTPException, socket.error) as e:
+                connection.close()
+                # The server may have closed an idle connection. Try a new one.
+                if not reused:
+                    raise URLError(e)
+
+    def urlopen(self, url, headers=None):
+        """
+        Make a GET request, following redirects. A 304 Not Modified response
+        to a conditional request is returned, not raised.
+
+        :param str url: URL to request
+        :param Optional[Dict[str, str]] headers: Extra request headers
+        :return: The response. Use it as a context manager or close it.
+        :rtype: Response
+        :raises urllib.error.HTTPError: The response had an error status
+        :raises urllib.error.URLError: The request could not be made
+        """
+        for _ in range(self.max_redirects + 1):
+            response = self._request(url, headers)
+            location = response.getheader('Location')
+            if response.status in _REDIRECTS and location:
+                response.read()
+                response.close()
+                url = urljoin(url, location)
+                continue
+            if response.status >= 400:
+                response.read()
+                response.close()
+                raise HTTPError(url, response.status, response.reason, response.headers, None)
+            return response
+        raise HTTPError(url, response.status, 'Too many redirects', response.headers, None)
+
+    __call__ = urlopen
+
+    def clear(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+default_pool = ConnectionPool()
+
+
+def urlopen(url, headers=None):
+    """
+    Make a GET request with `default_pool`, following `xxkcd.policy.default_policy`.
+    See `ConnectionPool.urlopen`.
+
+    :rtype: Response
+    """
+    metrics = _metrics.active
+    if metrics is not None:
+        return metrics.observe(url, _policy.default_policy.call, url, default_pool.urlopen, url, headers)
+    return _policy.default_policy.call(url, default_pool.urlopen, url, headers)
+
+
+urlopen.conditional = True
+
+
+def wrap_opener(opener, policy=None):
+    """
+    Make an opener as described in `xkcd.with_opener` into a `urlopen`
+    function that returns context managers and follows a policy.
+
+    :param opener: The opener
+    :param Optional[xxkcd.policy.Policy] policy: Defaults to `xxkcd.policy.default_policy`
+    :return: The new `urlopen`. It takes request headers if the opener is conditional.
+    """
+    def open_(url, headers=None):
+        if headers is None:
+            return contextlib.closing(opener(url))
+        return contextlib.closing(opener(url, headers))
+
+    if getattr(opener, 'conditional', False):
+        def urlopen(url, headers=None):
+            metrics = _metrics.active
+            if metrics is not None:
+                return metrics.observe(url, (policy or _policy.default_policy).call, url, open_, url, headers)
+            return (policy or _policy.default_policy).call(url, open_, url, headers)
+
+        urlopen.conditional = True
+    else:
+        def urlopen(url):
+            metrics = _metrics.active
+            if metrics is not None:
+                return metrics.observe(url, (policy or _policy.default_policy).call, url, open_, url)
+            return (policy or _policy.default_policy).call(url, open_, url)
+    return urlopen
@@ -1,13 +1,17 @@
+import json
+import codecs
 import datetime
 import collections
-import weakref
 import random
 
 from objecttools import ThreadedCachedProperty
 
 from xxkcd import constants
-from xxkcd._util import urlopen, make_mapping_proxy, range, str_is_bytes, coerce_, dead_weaklink
-from xxkcd._html_parsing import ParseToTree
+from xxkcd import metrics as _metrics
+from xxkcd.transport import urlopen, wrap_opener
+from xxkcd._util import make_mapping_proxy, range, map, str_is_bytes, text_type, coerce_, dead_weaklink
+from xxkcd._html_parsing import ParseToTree, ArchiveParser
+from xxkcd._lru import KeepAlive, weak_entry
 
 __all__ = ('WhatIf',)
 
@@ -16,53 +20,148 @@ ArticlePart = collections.namedtuple('ArticlePart', ('type', 'value'))
 
 
 class Archive(object):
-    _archive = None
+    """The What If? archive page, parsed to `{article number: ArchiveEntry}`"""
     _months = [
         'January', 'February', 'March', 'April', 'May', 'June', 'July',
         'August', 'September', 'October', 'November', 'December'
     ]
 
+    def __init__(self, owner=None):
+        """
+        :param Optional[type] owner: The `WhatIf` class whose `urlopen` is used
+            to download the archive
+        """
+        self.owner = owner
+        self._archive = None
+
     @ThreadedCachedProperty
     def _length(self):
-        return len(self.__get__())
+        return len(self.load())
 
     _length.can_delete = True
 
     def __get__(self, instance=0, owner=None):
         if instance is None:
             return self
-        archive = Archive._archive
+        return self.load()
+
+    def load(self):
+        """
+        The archive is read from the `WhatIf` class's store if it is there
+        and fresh (see `Store.latest_max_age`), and else downloaded and
+        parsed as it is read.
+
+        :return: The archive, loaded if it hasn't been yet
+        :rtype: Mapping[int, ArchiveEntry]
+        """
+        archive = self._archive
+        metrics = _metrics.active
+        if metrics is not None:
+            if archive is None:
+                metrics.miss('archive')
+            else:
+                metrics.hit('archive')
+        if archive is not None:
+            return archive
+        archive = self._load_local()
         if archive is not None:
-            return make_mapping_proxy(archive)
-        parser = ParseToTree()
-        with urlopen(constants.what_if.archive) as http:
-            data = http.read()
-        tree = parser(data)
-        archive = {}
-        for i, archive_entry in enumerate(tree.find_all(Archive._is_archive_entry), 1):
-            c = archive_entry.element_children
-            image = constants.what_if.base + c[0].first_element_child.attr_dict['src']
-            if str_is_bytes:
-                image = image.encode('ascii')
-            archive[i] = ArchiveEntry(
-                image=image,
-                title=c[1].first_element_child.children[0].children,
-                date=self._parse_date(c[2].children[0].children)
-            )
-        article = Archive._archive = make_mapping_proxy(archive)
-        return make_mapping_proxy(article)
+            return archive
+        opener = urlopen if self.owner is None else self.owner.urlopen
+        with opener(constants.what_if.archive) as http:
+            entries = list(self.parse(iter(lambda: http.read(_CHUNK_SIZE), b'')))
+        self._store(entries)
+        return self._set_entries(entries)
+
+    @property
+    def _owner_store(self):
+        """The store of the `WhatIf` class, or None"""
+        return getattr(self.owner, 'store', None)
+
+    def _load_local(self):
+        """
+        Make the archive in the store (if it is fresh) the current archive.
+
+        :return: The archive, or None if it isn't stored
+        :rtype: Optional[Mapping[int, ArchiveEntry]]
+        """
+        store = self._owner_store
+        if store is None:
+            return None
+        stored = store.get(_ARCHIVE_STORE_NAMESPACE, store.LATEST)
+        if stored is None:
+            return None
+        return self._set_entries(
+            self._entry(image, title, datetime.date(*map(int, date.split('-'))))
+            for image, title, date in json.loads(stored)
+        )
+
+    def _store(self, entries):
+        """Write the entries of the archive through to the store"""
+        store = self._owner_store
+        if store is not None:
+            store.put(_ARCHIVE_STORE_NAMESPACE, store.LATEST, json.dumps([
+                [entry.image, entry.title, entry.date.isoformat()] for entry in entries
+            ]))
+
+    @classmethod
+    def parse(cls, chunks):
+        """
+        Parse the archive page as it is read, without building a tree.
+
+        :param Iterable[Union[bytes, Text]] chunks: The page, in pieces.
+            Bytes are decoded as UTF-8.
+        :return: Iterator of the entry for each article, in order
+        :rtype: Iterator[ArchiveEntry]
+        """
+        parser = ArchiveParser()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for chunk in chunks:
+            if not isinstance(chunk, text_type):
+                chunk = decoder.decode(chunk)
+            parser.feed(chunk)
+            for entry in parser.pop_entries():
+                yield cls._parsed_entry(*entry)
+        parser.feed(decoder.decode(b'', True))
+        parser.close()
+        for entry in parser.pop_entries():
+            yield cls._parsed_entry(*entry)
+
+    @classmethod
+    def _parsed_entry(cls, src, title, date):
+        return cls._entry(constants.what_if.base + src, title, cls._parse_date(date))
+
+    @staticmethod
+    def _entry(image, title, date):
+        if str_is_bytes:
+            image = image.encode('ascii')
+        return ArchiveEntry(image=image, title=title, date=date)
+
+    def _set(self, data):
+        """Parse the archive page, store it and make it the current archive"""
+        entries = list(self.parse((data,)))
+        self._store(entries)
+        return self._set_entries(entries)
+
+    def _set_entries(self, entries):
+        """Make the archive entries (in order) the current archive"""
+        archive = self._archive = make_mapping_proxy(dict(enumerate(entries, 1)))
+        del self._length
+        return archive
 
     def __delete__(self, instance):
-        Archive._archive = None
-        del Archive._length
+        self.delete()
+
+    def delete(self):
+        """Forget the archive, so it is downloaded again the next time it is used"""
+        self._archive = None
+        del self._length
+        store = self._owner_store
+        if store is not None:
+            store.delete(_ARCHIVE_STORE_NAMESPACE, store.LATEST)
 
     def __len__(self):
         return self._length
 
-    @staticmethod
-    def _is_archive_entry(node):
-        return node.cls == 'archive-entry'
-
     @classmethod
     def _parse_date(cls, date):
         month, day, year = date.split()
@@ -74,12 +173,24 @@ class Archive(object):
 
 _LAST_LATEST = 157
 
+_STORE_NAMESPACE = 'what_if'
+
+# The archive is stored under `Store.LATEST`, so it goes stale after `Store.latest_max_age`
+_ARCHIVE_STORE_NAMESPACE = 'what_if_archive'
+
+_CHUNK_SIZE = 16384
+
 
 class WhatIf(object):
     __slots__ = ('_article', '__weakref__', '__dict__')
 
+    urlopen = staticmethod(urlopen)
+
+    # An optional `xxkcd.store.Store` to persist article pages
+    store = None
+
     _cache = {}
-    _keep_alive = {}
+    _keep_alive = KeepAlive()
 
     archive = Archive()
 
@@ -93,18 +204,60 @@ class WhatIf(object):
         if self is None:
             self = super(WhatIf, cls).__new__(cls)
             self._article = article
-            cls._cache[article] = weakref.ref(self)
+            cls._cache[article] = weak_entry(cls._cache, article, self)
         if keep_alive:
             cls._keep_alive[article] = self
+        else:
+            cls._keep_alive.touch(article)
         return self
 
+    @staticmethod
+    def with_opener(opener, name='WhatIfWithCustomOpener', module=__name__, qualname=None, metaclass=type, policy=None):
+        """
+        Takes an opener and returns a WhatIf subclass that makes HTTP requests
+        (including for its own copy of the archive) with that opener.
+
+        See `xkcd.with_opener` for the arguments.
+
+        :return: A new subclass of `WhatIf` with a custom `.urlopen` staticmethod.
+        """
+        urlopen = staticmethod(wrap_opener(opener, policy))
+        d = {
+            '__slots__': (),
+            'urlopen': urlopen,
+            'archive': Archive(),
+            '_cache': {},
+            '_keep_alive': KeepAlive(),
+            '__module__': module
+        }
+        if hasattr(object, '__qualname__'):
+            if qualname is None:
+                qualname = module + '.' + name
+            d['__qualname__'] = qualname
+        cls = metaclass(name, (WhatIf,), d)
+        cls.archive.owner = cls
+        return cls
+
     @classmethod
     def latest(cls):
         return len(cls.archive)
 
+    @classmethod
+    def limit_keep_alive(cls, max_entries=None, max_bytes=None):
+        """
+        Limit how many articles are kept alive (by `keep_alive=True`). Past
+        the limits, the least recently used articles are no longer kept alive.
+
+        :param Optional[int] max_entries: Maximum number of articles. None for no limit.
+        :param Optional[int] max_bytes: Approximate maximum memory used by the
+            articles and their pages. None for no limit.
+        :return: None
+        """
+        cls._keep_alive.set_limits(max_entries, max_bytes)
+
     @classmethod
     def random(cls):
-        return WhatIf(random.randint(1, cls.latest()))
+        return cls(random.randint(1, cls.latest()))
 
     @property
     def article(self):
@@ -142,9 +295,9 @@ class WhatIf(object):
     def year(self):
         return self.date.year
 
-    @staticmethod
-    def news():
-        with urlopen(constants.xkcd.c.what_if.news) as http:
+    @classmethod
+    def news(cls):
+        with cls.urlopen(constants.xkcd.c.what_if.news) as http:
             return http.read()
 
     @property
@@ -153,12 +306,63 @@ class WhatIf(object):
             return constants.what_if.latest
         return constants.what_if.for_article(number=self.article)
 
+    @property
+    def _store_key(self):
+        if self.article is None:
+            return self.store.LATEST
+        return self.article
+
     @ThreadedCachedProperty
     def full_page(self):
-        with urlopen(self.url) as http:
-            return http.read().decode('utf-8')
+        page = self._local_full_page()
+        if page is not None:
+            return page
+        return self._fetch_full_page()
+
+    def _fetch_full_page(self):
+        """Download the page, and store it if there is a store"""
+        with self.urlopen(self.url) as http:
+            page = http.read().decode('utf-8')
+        self._store_full_page(page)
+        return page
+
+    def _local_full_page(self):
+        """The page if it can be found without a network request, else None"""
+        page = None
+        if self.store is not None:
+            page = self.store.get(_STORE_NAMESPACE, self._store_key)
+        metrics = _metrics.active
+        if metrics is not None:
+            if page is None:
+                metrics.miss('full_page')
+            else:
+                metrics.hit('full_page')
+        return page
+
+    def _store_full_page(self, page):
+        if self.store is not None:
+            self.store.put(_STORE_NAMESPACE, self._store_key, page)
 
     full_page.can_delete = True
+    full_page.can_set = True
+
+    @classmethod
+    def _load_full_page(cls, n, keep_alive=False):
+        """
+        Load an article's page on a worker thread. The caller should set
+        `article.full_page` to it (unless it is None or has been set since).
+
+        :return: The article and its page, or None if it was already loaded
+        :rtype: Tuple[WhatIf, Optional[Text]]
+        """
+        article = cls(n, keep_alive)
+        if cls.full_page.is_cached(article):
+            return article, None
+        # Not through `article.full_page`, whose lock is shared by every article
+        page = article._local_full_page()
+        if page is None:
+            page = article._fetch_full_page()
+        return article, page
 
     @ThreadedCachedProperty
     def _article_tree(self):
@@ -200,6 +404,8 @@ class WhatIf(object):
         del self.question
         del self.attribute
         del self.body
+        if self.store is not None:
+            self.store.delete(_STORE_NAMESPACE, self._store_key)
         if remove_cache:
             self._keep_alive.pop(self.article, None)
             self._cache.pop(self.article, None)
@@ -298,3 +504,6 @@ class WhatIf(object):
         n = self.article
         n = '' if n is None else n
         return '{type.__name__}({article})'.format(type=type(self), article=n)
+
+
+WhatIf.archive.owner = WhatIf
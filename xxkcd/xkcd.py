@@ -1,27 +1,37 @@
 # coding: utf-8
 
+import os
 import sys
-import weakref
 import json
 import datetime
 import random
+import time
 import functools
+import collections
 import posixpath
-import multiprocessing
 import shutil
-import contextlib
 
 from objecttools import ThreadedCachedProperty
 
+from xxkcd.transport import urlopen, wrap_opener
 from xxkcd._util import (
-    urlopen, reload, unescape, map, str_is_bytes, make_mapping_proxy,
+    reload, unescape, map, str_is_bytes,
     range, short, dead_weaklink, coerce_, index
 )
 from xxkcd import constants
-
-__all__ = ('xkcd', 'load_xkcd_cache')
-
-_404_mock = make_mapping_proxy({
+from xxkcd import metrics as _metrics
+from xxkcd.comic import Comic, FIELDS as _JSON_FIELDS
+from xxkcd._lru import KeepAlive, weak_entry
+from xxkcd._snapshot import Snapshot
+from xxkcd._bulk import BulkLoader, read_ahead as _read_ahead
+from xxkcd._mirror import ImageMirror
+from xxkcd import images as _images
+from xxkcd.search import SearchIndex, FIELDS as _SEARCH_FIELDS
+from xxkcd.dates import DateIndex
+
+__all__ = ('xkcd', 'load_xkcd_cache', 'decode_all')
+
+_404_mock = Comic({
     'month': 4, 'num': 404, 'link': '', 'year': 2008, 'news': u'',
     'safe_title': u'404 not found', 'transcript': u'', 'alt': u'', 'img': '',
     'title': u'404 - Not Found', 'day': 1
@@ -44,6 +54,14 @@ def _decode(s):
     :return: Decoded string
     :rtype: Text
     """
+    if u'&' not in s:
+        try:
+            s.encode('ascii')
+        except UnicodeError:
+            pass
+        else:
+            # Nothing to decode or unescape (most strings)
+            return s
     for _ in range(10):
         try:
             old, s = s, s.encode('latin-1').decode('utf-8')
@@ -54,6 +72,106 @@ def _decode(s):
     return unescape(s)
 
 
+def _transcript_source(comic):
+    """
+    :param int comic: The comic number
+    :return: The number of the comic whose raw JSON has the transcript for `comic`
+    :rtype: int
+    """
+    # These comics messed up the transcripts.
+    # They were interactive comics that didn't have a transcript that
+    # pushed the transcripts for all other comics 1 or 2 ahead.
+    if comic >= 1663:
+        return comic + 3
+    if comic >= 1608:
+        return comic + 2
+    return comic
+
+
+def _raw_date(raw_json):
+    """
+    :param Mapping raw_json: The raw JSON of a comic
+    :return: The date the comic was published, or None if it doesn't have a valid date
+    :rtype: Optional[datetime.date]
+    """
+    try:
+        return datetime.date(short(raw_json['year']), short(raw_json['month']), short(raw_json['day']))
+    except (TypeError, ValueError):
+        return None
+
+
+def _decode_json(raw_json, transcript):
+    """
+    :param Mapping raw_json: The raw JSON of a comic
+    :param Text transcript: The raw transcript that belongs to the comic
+    :return: The decoded JSON (like `xkcd.json`, but with `str` keys in Python 2)
+    :rtype: Dict[Text, Any]
+    """
+    decoded = dict(raw_json)
+    decoded['transcript'] = _decode(transcript)
+    for text_key in ('alt', 'title', 'safe_title'):
+        decoded[text_key] = _decode(decoded[text_key])
+    for int_key in ('day', 'month', 'year'):
+        if decoded[int_key]:
+            decoded[int_key] = short(decoded[int_key])
+        else:
+            decoded[int_key] = None
+    if decoded['img'] == constants.xkcd.images.blank:
+        decoded['img'] = ''
+    return decoded
+
+
+def _native_json(decoded, raw_json=None):
+    """
+    Make decoded JSON into the read-only mapping that `xkcd.json` returns
+
+    :param Mapping decoded: The decoded JSON
+    :param Optional[Comic] raw_json: The raw JSON, to share unchanged values with
+    :rtype: Comic
+    """
+    if str_is_bytes:
+        decoded = dict(decoded)
+        decoded['img'] = decoded['img'].encode('ascii')
+        decoded['link'] = decoded['link'].encode('ascii')
+    return Comic(decoded, raw_json)
+
+
+def decode_all(raw_jsons):
+    """
+    Decode the raw JSON of many comics at once, taking transcripts from the
+    other comics in `raw_jsons`.
+
+    :param Mapping[int, Mapping] raw_jsons: The raw JSON of each comic, by number
+    :return: The decoded JSON of each comic, or None for the newest comics,
+        whose transcripts depend on comics that aren't in `raw_jsons` yet.
+    :rtype: Dict[int, Optional[Dict[Text, Any]]]
+    """
+    latest = max(raw_jsons) if raw_jsons else 0
+    return dict(
+        (n, _decode_from(n, raw_json, raw_jsons.get, latest)) for n, raw_json in raw_jsons.items()
+    )
+
+
+def _decode_from(n, raw_json, get_raw_json, latest):
+    """
+    :param int n: The comic number
+    :param Mapping raw_json: The raw JSON of the comic
+    :param Callable[[int], Optional[Mapping]] get_raw_json: Gets the raw
+        JSON of another comic, or None if it isn't available
+    :param int latest: The number of the newest comic available
+    :return: The decoded JSON of the comic, or None if its transcript isn't available
+    :rtype: Optional[Dict[Text, Any]]
+    """
+    source = _transcript_source(n)
+    if source == n:
+        return _decode_json(raw_json, raw_json['transcript'])
+    if source < latest - 3:
+        source_raw_json = get_raw_json(source)
+        if source_raw_json is not None:
+            return _decode_json(raw_json, source_raw_json['transcript'])
+    return None
+
+
 # Python 2 and Python 3.6+ allow bytes JSON
 _JSON_BYTES = sys.version_info < (3,) or sys.version_info >= (3, 6)
 
@@ -74,11 +192,16 @@ _____ = None
 ______ = reload
 
 
-def _loader(cls, n):
-    return dict(cls(n)._raw_json)
+_LAST_LATEST = 2128
 
+_STORE_NAMESPACE = 'xkcd'
+_IMAGE_INFO_STORE_NAMESPACE = 'xkcd_image_info'
 
-_LAST_LATEST = 2128
+
+def _store_key(comic):
+    if comic is None:
+        return 0
+    return comic
 
 
 class xkcd(object):
@@ -87,8 +210,28 @@ class xkcd(object):
 
     urlopen = staticmethod(urlopen)
 
+    # An optional `xxkcd.store.Store` to persist the JSON for comics
+    store = None
+
+    # Seconds until `latest()` checks for a newer comic. None to never check.
+    latest_ttl = 3600
+
+    # How many comics ahead iterating over comics (or `range()`) loads in the
+    # background while the current comic is being used. 0 to not read ahead.
+    read_ahead = 0
+
+    # (time checked, ETag, Last-Modified) for the latest comic
+    _validation = None
+
+    _search_index = None
+
+    _date_index = None
+
+    # The bundled snapshot, once opened by `load_xkcd_cache()`
+    _snapshot = None
+
     _cache = {}
-    _keep_alive = {}
+    _keep_alive = KeepAlive()
 
     def __new__(cls, comic=None, keep_alive=False):
         """
@@ -107,13 +250,28 @@ class xkcd(object):
             comic = comic.comic
         else:
             comic = coerce_(comic, cls.latest, _LAST_LATEST)
+        return cls._registered(comic, keep_alive)
+
+    @classmethod
+    def _registered(cls, comic, keep_alive=False):
+        """
+        The object for a comic number that has already been resolved, without
+        looking up the latest comic (which needs the lock on `_raw_json`)
+
+        :param Optional[int] comic: Number of the comic. None for the latest.
+        :param bool keep_alive: As for `xkcd(comic, keep_alive)`
+        :return: The xkcd object
+        :rtype: xkcd
+        """
         self = cls._cache.get(comic, dead_weaklink)()
         if self is None:
             self = super(xkcd, cls).__new__(cls)
             self._comic = comic
-            cls._cache[comic] = weakref.ref(self)
+            cls._cache[comic] = weak_entry(cls._cache, comic, self)
         if keep_alive:
             cls._keep_alive[comic] = self
+        else:
+            cls._keep_alive.touch(comic)
         return self
 
     def __getnewargs__(self):
@@ -123,10 +281,13 @@ class xkcd(object):
         return type(self), (self.comic,)
 
     @staticmethod
-    def with_opener(opener, name='xkcdWithCustomOpener', module=__name__, qualname=None, metaclass=type):
+    def with_opener(opener, name='xkcdWithCustomOpener', module=__name__, qualname=None, metaclass=type, policy=None):
         """
         Takes an opener and returns an xkcd subclass that makes HTTP requests with that opener.
 
+        The default opener, `xxkcd.transport.urlopen`, already keeps connections
+        open between requests, so this is only needed to use another HTTP library.
+
         Typical usage:
 
             # The __name__ ensures that the new class is picklable.
@@ -140,6 +301,11 @@ class xkcd(object):
 
         There may be more than one open connection at a time.
 
+        If the opener has a true `conditional` attribute, it may also be called
+        as `opener(url, headers)` with a dict of extra request headers, and the
+        returned object should have a `status` (304 if not modified) and
+        `headers` (with a `get(name)` method).
+
         For example:
 
             import requests
@@ -173,17 +339,21 @@ class xkcd(object):
           Defaults to `module + '.' + name`.
         :param type metaclass: The metaclass of the new object.
           The new class is constructed as `metaclass(name, (xkcd,), <class __dict__>)`.
+        :param Optional[xxkcd.policy.Policy] policy: The rate limit, retries and circuit
+          breaker for requests. Defaults to `xxkcd.policy.default_policy`.
         :return: A new subclass of `xkcd` with a custom `.urlopen` staticmethod.
         """
-        @staticmethod
-        def urlopen(url):
-            return contextlib.closing(opener(url))
+        urlopen = wrap_opener(opener, policy)
+        urlopen = staticmethod(urlopen)
 
         d = {
-          '__slots__': xkcd.__slots__,
+          '__slots__': (),
           'urlopen': urlopen,
           '_cache': {},
-          '_keep_alive': {},
+          '_keep_alive': KeepAlive(),
+          '_snapshot': None,
+          '_search_index': None,
+          '_date_index': None,
           '__module__': module
         }
 
@@ -201,16 +371,98 @@ class xkcd(object):
     @ThreadedCachedProperty
     def _raw_json(self):
         """Raw JSON with a possibly incorrect transcript and alt text"""
-        if self.comic == 404:
-            return make_mapping_proxy(_404_mock)
+        raw_json = self._local_raw_json()
+        if raw_json is not None:
+            return raw_json
+        return self._fetch_raw_json()
+
+    @property
+    def _json_url(self):
         if self.comic is None:
-            url = constants.xkcd.json.latest
+            return constants.xkcd.json.latest
+        return constants.xkcd.json.for_comic(number=self.comic)
+
+    def _local_raw_json(self):
+        """The raw JSON if it can be found without a network request, else None"""
+        raw_json = self._find_local_raw_json()
+        metrics = _metrics.active
+        if metrics is not None:
+            if raw_json is None:
+                metrics.miss('raw_json')
+            else:
+                metrics.hit('raw_json')
+        return raw_json
+
+    def _find_local_raw_json(self):
+        if self.comic == 404:
+            return _404_mock
+        store = self.store
+        if store is not None:
+            stored = store.get(_STORE_NAMESPACE, _store_key(self.comic))
+            if stored is not None:
+                return Comic(json.loads(stored))
+        snapshot = self._snapshot
+        if snapshot is not None and self.comic is not None:
+            record = snapshot.record(self.comic)
+            if record is not None:
+                raw_json, decoded = record
+                if decoded is not None:
+                    # Saves `json` from decoding it again
+                    self.__dict__['_decoded_json'] = decoded
+                # Comics from the snapshot stay loaded like they would have
+                # if the whole snapshot was loaded at once
+                self._keep_alive[self.comic] = self
+                return Comic(raw_json)
+        return None
+
+    def _fetch_raw_json(self, revalidate=False):
+        """
+        Download the raw JSON and write it through to the store.
+        Does not set `self._raw_json`, so does not hold its lock.
+
+        With `revalidate`, makes a conditional request if the opener
+        supports it, and returns None if the JSON has not changed.
+        """
+        url = self._json_url
+        validation = self._validation
+        if revalidate and validation is not None and getattr(self.urlopen, 'conditional', False):
+            headers = {}
+            if validation[1]:
+                headers['If-None-Match'] = validation[1]
+            if validation[2]:
+                headers['If-Modified-Since'] = validation[2]
+            opened = self.urlopen(url, headers)
         else:
-            url = constants.xkcd.json.for_comic(number=self.comic)
-        with self.urlopen(url) as http:
+            opened = self.urlopen(url)
+        with opened as http:
+            if getattr(http, 'status', None) == 304:
+                self._validation = (time.time(),) + validation[1:]
+                return None
+            response_headers = getattr(http, 'headers', None)
             if not _JSON_BYTES:
                 http = _UTF_8_READER(http)
-            return make_mapping_proxy(json.load(http))
+            raw_json = json.load(http)
+        if self.comic is None:
+            if response_headers is None:
+                self._validation = (time.time(), None, None)
+            else:
+                self._validation = (
+                    time.time(), response_headers.get('ETag'), response_headers.get('Last-Modified')
+                )
+        self._store_raw_json(self.comic, raw_json)
+        return Comic(raw_json)
+
+    @classmethod
+    def _store_raw_json(cls, comic, raw_json):
+        """Write raw JSON through to `cls.store`"""
+        store = cls.store
+        if store is None or comic == 404:
+            return
+        dumped = json.dumps(dict(raw_json))
+        if comic is None:
+            store.put(_STORE_NAMESPACE, store.LATEST, dumped)
+            comic = raw_json['num']
+        store.put(_STORE_NAMESPACE, comic, dumped)
 
     _raw_json.can_delete = True
     _raw_json.can_set = True
@@ -245,40 +497,24 @@ class xkcd(object):
             'day' Optional[int]
         }
         """
-        n = self.comic
-        if n is None:
-            pass
-        # These comics messed up the transcripts.
-        # They were interactive comics that didn't have a transcript that
-        # pushed the transcripts for all other comics 1 or 2 ahead.
-        elif n >= 1663:
-            n += 3
-        elif n >= 1608:
-            n += 2
-        if str_is_bytes:
-            other_json = {}
-            raw_json = self._raw_json
-            for key in raw_json:
-                other_json[key.encode('ascii')] = raw_json[key]
-        else:
-            other_json = dict(self._raw_json)
-        if n is not None and n != self.comic and (n < _LAST_LATEST - 3 or n < self.latest() - 3):
-            other_json['transcript'] = _decode(xkcd(n)._raw_json['transcript'])
-        else:
-            other_json['transcript'] = _decode(other_json['transcript'])
-        for text_key in ('alt', 'title', 'safe_title'):
-            other_json[text_key] = _decode(other_json[text_key])
-        for int_key in ('day', 'month', 'year'):
-            if other_json[int_key]:
-                other_json[int_key] = short(other_json[int_key])
+        raw_json = self._raw_json
+        decoded = self.__dict__.pop('_decoded_json', None)
+        metrics = _metrics.active
+        if metrics is not None:
+            if decoded is None:
+                metrics.miss('json')
             else:
-                other_json[int_key] = None
-        if other_json['img'] == constants.xkcd.images.blank:
-            other_json['img'] = ''
-        if str_is_bytes:
-            other_json['img'] = other_json['img'].encode('ascii')
-            other_json['link'] = other_json['link'].encode('ascii')
-        return make_mapping_proxy(other_json)
+                metrics.hit('json')
+        if decoded is not None:
+            # From a pre-decoded snapshot
+            return _native_json(decoded, raw_json)
+        n = self.comic
+        transcript = raw_json['transcript']
+        if n is not None:
+            source = _transcript_source(n)
+            if source != n and (source < _LAST_LATEST - 3 or source < self.latest() - 3):
+                transcript = type(self)(source)._raw_json['transcript']
+        return _native_json(_decode_json(raw_json, transcript), raw_json)
 
     json.can_delete = True
 
@@ -396,6 +632,75 @@ class xkcd(object):
             return None
         return _MIMES.get(ext.lstrip('.').lower(), 'application/octet-stream')
 
+    @property
+    def _image_url(self):
+        """`self.img`, without loading another comic for the transcript like `self.json` might"""
+        img = self._raw_json['img']
+        if img == constants.xkcd.images.blank:
+            return ''
+        return img
+
+    @ThreadedCachedProperty
+    def image_info(self):
+        """
+        The format ('png', 'gif' or 'jpeg'), width and height of the image,
+        found by downloading only the first few KB of it. None if no image.
+
+        Also kept in `self.store` if there is one.
+
+        :rtype: Optional[xxkcd.images.ImageInfo]
+        """
+        return self._load_image_info()
+
+    def _load_image_info(self):
+        """`image_info`, without holding its lock"""
+        url = self._image_url
+        if not url:
+            return None
+        store = self.store
+        key = self._raw_json['num']
+        if store is not None:
+            stored = store.get(_IMAGE_INFO_STORE_NAMESPACE, key)
+            if stored is not None:
+                return _images.ImageInfo(*json.loads(stored))
+        info = _images.read_info(self.urlopen, url)
+        if store is not None:
+            store.put(_IMAGE_INFO_STORE_NAMESPACE, key, json.dumps(list(info)))
+        return info
+
+    image_info.can_set = True
+    image_info.can_delete = True
+
+    @classmethod
+    def image_infos(cls, numbers=None, concurrency=8, progress=None, errors='skip', retries=3):
+        """
+        The `image_info` of many comics, downloaded on a thread pool.
+
+        :param Optional[Iterable[int]] numbers: The comics. Defaults to all of them.
+        :param Optional[int] concurrency: Number of images to read at once
+        :param progress: Same as for `load_all`
+        :param str errors: Same as for `load_all`. Defaults to skipping comics that fail.
+        :param int retries: Same as for `load_all`
+        :return: `{comic_number: image_info}`. Comics without images map to None.
+        :rtype: Dict[int, Optional[xxkcd.images.ImageInfo]]
+        """
+        if numbers is None:
+            numbers = cls.range(read_ahead=0)
+        numbers = [n for n in numbers if n != 404]
+        comics, _ = cls._load_many(numbers, concurrency=concurrency, errors=errors, retries=retries)
+
+        def load(n):
+            comic = comics[n]
+            if cls.image_info.is_cached(comic):
+                return comic.image_info
+            return comic._load_image_info()
+
+        loader = BulkLoader(concurrency, progress, errors, retries)
+        infos = {}
+        for n, info in loader.imap(load, sorted(comics)):
+            comics[n].image_info = infos[n] = info
+        return infos
+
     @property
     def title(self):
         return self.json['title']
@@ -415,10 +720,36 @@ class xkcd(object):
     @classmethod
     def latest(cls):
         """
+        The latest comic is checked for again once it is `cls.latest_ttl`
+        seconds old, with a conditional request if possible.
+
         :return: The number of the latest comic
         :rtype: int
         """
-        return cls(keep_alive=True)._raw_json['num']
+        latest = cls(keep_alive=True)
+        raw_json = latest._raw_json
+        ttl = cls.latest_ttl
+        if ttl is not None:
+            validation = latest._validation
+            if validation is None:
+                # Loaded from the store, or before latest_ttl was set
+                latest._validation = (time.time(), None, None)
+            elif time.time() - validation[0] >= ttl:
+                raw_json = latest._revalidate()
+        return raw_json['num']
+
+    def _revalidate(self):
+        """
+        Re-download the JSON if it has changed since it was last downloaded
+
+        :return: The current raw JSON
+        """
+        raw_json = self._fetch_raw_json(revalidate=True)
+        if raw_json is None:
+            return self._raw_json
+        del self.json
+        self._raw_json = raw_json
+        return raw_json
 
     @classmethod
     def random(cls):
@@ -437,6 +768,11 @@ class xkcd(object):
         """
         del self._raw_json
         del self.json
+        del self.image_info
+        self.__dict__.pop('_validation', None)
+        self.__dict__.pop('_decoded_json', None)
+        if self.store is not None:
+            self.store.delete(_STORE_NAMESPACE, _store_key(self.comic))
         self._keep_alive.pop(self.comic, None)
         self._cache.pop(self.comic, None)
 
@@ -480,47 +816,500 @@ class xkcd(object):
         return '{type.__name__}({number})'.format(type=type(self), number=n)
 
     @classmethod
-    def load_all(cls, processes=None):
+    def load_all(cls, processes=None, concurrency=None, progress=None, errors='raise', retries=3):
         """
         Load all the comics into the cache. Note: Takes a lot of time.
 
-        :param Optional[int] multiprocessed: Number of processes to use
-            in parallel. If `None`, use only the current process.
-        :return: None
+        :param Optional[int] processes: Old name for `concurrency`.
+        :param Optional[int] concurrency: Number of comics to download at once
+            on separate threads. If `None`, use only the current thread.
+        :param progress: If not None, called as `progress(done, total, comic_number)`
+            after each comic is loaded.
+        :param str errors: 'raise' to stop at the first comic that fails to load,
+            'skip' to carry on without it, or 'retry' to retry transient errors
+            up to `retries` times.
+        :param int retries: Maximum number of retries for `errors='retry'`
+        :return: Comics that could not be loaded, as `{comic_number: exception}`
+        :rtype: Dict[int, Exception]
         """
-        if processes is not None:
-            pool = multiprocessing.Pool(processes)
-            data = pool.map(cls._get_loader(), (i for i in cls.range() if not cls._raw_json.is_cached(cls(i, keep_alive=True))))
-            pool.close()
-            pool.join()
-            for n, raw_json in enumerate(data, 1):
-                cls(n, keep_alive=True)._raw_json = make_mapping_proxy(raw_json)
-        else:
-            for n in cls.range():
-                cls(n, keep_alive=True)._raw_json
+        if concurrency is None:
+            concurrency = processes
+        numbers = [i for i in cls.range(read_ahead=0) if not cls._raw_json.is_cached(cls(i, keep_alive=True))]
+        _, failed = cls._load_many(
+            numbers, keep_alive=True, concurrency=concurrency, progress=progress,
+            errors=errors, retries=retries
+        )
         # Load last comic
         cls(keep_alive=True)._raw_json
+        return failed
 
-    # Python 2 doesn't allow pickling classmethod for multiprocessing.
-    if sys.version_info >= (3,):
-        _loader = classmethod(_loader)
+    @classmethod
+    def many(cls, numbers, keep_alive=False, concurrency=8, progress=None, errors='raise', retries=3):
+        """
+        Many comics with their JSON loaded. Comics that aren't cached are
+        downloaded at the same time.
+
+        :param Iterable[Optional[int]] numbers: The comics, as given to the constructor
+        :param bool keep_alive: Same as the constructor
+        :param Optional[int] concurrency: Number of comics to download at once
+        :param progress: Same as for `load_all`
+        :param str errors: Same as for `load_all`
+        :param int retries: Same as for `load_all`
+        :return: The comics, in the same order as `numbers`. None for comics
+            that failed to load with `errors='skip'`.
+        :rtype: List[Optional[xkcd]]
+        """
+        numbers = list(numbers)
+        comics, _ = cls._load_many(
+            collections.OrderedDict.fromkeys(numbers), keep_alive=keep_alive, concurrency=concurrency,
+            progress=progress, errors=errors, retries=retries
+        )
+        return [comics.get(n) for n in numbers]
 
-        @classmethod
-        def _get_loader(cls):
-            return cls._loader
-    else:
-        @classmethod
-        def _get_loader(cls):
-            return functools.partial(_loader, cls)
+    @classmethod
+    def fields(cls, *names, **kwargs):
+        """
+        The values of fields of `json` for many comics. Comics that are
+        cached are read without making `xkcd` objects for them, and the rest
+        are loaded with `many`.
+
+            titles = xkcd.fields('title', numbers=range(1, 501))
+            for title, alt in xkcd.fields('title', 'alt'):
+                ...
+
+        :param str names: Keys of `json`
+        :param Optional[Iterable[int]] numbers: (Keyword only) The comics. Defaults to all of them.
+        :param kwargs: Other keyword arguments are passed to `many`
+        :return: For each comic (in the order of `numbers`), the value of the
+            field if there is one name, or else a tuple of the values. None
+            for comics that failed to load with `errors='skip'`.
+        :rtype: List[Any]
+        """
+        if not names:
+            raise TypeError('fields() needs at least one field name')
+        for name in names:
+            if name not in _JSON_FIELDS:
+                raise ValueError('Not a field of the JSON: {!r}'.format(name))
+        numbers = kwargs.pop('numbers', None)
+        if numbers is None:
+            numbers = cls.range(read_ahead=0)
+        numbers = [cls.latest() if n is None else coerce_(n, cls.latest, _LAST_LATEST) for n in numbers]
+        needed = set(numbers)
+        transcripts = 'transcript' in names
+        latest = _LAST_LATEST
+        if transcripts:
+            # Comics whose raw JSON has the transcript for another comic
+            sources = set(map(_transcript_source, numbers))
+            if any(source >= latest - 3 for source in sources):
+                latest = cls.latest()
+            needed.update(source for source in sources if source < latest - 3)
+        raw_jsons = cls._cached_raw_json(needed)
+        raw_jsons[404] = _404_mock
+        missing = sorted(needed.difference(raw_jsons))
+        if missing:
+            for n, comic in zip(missing, cls.many(missing, **kwargs)):
+                if comic is not None:
+                    raw_jsons[n] = comic._raw_json
+
+        values = []
+        for n in numbers:
+            raw_json = raw_jsons.get(n)
+            if raw_json is None:
+                values.append(None)
+                continue
+            if transcripts:
+                decoded = _decode_from(n, raw_json, raw_jsons.get, latest)
+            else:
+                decoded = _decode_json(raw_json, raw_json['transcript'])
+            if decoded is None:
+                # The transcript depends on whether the comic with it exists yet
+                comic_json = cls(n).json
+            else:
+                comic_json = _native_json(decoded, raw_json)
+            if len(names) == 1:
+                values.append(comic_json[names[0]])
+            else:
+                values.append(tuple(comic_json[name] for name in names))
+        return values
+
+    @classmethod
+    def sync(cls, concurrency=8, progress=None, errors='raise', retries=3):
+        """
+        Load the comics newer than the newest one already cached (in memory,
+        in `cls.store` or in the cache loaded by `load_xkcd_cache()`).
+
+        The latest comic is always re-downloaded to find out how many are missing.
+
+        :param Optional[int] concurrency: Number of comics to download at once
+        :param progress: Same as for `load_all`
+        :param str errors: Same as for `load_all`
+        :param int retries: Same as for `load_all`
+        :return: The numbers of the comics that were added, in ascending order
+        :rtype: List[int]
+        """
+        cached = cls._cached_numbers()
+        cached.discard(404)
+        highest = max(cached) if cached else 0
+        latest = cls(keep_alive=True)
+        raw_json = latest._fetch_raw_json()
+        del latest.json
+        latest._raw_json = raw_json
+        newest = raw_json['num']
+        added = []
+        if newest > highest:
+            cls(newest, keep_alive=True)._raw_json = raw_json
+            added.append(newest)
+        numbers = set(range(highest + 1, newest))
+        # There is no comic 404
+        numbers.discard(404)
+        comics, _ = cls._load_many(
+            sorted(numbers), keep_alive=True, concurrency=concurrency,
+            progress=progress, errors=errors, retries=retries
+        )
+        added.extend(comics)
+        added.sort()
+        return added
+
+    @classmethod
+    def mirror_images(cls, directory, concurrency=8, numbers=None, progress=None, errors='raise', retries=3):
+        """
+        Download the images of many comics into a directory, skipping the
+        ones that are already there.
+
+        Images are stored once per distinct image under `objects/`, named by
+        the SHA-256 of their contents. `manifest.json` maps each comic to its
+        image file. Downloads that were interrupted (kept in `partial/`) are
+        resumed with a Range request if the opener supports request headers.
+
+        Typical usage:
+
+            xkcd.mirror_images('images', concurrency=16)
+            with open('images/manifest.json') as f:
+                manifest = json.load(f)
+
+        :param str directory: Where to keep the images. Created if it doesn't exist.
+        :param Optional[int] concurrency: Number of images to download at once
+        :param Optional[Iterable[int]] numbers: The comics to mirror. Defaults to all of them.
+        :param progress: Same as for `load_all`, but called after each image is downloaded
+        :param str errors: Same as for `load_all`
+        :param int retries: Same as for `load_all`
+        :return: The numbers of the comics that were added to the mirror, in ascending order
+        :rtype: List[int]
+        """
+        mirror = ImageMirror(directory)
+        if numbers is None:
+            numbers = cls.range(read_ahead=0)
+        numbers = [n for n in numbers if n != 404 and n not in mirror]
+        comics, _ = cls._load_many(numbers, concurrency=concurrency, errors=errors, retries=retries)
+        urls = dict((n, comic._image_url) for n, comic in comics.items())
+        loader = BulkLoader(concurrency, progress, errors, retries)
+        added = []
+        try:
+            for n, _ in loader.imap(lambda n: mirror.add(n, urls[n], cls.urlopen), sorted(urls)):
+                added.append(n)
+        finally:
+            mirror.save()
+        added.sort()
+        return added
+
+    @classmethod
+    def search(cls, query, fields=_SEARCH_FIELDS, limit=10):
+        """
+        Search the title, alt text and transcript of every cached comic
+        (see `_cached_numbers` and `_cached_json`). Comics are ranked with
+        BM25. No comics are downloaded.
+
+        Query syntax: `word`, `"a phrase"`, `title:word`, `transcript:"a phrase"`.
+        Phrases and words restricted to a field must match.
+
+        :param Text query: What to search for
+        :param Iterable[str] fields: Fields to search in. Any of 'title', 'alt' and 'transcript'.
+        :param Optional[int] limit: Maximum number of results. None for all of them.
+        :return: The matching comics, best match first
+        :rtype: List[xkcd]
+        """
+        # Not `cls(n)`, which may look up the latest comic for comics after `_LAST_LATEST`
+        return [cls._registered(n) for n, _ in cls.search_index().search(query, fields, limit)]
+
+    @classmethod
+    def search_index(cls, path=None):
+        """
+        The index used by `search`, with any comics cached since the last
+        call added to it.
+
+        :param Optional[str] path: A file to keep the index in. It is read if
+            the index hasn't been loaded yet, and written if comics were added.
+        :rtype: xxkcd.search.SearchIndex
+        """
+        index = cls._search_index
+        if index is None:
+            if path is not None and os.path.exists(path):
+                index = SearchIndex.load(path)
+            else:
+                index = SearchIndex()
+            cls._search_index = index
+        missing = cls._cached_numbers(index.numbers)
+        missing.discard(404)
+        if missing:
+            index.update(sorted(cls._cached_json(missing).items()))
+        if path is not None and (missing or not os.path.exists(path)):
+            index.save(path)
+        return index
+
+    @classmethod
+    def date_index(cls):
+        """
+        The index used by `between`, `on` and `nearest`, with any comics
+        cached since the last call added to it.
+
+        :rtype: xxkcd.dates.DateIndex
+        """
+        index = cls._date_index
+        if index is None:
+            index = cls._date_index = DateIndex()
+        missing = cls._cached_numbers(index.numbers)
+        # Never added, so it would be looked for every time
+        missing.discard(404)
+        if missing:
+            dates = []
+            for n, raw_json in cls._cached_raw_json(missing).items():
+                date = _raw_date(raw_json)
+                if date is not None:
+                    dates.append((n, date))
+            index.update(dates)
+        return index
+
+    @classmethod
+    def between(cls, start=None, end=None):
+        """
+        The cached comics (see `_cached_numbers`) published between two dates.
+
+        Typical usage:
+
+            xkcd.between(datetime.date(2014, 3, 1), datetime.date(2014, 3, 31))
+
+        :param Optional[datetime.date] start: The first date to include. None for no limit.
+        :param Optional[datetime.date] end: The last date to include. None for no limit.
+        :return: The comics in order of publication
+        :rtype: List[xkcd]
+        """
+        return [cls(n) for n in cls.date_index().between(start, end)]
+
+    @classmethod
+    def on(cls, date):
+        """
+        :param datetime.date date: The date
+        :return: The cached comics published on that date
+        :rtype: List[xkcd]
+        """
+        return [cls(n) for n in cls.date_index().on(date)]
+
+    @classmethod
+    def nearest(cls, date):
+        """
+        :param datetime.date date: The date
+        :return: The cached comic published closest to that date, or None if no comics are cached
+        :rtype: Optional[xkcd]
+        """
+        n = cls.date_index().nearest(date)
+        if n is None:
+            return None
+        return cls(n)
+
+    @classmethod
+    def table(cls, numpy=False):
+        """
+        The metadata of every cached comic (see `_cached_raw_json`) as columns.
+
+        :param bool numpy: True for NumPy arrays instead of `array.array`s
+        :rtype: xxkcd.table.ComicTable
+        """
+        from xxkcd.table import ComicTable
+
+        table = ComicTable.from_raw_json(cls._cached_raw_json(), _decode)
+        if numpy:
+            return table.to_numpy()
+        return table
+
+    @classmethod
+    def _cached_numbers(cls, known=frozenset()):
+        """
+        :param Set[int] known: Numbers that don't need to be checked
+        :return: The numbers of the comics whose JSON is available without a
+            network request, except for those in `known`
+        :rtype: Set[int]
+        """
+        numbers = set()
+        for n, comic in list(cls._cache.items()):
+            if n is None or n in known:
+                continue
+            comic = comic()
+            if comic is not None and cls._raw_json.is_cached(comic):
+                numbers.add(n)
+        if cls.store is not None:
+            # Not `keys`, which has stale entries that would be downloaded again
+            numbers.update(n for n, _ in cls.store.items(_STORE_NAMESPACE))
+        if cls._snapshot is not None:
+            numbers.update(cls._snapshot.numbers())
+        numbers.difference_update(known)
+        return numbers
+
+    @classmethod
+    def _cached_raw_json(cls, numbers=None):
+        """
+        Read cached comics' raw JSON without making `xkcd` objects for them.
+        Comics in memory take precedence over `cls.store`, which takes
+        precedence over the snapshot.
+
+        :param Optional[Set[int]] numbers: The comics to read. None for all of them.
+        :return: The raw JSON of every cached comic except 404
+        :rtype: Dict[int, Mapping[Text, Any]]
+        """
+        raw_jsons = {}
+        snapshot = cls._snapshot
+        if snapshot is not None:
+            for n in snapshot.numbers() if numbers is None else snapshot.numbers() & numbers:
+                raw_jsons[n] = snapshot.get(n)
+        if cls.store is not None:
+            for n, stored in cls.store.items(_STORE_NAMESPACE):
+                if numbers is None or n in numbers:
+                    raw_jsons[n] = json.loads(stored)
+        for n, comic in list(cls._cache.items()):
+            if n is None or (numbers is not None and n not in numbers):
+                continue
+            comic = comic()
+            if comic is not None and cls._raw_json.is_cached(comic):
+                raw_jsons[n] = comic._raw_json
+        raw_jsons.pop(404, None)
+        return raw_jsons
+
+    @classmethod
+    def _cached_json(cls, numbers):
+        """
+        Like `_cached_raw_json`, but decoded like `json`, without any network
+        requests. Comics whose transcript is in a comic that isn't cached
+        (or might not exist yet) are left out.
+
+        :param Set[int] numbers: The comics to read
+        :return: The JSON of the comics in `numbers` that can be decoded, except 404
+        :rtype: Dict[int, Comic]
+        """
+        raw_jsons = cls._cached_raw_json(numbers)
+        raw_jsons.update(cls._cached_raw_json(set(map(_transcript_source, raw_jsons)).difference(raw_jsons)))
+        latest = cls._cache.get(None, dead_weaklink)()
+        if latest is not None and cls._raw_json.is_cached(latest):
+            latest = latest._raw_json['num']
+        else:
+            latest = None
+        # There are at least this many comics
+        at_least = max(_LAST_LATEST, max(raw_jsons) if raw_jsons else 0)
+        comic_jsons = {}
+        for n in numbers:
+            raw_json = raw_jsons.get(n)
+            if raw_json is None:
+                continue
+            decoded = _decode_from(n, raw_json, raw_jsons.get, latest or at_least)
+            if decoded is None:
+                if latest is None or _transcript_source(n) < latest - 3:
+                    # Added once the comic with its transcript is cached
+                    continue
+                # Its transcript hasn't been moved to a newer comic yet
+                decoded = _decode_json(raw_json, raw_json['transcript'])
+            comic_jsons[n] = _native_json(decoded, raw_json)
+        return comic_jsons
+
+    @classmethod
+    def _load_many(cls, numbers, keep_alive=False, **kwargs):
+        """
+        Load the raw JSON for many comics with a `BulkLoader`.
+
+        :param Iterable[int] numbers: Comics to load
+        :param bool keep_alive: Passed to the constructor
+        :param kwargs: Passed to `BulkLoader`
+        :return: The loaded comics as `{comic_number: comic}`, and the ones that
+            could not be loaded as `{comic_number: exception}`
+        :rtype: Tuple[Dict[int, xkcd], Dict[int, Exception]]
+        """
+        loader = BulkLoader(**kwargs)
+        comics = {}
+        for n, (comic, raw_json) in loader.imap(functools.partial(cls._load_raw_json, keep_alive=keep_alive), numbers):
+            if raw_json is not None and not cls._raw_json.is_cached(comic):
+                comic._raw_json = raw_json
+            comics[n] = comic
+        return comics, loader.failed
+
+    @classmethod
+    def _load_raw_json(cls, n, keep_alive=False):
+        """
+        Load a comic's raw JSON on a worker thread. The caller should set
+        `comic._raw_json` to it (unless it is None or has been set since).
+
+        :return: The comic and its raw JSON, or None if it was already loaded
+        :rtype: Tuple[xkcd, Optional[Comic]]
+        """
+        comic = cls(n, keep_alive)
+        if cls._raw_json.is_cached(comic):
+            return comic, None
+        # Not through `comic._raw_json`, whose lock is shared by every comic
+        raw_json = comic._local_raw_json()
+        if raw_json is None:
+            raw_json = comic._fetch_raw_json()
+        return comic, raw_json
+
+    @classmethod
+    def prefetch(cls, numbers, window=8, keep_alive=False):
+        """
+        Iterate over comics, loading the JSON of the next `window` comics in
+        the background while the current one is being used. Stops loading
+        when iteration stops.
+
+            for comic in xkcd.prefetch(range(1, 501), window=16):
+                print(comic.title)
+
+        :param Iterable[Optional[int]] numbers: The comics, as given to the constructor
+        :param int window: How many comics to load ahead
+        :param bool keep_alive: Same as the constructor
+        :return: Iterator of the comics
+        :rtype: Iterator[xkcd]
+        """
+        for _, comic in cls._prefetch(numbers, window, keep_alive):
+            yield comic
+
+    @classmethod
+    def _prefetch(cls, numbers, window, keep_alive=False):
+        """:return: Iterator of `(n, comic)`, where comic is loaded in the background"""
+        for n, loaded in _read_ahead(numbers, functools.partial(cls._load_raw_json, keep_alive=keep_alive), window):
+            if loaded is None:
+                # Failed in the background. Using the comic will try again.
+                comic = cls(n, keep_alive)
+            else:
+                comic, raw_json = loaded
+                if raw_json is not None and not cls._raw_json.is_cached(comic):
+                    comic._raw_json = raw_json
+            yield n, comic
 
     @classmethod
     def load_one(cls, n):
         cls(n, keep_alive=True)._raw_json
 
+    @classmethod
+    def limit_keep_alive(cls, max_entries=None, max_bytes=None):
+        """
+        Limit how many comics are kept alive (by `keep_alive=True`, `load_all`
+        or `load_xkcd_cache()`). Past the limits, the least recently used comics
+        are no longer kept alive, and are garbage collected if nothing else uses them.
+
+        :param Optional[int] max_entries: Maximum number of comics. None for no limit.
+        :param Optional[int] max_bytes: Approximate maximum memory used by the
+            comics and their loaded data. None for no limit.
+        :return: None
+        """
+        cls._keep_alive.set_limits(max_entries, max_bytes)
+
     @classmethod
     def delete_all(cls):
         cls._keep_alive.clear()
-        for comic in cls._cache.values():
+        for comic in list(cls._cache.values()):
             comic = comic()
             if comic is not None:
                 comic.delete()
@@ -528,6 +1317,8 @@ class xkcd(object):
     @classmethod
     def delete_one(cls, comic):
         comic = index(comic)
+        if cls.store is not None:
+            cls.store.delete(_STORE_NAMESPACE, comic)
         cls._keep_alive.pop(comic, None)
         comic = cls._cache.get(comic, dead_weaklink)()
         if comic is not None:
@@ -546,7 +1337,10 @@ class xkcd(object):
         if self.comic is None:
             return iter((self,))
         cls = type(self)
-        return map(cls, range(self.comic, cls.latest() + 1))
+        numbers = range(self.comic, cls.latest() + 1)
+        if cls.read_ahead:
+            return cls.prefetch(numbers, cls.read_ahead)
+        return map(cls, numbers)
 
     def next(self, keep_alive=False):
         """
@@ -581,10 +1375,13 @@ class xkcd(object):
         else:
             comic = self.comic
         cls = type(self)
-        return iter(map(cls, range(comic - 1, 0, -1)))
+        numbers = range(comic - 1, 0, -1)
+        if cls.read_ahead:
+            return cls.prefetch(numbers, cls.read_ahead)
+        return iter(map(cls, numbers))
 
     @classmethod
-    def range(cls, from_=1, to=None, step=1):
+    def range(cls, from_=1, to=None, step=1, read_ahead=None):
         """
         Returns an iterator over specified comics.
 
@@ -593,7 +1390,10 @@ class xkcd(object):
         :param int from_: The comic to start from. Defaults to the first.
         :param Optional[int] to: The comic to end by (exclusive). Defaults to last + 1.
         :param int step: The step amount. Defaults to one.
-        :return: A range over the requested comics.
+        :param Optional[int] read_ahead: How many comics ahead to load in the
+            background while iterating. Defaults to `cls.read_ahead`.
+        :return: A range over the requested comics, or an iterator over
+            them when reading ahead.
         """
         if to is None:
             if step < 0:
@@ -601,7 +1401,13 @@ class xkcd(object):
             else:
                 to = cls.latest() + 1
 
-        return range(from_, to, step)
+        numbers = range(from_, to, step)
+        if read_ahead is None:
+            read_ahead = cls.read_ahead
+        if read_ahead:
+            # `comic` is kept alive until the next number is asked for
+            return (n for n, comic in cls._prefetch(numbers, read_ahead))
+        return numbers
 
     def __eq__(self, other):
         if isinstance(other, xkcd) and isinstance(self, xkcd):
@@ -661,8 +1467,10 @@ def load_xkcd_cache():
     """
     Loads a pre-fetched cache of the xkcd API. Currently for 1 through 2128.
     Might be a bit stale. Will still make HTTP requests for newer comics.
-    """
-    from xxkcd._cache import cache
 
-    for k, v in getattr(dict, 'iteritems', dict.items)(cache):
-        xkcd(k, keep_alive=True)._raw_json = make_mapping_proxy(v)
+    Only the index of the cache is read here. Each comic is decompressed the
+    first time it is requested, and then kept alive until it is deleted.
+    Comics in `xkcd.store` take precedence over the cache.
+    """
+    if xkcd._snapshot is None:
+        xkcd._snapshot = Snapshot()